@@ -0,0 +1,174 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+# Modeli aynı anda kullanabilecek en fazla analiz sayısı
+ADMISSION_MAX_ACTIVE = int(os.environ.get('EMBRYO_ADMISSION_MAX_ACTIVE', '4'))
+# Sırada bekleyebilecek en fazla analiz sayısı; dolunca 429 döner
+ADMISSION_MAX_QUEUED = int(os.environ.get('EMBRYO_ADMISSION_MAX_QUEUED', '32'))
+# Sıradaki bir isteğin en uzun bekleme süresi (saniye)
+ADMISSION_MAX_WAIT_SECONDS = float(os.environ.get('EMBRYO_ADMISSION_MAX_WAIT_SECONDS', '30'))
+
+
+class AdmissionRejected(Exception):
+    """
+    Kuyruk dolu oldugu icin istek kabul edilmedi
+    """
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('doctor_id', 'granted', 'enqueued')
+
+    def __init__(self, doctor_id):
+        self.doctor_id = doctor_id
+        self.granted = False
+        self.enqueued = time.perf_counter()
+
+
+class AdmissionController:
+    """
+    Model cagrilarini sinirli bir kuyrukla yonetir.
+    En fazla max_active analiz ayni anda calisir, digerleri sirada bekler.
+    Sira doktorlar arasinda donusumlu (round-robin) ilerler ve bir doktor
+    sira kapasitesinin adil payindan fazlasini tutamaz.
+    """
+
+    def __init__(self, max_active=ADMISSION_MAX_ACTIVE, max_queued=ADMISSION_MAX_QUEUED,
+                 max_wait=ADMISSION_MAX_WAIT_SECONDS):
+        self.max_active = max(1, max_active)
+        self.max_queued = max(0, max_queued)
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        # doctor_id -> bekleyen biletler; sözlük sırası round-robin sırasıdır
+        self._queues = OrderedDict()
+        self._queued = 0
+        self.active = 0
+
+        # İstatistikler
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waits = deque(maxlen=1000)
+        self._service_time = None
+
+    def _fair_share(self, doctor_id):
+        # Sırası olan doktorlar (ve bu istek) arasında kapasiteyi eşit böl
+        doctors = len(self._queues) + (0 if doctor_id in self._queues else 1)
+        return max(1, math.ceil(self.max_queued / doctors))
+
+    def _retry_after(self):
+        # Ortalama servis süresine göre sıranın boşalma tahmini (saniye)
+        service_time = self._service_time or 1.0
+        return max(1, math.ceil(service_time * (self._queued + 1) / self.max_active))
+
+    def _grant_next(self):
+        # Çağıran kilidi tutuyor olmalı
+        while self.active < self.max_active and self._queues:
+            doctor_id, waiting = self._queues.popitem(last=False)
+            ticket = waiting.popleft()
+            if waiting:
+                # Doktor sıranın sonuna geçer, sıradaki slot başka doktora gider
+                self._queues[doctor_id] = waiting
+            self._queued -= 1
+            ticket.granted = True
+            self.active += 1
+        self._condition.notify_all()
+
+    def _remove(self, ticket):
+        waiting = self._queues.get(ticket.doctor_id)
+        if waiting is not None and ticket in waiting:
+            waiting.remove(ticket)
+            self._queued -= 1
+            if not waiting:
+                del self._queues[ticket.doctor_id]
+
+    def acquire(self, doctor_id):
+        """
+        Slot alinana kadar bekler; sira doluysa ya da sure dolarsa AdmissionRejected firlatir
+        """
+        doctor_id = str(doctor_id)
+        with self._condition:
+            if self.active < self.max_active and not self._queues:
+                self.active += 1
+                self.admitted += 1
+                self._waits.append(0.0)
+                return
+
+            if self._queued >= self.max_queued:
+                self.rejected += 1
+                raise AdmissionRejected('Analiz kuyruğu dolu, lütfen daha sonra tekrar deneyin',
+                                        self._retry_after())
+            if len(self._queues.get(doctor_id, ())) >= self._fair_share(doctor_id):
+                self.rejected += 1
+                raise AdmissionRejected('Bu doktor için bekleyen analiz sayısı sınıra ulaştı',
+                                        self._retry_after())
+
+            ticket = _Ticket(doctor_id)
+            self._queues.setdefault(doctor_id, deque()).append(ticket)
+            self._queued += 1
+
+            deadline = time.monotonic() + self.max_wait
+            while not ticket.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(ticket)
+                    self.timed_out += 1
+                    self.rejected += 1
+                    raise AdmissionRejected('Analiz kuyruğunda bekleme süresi aşıldı', self._retry_after())
+                self._condition.wait(remaining)
+
+            self.admitted += 1
+            self._waits.append(time.perf_counter() - ticket.enqueued)
+
+    def release(self, service_time=None):
+        with self._condition:
+            self.active -= 1
+            if service_time is not None:
+                # Üstel hareketli ortalama
+                if self._service_time is None:
+                    self._service_time = service_time
+                else:
+                    self._service_time = 0.8 * self._service_time + 0.2 * service_time
+            self._grant_next()
+
+    @contextmanager
+    def slot(self, doctor_id):
+        self.acquire(doctor_id)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def stats(self):
+        with self._condition:
+            waits = sorted(self._waits)
+            queued_by_doctor = {doctor_id: len(waiting) for doctor_id, waiting in self._queues.items()}
+            stats = {
+                'max_active': self.max_active,
+                'max_queued': self.max_queued,
+                'active': self.active,
+                'queue_depth': self._queued,
+                'queued_by_doctor': queued_by_doctor,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'avg_service_ms': round(self._service_time * 1000, 2) if self._service_time else None
+            }
+
+        def percentile(p):
+            if not waits:
+                return None
+            index = min(len(waits) - 1, int(round(p / 100.0 * (len(waits) - 1))))
+            return round(waits[index] * 1000, 2)
+
+        stats['wait_p50_ms'] = percentile(50)
+        stats['wait_p99_ms'] = percentile(99)
+        return stats
@@ -0,0 +1,171 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Arka planda aynı anda çalışacak analiz işi sayısı
+JOB_WORKERS = int(os.environ.get('EMBRYO_JOB_WORKERS', '2'))
+
+TERMINAL_STATUSES = ('done', 'failed')
+
+
+class AnalysisJobManager:
+    """
+    Analizleri arka plandaki bir executor uzerinde calistirir.
+    Is durumu analysis_jobs tablosunda tutulur; yeniden baslatmada
+    yarim kalan isler recover() ile tekrar kuyruga alinir.
+    """
+
+    def __init__(self, db_path, handler, max_workers=JOB_WORKERS):
+        # handler(job) -> predict sonucu sözlüğü ({'success': ..., ...})
+        self.db_path = db_path
+        self.handler = handler
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._table_ready = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._table_ready:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    patient_id INTEGER NOT NULL,
+                    doctor_id INTEGER NOT NULL,
+                    image_path TEXT NOT NULL,
+                    image_hash TEXT,
+                    notes TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+            self._table_ready = True
+        return conn
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='analysis-job')
+        return self._executor
+
+    def submit(self, patient_id, doctor_id, image_path, image_hash=None, notes=''):
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute('''
+                INSERT INTO analysis_jobs (id, status, patient_id, doctor_id, image_path, image_hash, notes)
+                VALUES (?, 'queued', ?, ?, ?, ?, ?)
+            ''', (job_id, patient_id, doctor_id, image_path, image_hash, notes))
+        self._get_executor().submit(self._run, job_id)
+        return job_id
+
+    def _claim(self, job_id):
+        # İşi atomik olarak üstlen: aynı iş birden fazla süreçte kuyruğa alınsa da yalnızca biri çalıştırır
+        with self._connect() as conn:
+            claimed = conn.execute('''
+                UPDATE analysis_jobs SET status = 'running', updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = 'queued'
+            ''', (job_id,)).rowcount
+        if claimed:
+            with self._condition:
+                self._condition.notify_all()
+        return claimed > 0
+
+    def _run(self, job_id):
+        if not self._claim(job_id):
+            return
+        job = self.get(job_id)
+        if job is None:
+            return
+
+        try:
+            result = self.handler(job)
+        except Exception as e:
+            print(f"Analiz işi hatası ({job_id}): {str(e)}")
+            self._update(job_id, 'failed', error=str(e))
+            return
+
+        if result.get('success'):
+            self._update(job_id, 'done', result=result)
+        else:
+            self._update(job_id, 'failed', error=result.get('error'))
+
+    def _update(self, job_id, status, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute('''
+                UPDATE analysis_jobs
+                SET status = ?, result = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, job_id))
+        # SSE akışlarını uyandır
+        with self._condition:
+            self._condition.notify_all()
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute('''
+                SELECT id, status, patient_id, doctor_id, image_path, image_hash, notes,
+                       result, error, created_at, updated_at
+                FROM analysis_jobs WHERE id = ?
+            ''', (job_id,)).fetchone()
+
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'status': row[1],
+            'patient_id': row[2],
+            'doctor_id': row[3],
+            'image_path': row[4],
+            'image_hash': row[5],
+            'notes': row[6],
+            'result': json.loads(row[7]) if row[7] else None,
+            'error': row[8],
+            'created_at': row[9],
+            'updated_at': row[10]
+        }
+
+    def wait_for_update(self, timeout):
+        """
+        Herhangi bir isin durumu degisene veya sure dolana kadar bekler.
+        Sure dolarsa False doner.
+        """
+        with self._condition:
+            return self._condition.wait(timeout)
+
+    def requeue_running(self):
+        """
+        Onceki surecte calisirken yarim kalan isleri 'queued' durumuna dondurur.
+        Yalnizca hicbir surec is calistirmiyorken (sunucu baslangicinda) cagrilmalidir.
+        """
+        with self._connect() as conn:
+            return conn.execute("UPDATE analysis_jobs SET status = 'queued' WHERE status = 'running'").rowcount
+
+    def recover(self, requeue=True):
+        """
+        Onceki surecte bitmemis isleri yeniden kuyruga alir. Cok surecli sunucuda
+        requeue_running() ana surecte bir kez cagrilir, isciler requeue=False kullanir.
+        """
+        if requeue:
+            self.requeue_running()
+        with self._connect() as conn:
+            rows = conn.execute('''
+                SELECT id FROM analysis_jobs
+                WHERE status = 'queued'
+                ORDER BY created_at
+            ''').fetchall()
+
+        for row in rows:
+            self._get_executor().submit(self._run, row[0])
+        if rows:
+            print(f"{len(rows)} analiz işi yeniden kuyruğa alındı")
+        return len(rows)
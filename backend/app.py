@@ -1,35 +1,29 @@
-from flask import Flask, request, jsonify, send_file, make_response, send_from_directory
+from flask import Flask, request, jsonify, send_file, make_response, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import sqlite3
 from werkzeug.security import generate_password_hash
 import os
 import re
 import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 from datetime import datetime
 import bcrypt
 from werkzeug.utils import secure_filename
 import time
-import torch
-import torchvision.transforms as transforms
-from PIL import Image
-import io
+import json
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import base64
-from torchvision import models
+import hmac
 
 app = Flask(__name__)
 CORS(app)
 
 # Database initialization
-DB_NAME = os.path.join(os.path.dirname(__file__), 'embryo_ai.db')
+DB_NAME = os.environ.get('EMBRYO_DB_PATH', os.path.join(os.path.dirname(__file__), 'embryo_ai.db'))
 
 # Dosya yükleme için klasör
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
+UPLOAD_FOLDER = os.environ.get('EMBRYO_UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads'))
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
@@ -37,6 +31,9 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Uploads klasöründeki dosyaları servis etmek için endpoint
 @app.route('/uploads/<path:filename>')
 def serve_upload(filename):
+    # ?size=thumb|preview ile küçültülmüş türev sunulur (bkz. serve_upload_derivative)
+    if request.args.get('size'):
+        return serve_upload_derivative(filename, request.args['size'])
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
 @app.route('/api/patient/profile/<username>', methods=['GET'])
@@ -251,6 +248,8 @@ def init_db():
                     confidence FLOAT,
                     notes TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    model_version TEXT,
+                    probabilities BLOB,
                     FOREIGN KEY (patient_id) REFERENCES users (id),
                     FOREIGN KEY (doctor_id) REFERENCES users (id)
                 )
@@ -272,6 +271,9 @@ def init_db():
         else:
             print("Tablolar zaten mevcut. Veritabanı başlatılıyor...")
             
+            # Eski veritabanlarına sonradan eklenen rapor sütunlarını ekle
+            migrate_report_columns(conn)
+            
         return conn
     except Exception as e:
         print(f"Hata: {str(e)}")
@@ -636,6 +638,7 @@ def upload_report():
 
         # Dosyayı kaydet
         file.save(filepath)
+        schedule_derivatives(unique_filename)
 
         # Veritabanına kaydet
         data = request.form
@@ -684,7 +687,8 @@ def get_reports():
             if user_role == 'doctor':
                 # Doktorun tüm raporlarını getir
                 cursor.execute('''
-                    SELECT r.*, u.full_name as patient_name
+                    SELECT r.id, r.patient_id, r.doctor_id, r.image_path, r.result, r.confidence,
+                           r.notes, r.created_at, u.full_name as patient_name, r.model_version
                     FROM reports r
                     INNER JOIN users u ON r.patient_id = u.id
                     WHERE r.doctor_id = ?
@@ -693,7 +697,8 @@ def get_reports():
             else:
                 # Hastanın kendi raporlarını getir
                 cursor.execute('''
-                    SELECT r.*, u.full_name as doctor_name
+                    SELECT r.id, r.patient_id, r.doctor_id, r.image_path, r.result, r.confidence,
+                           r.notes, r.created_at, u.full_name as doctor_name, r.model_version
                     FROM reports r
                     INNER JOIN users u ON r.doctor_id = u.id
                     WHERE r.patient_id = ?
@@ -709,11 +714,13 @@ def get_reports():
                     'patient_id': r[1],
                     'doctor_id': r[2],
                     'image_path': r[3],
+                    'thumbnail_url': derivative_url(r[3], 'thumb'),
                     'result': r[4],
                     'confidence': r[5],
                     'notes': r[6],
                     'created_at': r[7],
-                    'other_party_name': r[8]  # Hasta için doktor adı, doktor için hasta adı
+                    'other_party_name': r[8],  # Hasta için doktor adı, doktor için hasta adı
+                    'model_version': r[9]
                 } for r in reports]
             }), 200
 
@@ -733,9 +740,11 @@ def get_report(report_id):
             
             # Raporu ID'ye göre getir
             cursor.execute('''
-                SELECT r.*, 
+                SELECT r.id, r.patient_id, r.doctor_id, r.image_path, r.result, r.confidence,
+                       r.notes, r.created_at,
                        p.full_name as patient_name, 
-                       d.full_name as doctor_name
+                       d.full_name as doctor_name,
+                       r.model_version
                 FROM reports r
                 INNER JOIN users p ON r.patient_id = p.id
                 INNER JOIN users d ON r.doctor_id = d.id
@@ -757,12 +766,14 @@ def get_report(report_id):
                     'patient_id': report[1],
                     'doctor_id': report[2],
                     'image_path': report[3],
+                    'preview_url': derivative_url(report[3], 'preview'),
                     'result': report[4],
                     'confidence': report[5],
                     'notes': report[6],
                     'created_at': report[7],
                     'patient_name': report[8],
-                    'doctor_name': report[9]
+                    'doctor_name': report[9],
+                    'model_version': report[10]
                 }
             }), 200
 
@@ -993,125 +1004,910 @@ def update_appointment_status(appointment_id):
         }), 500
 
 # Model sınıf tanımlamaları - embryo_classes.py dosyasından içe aktar
-from embryo_classes import EMBRYO_CLASSES
+# torch, torchvision, PIL ve numpy ilk analiz isteğinde (veya açılışta model yüklenirken) içe aktarılır
+from embryo_classes import EMBRYO_CLASSES, CLASS_NAMES
+from report_schema import migrate_report_columns
+from model_registry import model_deployment, model_registry
+from inference_batcher import inference_batcher
+from prediction_cache import PredictionCache, image_sha256
+from analysis_jobs import AnalysisJobManager, TERMINAL_STATUSES
+from embryo_ranking import RANKING_SCORES, encode_probabilities, parse_weights, rank_reports
+from inference_client import inference_client
+from admission import AdmissionController, AdmissionRejected
+from single_flight import SingleFlight
+from embedding_store import embedding_store, embedding_index, encode_embedding
+from plate_tiling import PLATE_WELL_MARGIN, native_image, parse_grid, tile_plate, well_image_bytes
+from timelapse import TimelapseStore
+from gradcam import GRADCAM_ENABLED, GradCamWorker
+from image_derivatives import DERIVATIVE_MIMETYPES, DERIVATIVES_ON_UPLOAD, DerivativeStore
+
+# Görüntü içeriği + model sürümüne göre tahmin önbelleği
+prediction_cache = PredictionCache(DB_NAME)
+
+# Model çağrıları için sınırlı, doktorlar arasında adil kuyruk
+admission_controller = AdmissionController()
+
+# Aynı görüntü + hasta + doktor için eşzamanlı analizleri tek hesaplamada birleştir
+analysis_flights = SingleFlight()
+
+# Grad-CAM kaplamaları yalnızca bu süreçte çalışan eager ResNet50 ile (fp32 / int8-dynamic) üretilebilir
+GRADCAM_AVAILABLE = (GRADCAM_ENABLED and inference_client is None and model_registry.backend_name == 'eager'
+                     and model_registry.engine != 'int8-static')
+gradcam_worker = GradCamWorker(UPLOAD_FOLDER, model_registry.get_model) if GRADCAM_AVAILABLE else None
+
+# Yüklenen görüntülerin küçük resim / önizleme türevleri
+derivative_store = DerivativeStore(UPLOAD_FOLDER)
+# Yükleme sırasında türev üretimi tek arka plan thread'inde (analiz isteklerini yavaşlatmasın)
+derivative_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='derivatives')
+# Sürümlü (?v=) türev URL'lerinin tarayıcı önbelleğinde tutulma süresi (saniye)
+DERIVATIVE_CACHE_SECONDS = int(os.environ.get('EMBRYO_DERIVATIVE_CACHE_SECONDS', '31536000'))
+
+# Önbellek anahtarında kullanılan model sürümü (ayrı servis varsa servisteki model)
+def current_model_version():
+    if inference_client is not None:
+        return inference_client.model_version
+    return model_registry.version
+
+# Model durumu (readiness) endpoint'i
+@app.route('/api/model/health', methods=['GET'])
+def model_health():
+    if inference_client is not None:
+        service = inference_client.health()
+        return jsonify({
+            'success': service['success'],
+            'inference_service': service,
+            'admission': admission_controller.stats(),
+            'single_flight': analysis_flights.stats(),
+            'cache': prediction_cache.stats(),
+            'gradcam': {'enabled': False},
+            'derivatives': derivative_store.stats()
+        }), 200 if service['success'] else 503
+    
+    status = model_registry.status()
+    return jsonify({
+        'success': status['ready'],
+        'model': status,
+        'batching': inference_batcher.stats(),
+        'admission': admission_controller.stats(),
+        'single_flight': analysis_flights.stats(),
+        'cache': prediction_cache.stats(),
+        'gradcam': gradcam_worker.stats() if gradcam_worker is not None else {'enabled': False},
+        'derivatives': derivative_store.stats()
+    }), 200 if status['ready'] else 503
+
+# Model yönetimi endpoint'leri için gizli anahtar (X-Admin-Token); verilmezse bu endpoint'ler kapalıdır
+MODEL_ADMIN_TOKEN = os.environ.get('EMBRYO_ADMIN_TOKEN')
+
+# Model yönetimi isteğini doğrula; sorun varsa hata yanıtı döndür
+def model_admin_error():
+    token = request.headers.get('X-Admin-Token', '')
+    if not MODEL_ADMIN_TOKEN or not hmac.compare_digest(token, MODEL_ADMIN_TOKEN):
+        return jsonify({
+            'success': False,
+            'message': 'Bu işlem için yetkiniz yok'
+        }), 403
+    if inference_client is not None:
+        return jsonify({
+            'success': False,
+            'message': 'Model ayrı çıkarım servisinde çalışıyor; sürüm yönetimi için servisin /model endpoint\'lerini kullanın'
+        }), 409
+    return None
+
+# Yeni model sürümünü API'yi yeniden başlatmadan yükle.
+# shadow=true ise sürüm aday olarak trafiğin bir örnekleminde karşılaştırılır, trafik geçmez.
+# Değişiklik paylaşılan dağıtım dosyasına yazılır ve tüm işçi süreçlerinde arka planda uygulanır.
+@app.route('/api/model/versions', methods=['POST'])
+def deploy_model_version():
+    error_response = model_admin_error()
+    if error_response is not None:
+        return error_response
+    
+    from model_artifacts import resolve_path
+    
+    data = request.get_json() or {}
+    if not data.get('model_path'):
+        return jsonify({
+            'success': False,
+            'message': 'Model dosyası yolu gereklidir'
+        }), 400
+    
+    model_path = resolve_path(data['model_path'])
+    if not os.path.isfile(model_path):
+        return jsonify({
+            'success': False,
+            'message': 'Model dosyası bulunamadı'
+        }), 404
+    
+    try:
+        sample_rate = float(data.get('sample_rate', 0.1))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'message': 'Geçersiz örnekleme oranı'
+        }), 400
+    
+    deployment = model_deployment.deploy(model_path, data.get('version'), bool(data.get('shadow')), sample_rate)
+    return jsonify({
+        'success': True,
+        'message': 'Model sürümü tüm süreçlerde arka planda yükleniyor',
+        'deployment': deployment,
+        'model': model_registry.status()
+    }), 202
+
+# Gölge moddaki aday sürümü aktif sürüm yap (tüm süreçlerde; aday yeniden yüklenmez)
+@app.route('/api/model/shadow/promote', methods=['POST'])
+def promote_shadow_model():
+    error_response = model_admin_error()
+    if error_response is not None:
+        return error_response
+    
+    # Karşılaştırma istatistikleri bu sürecin örneklemidir
+    shadow = model_registry.status()['shadow']
+    try:
+        deployment = model_deployment.promote()
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'shadow': shadow,
+        'deployment': deployment
+    }), 202
+
+# Gölge modu durdur ve aday sürümü bırak (tüm süreçlerde)
+@app.route('/api/model/shadow', methods=['DELETE'])
+def stop_shadow_model():
+    error_response = model_admin_error()
+    if error_response is not None:
+        return error_response
+    
+    shadow = model_registry.status()['shadow']
+    try:
+        deployment = model_deployment.stop_shadow()
+    except RuntimeError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'shadow': shadow,
+        'deployment': deployment
+    }), 202
+
+# Toplu analizde tek istekte kabul edilen en fazla görüntü sayısı
+BATCH_ANALYSIS_MAX_IMAGES = int(os.environ.get('EMBRYO_BATCH_ANALYSIS_MAX_IMAGES', '32'))
+# Benzer embriyo aramasında istenebilecek en fazla komşu sayısı
+SIMILAR_EMBRYOS_MAX_K = int(os.environ.get('EMBRYO_SIMILAR_MAX_K', '100'))
+# Zaman atlamalı dizide tek JSON isteğinde kabul edilen en fazla kare sayısı
+TIMELAPSE_MAX_FRAMES = int(os.environ.get('EMBRYO_TIMELAPSE_MAX_FRAMES', '64'))
+# NDJSON akışında aynı anda sınıflandırılan en fazla kare sayısı
+TIMELAPSE_STREAM_WINDOW = int(os.environ.get('EMBRYO_TIMELAPSE_STREAM_WINDOW', '8'))
+
+# Ham görüntü yüklemesi için en büyük gövde boyutu (byte)
+ANALYSIS_MAX_UPLOAD_BYTES = int(os.environ.get('EMBRYO_MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+# NDJSON kare akışında tek satırın (base64 kodlu kare) en büyük boyutu
+TIMELAPSE_MAX_LINE_BYTES = ANALYSIS_MAX_UPLOAD_BYTES * 4 // 3 + 4096
+
+# SSE akışında bağlantıyı canlı tutma aralığı (saniye)
+JOB_EVENTS_HEARTBEAT_SECONDS = 15
+
+# Görüntü ön işleme için paylaşılan thread havuzu (PIL decode/resize sırasında GIL bırakılır)
+preprocess_executor = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+# Base64 data URL'den ham görüntü byte'larını çıkar
+def decode_image_data(image_data):
+    return base64.b64decode(image_data.split(',')[1])
+
+# Görüntüyü model girişi olan (3, 224, 224) tensöre dönüştür.
+# out verilirse sonuç önceden ayrılmış batch tensörünün ilgili satırına yazılır.
+def image_to_tensor(image_bytes, out=None):
+    from preprocessing import image_preprocessor
+    return image_preprocessor.preprocess(image_bytes, out=out)
+
+# Softmax olasılık vektöründen API sonucunu oluştur
+def build_prediction(probabilities):
+    # En yüksek olasılıklı sınıfı bul
+    predicted_idx = int(probabilities.argmax().item())
+    print(f"Tahmin edilen indeks: {predicted_idx}")
+    
+    class_names = CLASS_NAMES
+
+    # İndeksin sınıf listesinin sınırları içinde olduğundan emin ol
+    if predicted_idx >= len(class_names):
+        print(f"UYARI: Tahmin indeksi ({predicted_idx}) sınıf listesinin uzunluğundan ({len(class_names)}) büyük!")
+        predicted_idx = len(class_names) - 1  # Son sınıfı kullan
+    
+    predicted_class = class_names[predicted_idx]
+    print(f"Tahmin edilen sınıf: {predicted_class}")
+    
+    # Tahmin güvenini hesapla
+    confidence = probabilities[predicted_idx].item() * 100  # Yüzde olarak
+    print(f"Güven skoru: %{round(confidence, 2)}")
+    
+    result = prediction_result(predicted_class, confidence)
+    # Tüm sınıf olasılıkları raporla birlikte saklanır (sıralama için modeli yeniden çalıştırmaya gerek kalmaz)
+    result['probabilities'] = probabilities.tolist()
+    return result
+
+# Sınıf ve güven skorundan API sonucunu oluştur
+def prediction_result(predicted_class, confidence):
+    # Sınıf detaylarını al
+    if predicted_class in EMBRYO_CLASSES:
+        class_details = EMBRYO_CLASSES[predicted_class]
+    else:
+        print(f"UYARI: {predicted_class} sınıfı EMBRYO_CLASSES sözlüğünde bulunamadı!")
+        class_details = {
+            'hücre_sayısı': 'Bilinmiyor',
+            'fragmentasyon': 'Bilinmiyor',
+            'simetri': 'Bilinmiyor'
+        }
+    
+    return {
+        'success': True,
+        'class': predicted_class,
+        'details': class_details,
+        'confidence': round(confidence, 2)
+    }
+
+# Önbellekteki kayıttan API sonucunu oluştur
+def cached_prediction(cached, model_version):
+    result = prediction_result(cached['class'], cached['confidence'])
+    result['cached'] = True
+    result['model_version'] = model_version
+    result['probabilities'] = cached.get('probabilities')
+    result['embedding'] = cached.get('embedding')
+    if cached['image_path']:
+        result['image_path'] = cached['image_path']
+    return result
+
+# Çıkarım servisinin base64 olarak gönderdiği öznitelik vektörünü byte'a çevir
+def remote_embedding(prediction):
+    embedding = prediction.get('embedding')
+    return base64.b64decode(embedding) if embedding else None
+
+# Çıkarım servisi yanıtından API sonucunu oluştur
+def remote_prediction(prediction):
+    result = prediction_result(prediction['class'], prediction['confidence'])
+    result['model_version'] = prediction['model_version']
+    result['probabilities'] = prediction.get('probabilities')
+    result['embedding'] = remote_embedding(prediction)
+    return result
+
+# Modeli çalıştır: ayrı çıkarım servisi tanımlıysa yerel soket üzerinden, değilse bu süreçte
+def run_model(image_bytes):
+    if inference_client is not None:
+        print("Tahmin çıkarım servisine gönderiliyor...")
+        return remote_prediction(inference_client.predict(image_bytes))
+    
+    print("Resim dönüştürülüyor...")
+    input_tensor = image_to_tensor(image_bytes)
+    print(f"Tensor boyutu: {input_tensor.shape}")
+    
+    # Model tahmini yap - eşzamanlı istekler mikro-batch kuyruğunda tek forward'da birleşir
+    print("Tahmin yapılıyor...")
+    probabilities, model_version, features = inference_batcher.predict(input_tensor)
+    result = build_prediction(probabilities)
+    result['model_version'] = model_version
+    # Benzer embriyo araması için son katman öncesi öznitelikler (backend destekliyorsa)
+    result['embedding'] = encode_embedding(features) if features is not None else None
+    return result
+
+# Kuyruk doluysa 429 ve Retry-After başlığı döndür
+def admission_rejected_response(e):
+    response = jsonify({
+        'success': False,
+        'error': str(e),
+        'retry_after': e.retry_after
+    })
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 429
+
+# Ham görüntü byte'ları için tahmin fonksiyonu.
+# doctor_id verilirse model çağrısı kabul kuyruğundan geçer; kuyruk doluysa AdmissionRejected fırlatılır.
+# Arka plan işleri kendi thread havuzlarıyla sınırlı olduğundan doctor_id olmadan çağrılır.
+def predict_embryo_image(image_bytes, image_hash=None, doctor_id=None):
+    try:
+        print("Tahmin işlemi başlıyor...")
+        
+        # Aynı görüntü bu model sürümüyle daha önce analiz edildiyse modeli çalıştırma
+        if image_hash is None:
+            image_hash = image_sha256(image_bytes)
+        model_version = current_model_version()
+        cached = prediction_cache.get(image_hash, model_version)
+        if cached is not None:
+            print("Tahmin önbellekten alındı.")
+            return cached_prediction(cached, model_version)
+        
+        if doctor_id is None:
+            result = run_model(image_bytes)
+        else:
+            with admission_controller.slot(doctor_id):
+                result = run_model(image_bytes)
+        result['cached'] = False
+        print("Tahmin işlemi tamamlandı.")
+        return result
+        
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
 
+# Model tahmin fonksiyonu (base64 data URL girişi)
+def predict_embryo_class(image_data):
+    try:
+        # Base64'ten resmi decode et
+        image_bytes = decode_image_data(image_data)
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e)
+        }
+    return predict_embryo_image(image_bytes)
+
+# Önbellekte kayıtlı görüntü dosyası hâlâ duruyorsa adını döndür
+def existing_upload(result):
+    image_path = result.get('image_path')
+    if image_path and os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_path)):
+        return image_path
+    return None
+
+# Görüntüyü uploads klasörüne benzersiz bir adla yaz
+def write_upload(image_bytes, unique_filename=None):
+    # Benzersiz dosya adı oluştur: aynı saniyede analiz edilen görüntüler birbirinin üzerine yazmasın
+    # (önbellek görüntü özetini bu dosya adına eşler)
+    if unique_filename is None:
+        unique_filename = f"{int(time.time())}_{uuid.uuid4().hex[:8]}_embryo.jpg"
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+    
+    # Uploads klasörünü oluştur
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    
+    # Dosyayı kaydet
+    with open(filepath, 'wb') as f:
+        f.write(image_bytes)
+    schedule_derivatives(unique_filename)
+    
+    return unique_filename
 
+# Sonuçtaki olasılık vektörünü reports tablosu için float16 blob'a çevir
+def probabilities_blob(result):
+    probabilities = result.get('probabilities')
+    return encode_probabilities(probabilities) if probabilities is not None else None
 
+# Raporların öznitelik vektörlerini benzer embriyo indeksine ekle; hata raporun kaydını engellemez
+def store_embeddings(items):
+    try:
+        embedding_store.add_many(items)
+    except Exception as e:
+        print(f"Embedding kaydedilemedi: {str(e)}")
+
+# Yeni raporların Grad-CAM kaplamalarını arka plan kuyruğuna ekle: [(image_path, sınıf)]
+def queue_gradcam(items):
+    if gradcam_worker is not None:
+        for image_path, class_name in items:
+            gradcam_worker.submit(image_path, class_name)
+
+# Yeni yüklenen görüntünün küçük resim / önizleme türevlerini arka planda hazırla
+def schedule_derivatives(filename):
+    if DERIVATIVES_ON_UPLOAD:
+        derivative_executor.submit(derivative_store.generate_all, filename)
+
+# Sürümlü türev URL'si (dosya değişirse ?v= değişir); dosya yoksa None
+def derivative_url(image_path, size):
+    version = derivative_store.source_version(image_path) if image_path else None
+    if version is None:
+        return None
+    return f"/uploads/{image_path}?size={size}&v={version}"
+
+# Yüklenen görüntünün küçültülmüş türevi (JPEG / WebP). İlk istekte üretilir, sonra diskten
+# içerik özetinden güçlü ETag ile koşullu (304) ve Range (206) destekli sunulur.
+# Güncel ?v= ile istenen URL'ler immutable olarak önbelleklenir; diğerleri ETag ile doğrulanır.
+def serve_upload_derivative(filename, size):
+    image_format = request.args.get('format', 'auto')
+    if image_format == 'auto':
+        # Accept başlığında açıkça image/webp isteyen tarayıcılara WebP
+        accepts_webp = any(value == 'image/webp' for value, _ in request.accept_mimetypes)
+        image_format = 'webp' if accepts_webp and 'webp' in derivative_store.formats else 'jpeg'
 
+    try:
+        path = derivative_store.get(filename, size, image_format)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except FileNotFoundError:
+        return jsonify({
+            'success': False,
+            'message': 'Dosya bulunamadı'
+        }), 404
+    except OSError as e:
+        print(f"Görüntü türevi üretilemedi ({filename}): {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Görüntü türevi üretilemedi',
+            'error': str(e)
+        }), 500
 
-# Model yükleme fonksiyonu
+    response = send_file(path, mimetype=DERIVATIVE_MIMETYPES[image_format], conditional=True,
+                         etag=derivative_store.etag(path))
+    # Hasta görüntüleri paylaşılan önbelleklerde (proxy/CDN) tutulmaz
+    if request.args.get('v') == derivative_store.source_version(filename):
+        response.headers['Cache-Control'] = f'private, max-age={DERIVATIVE_CACHE_SECONDS}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    if request.args.get('format', 'auto') == 'auto':
+        response.vary.add('Accept')
+    return response
+
+# Analiz edilen görüntüyü uploads klasörüne yaz ve raporu veritabanına kaydet
+def save_analysis_report(patient_id, doctor_id, image_bytes, result, notes, image_hash=None):
+    # Aynı görüntü daha önce kaydedildiyse dosyayı yeniden yazma
+    unique_filename = existing_upload(result)
+    if unique_filename is None:
+        unique_filename = write_upload(image_bytes)
+        result['image_path'] = unique_filename
+    
+    # Yeni hesaplanan tahmini, onu üreten model sürümü ve görüntü dosyasıyla birlikte önbelleğe yaz
+    if image_hash is not None and not result.get('cached'):
+        prediction_cache.put(image_hash, result['model_version'], result['class'], result['confidence'],
+                             unique_filename, result.get('probabilities'), result.get('embedding'))
+    
+    # Veritabanına raporu kaydet
+    with sqlite3.connect(DB_NAME) as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO reports (patient_id, doctor_id, image_path, result, confidence, notes, model_version,
+                                 probabilities)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            patient_id,
+            doctor_id,
+            unique_filename,
+            result['class'],
+            result['confidence'],
+            notes,
+            result['model_version'],
+            probabilities_blob(result)
+        ))
+        conn.commit()
+        
+        # Eklenen raporun ID'sini al
+        result['report_id'] = cursor.lastrowid
+        result['message'] = 'Rapor başarıyla kaydedildi'
+    
+    # Öznitelik vektörü yanıtta döndürülmez, yalnızca indekse yazılır
+    store_embeddings([(result['report_id'], result.pop('embedding', None))])
+    queue_gradcam([(unique_filename, result['class'])])
+    return result
+
+# Görüntüyü analiz edip raporu kaydet. Aynı görüntü, hasta ve doktor için eşzamanlı gelen
+# tekrar istekler (çift gönderim, yeniden deneme) aynı sonucu ve report_id'yi paylaşır.
+def analyze_and_save(patient_id, doctor_id, image_bytes, notes, image_hash):
+    def analyze():
+        result = predict_embryo_image(image_bytes, image_hash, doctor_id)
+        if result['success']:
+            save_analysis_report(patient_id, doctor_id, image_bytes, result, notes, image_hash)
+        return result
+    
+    key = (image_hash, str(patient_id), str(doctor_id))
+    result, shared = analysis_flights.do(key, analyze, keep=lambda result: result['success'])
+    if shared:
+        print(f"Tekrarlanan analiz isteği birleştirildi (rapor {result.get('report_id')})")
+        result = dict(result, deduplicated=True)
+    return result
 
-# Model yükleme fonksiyonu
-def load_model():
+@app.route('/api/analyze-embryo', methods=['POST'])
+def analyze_embryo():
     try:
-        # ResNet50 modelini oluştur
-        model = models.resnet50()
+        data = request.get_json()
+        image_data = data.get('image')
+        patient_id = data.get('patient_id')
+        doctor_id = data.get('doctor_id')
+        notes = data.get('notes', '')
         
-        # Eğitilmiş model ağırlıklarını yükle
-        checkpoint = torch.load("best_resnet50_clean.pth", map_location=torch.device("cpu"))
+        if not image_data:
+            return jsonify({
+                'success': False,
+                'error': 'Resim verisi bulunamadı'
+            })
         
-        # Modeli yeniden yapılandır - tam olarak kaydedilen modele uygun olacak şekilde
-        num_classes = 19  # Kaydedilen modeldeki sınıf sayısı
-        model.fc = torch.nn.Sequential(
-            torch.nn.Dropout(0.5),
-            torch.nn.Linear(model.fc.in_features, num_classes)
+        if not patient_id or not doctor_id:
+            return jsonify({
+                'success': False,
+                'error': 'Hasta ID ve Doktor ID gereklidir'
+            })
+            
+        # Görüntüyü bir kez decode et; aynı buffer hem modele hem diske gider
+        try:
+            image_bytes = decode_image_data(image_data)
+        except Exception:
+            return jsonify({
+                'success': False,
+                'error': 'Resim verisi çözümlenemedi'
+            })
+        
+        # Analiz sonucunu al
+        image_hash = image_sha256(image_bytes)
+        result = analyze_and_save(patient_id, doctor_id, image_bytes, notes, image_hash)
+        
+        return jsonify(result)
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+# İstek gövdesindeki görüntüyü boyut sınırını aşmadan oku.
+# multipart/form-data ('image' alanı), application/octet-stream veya base64 JSON kabul edilir.
+# (image_bytes, parametreler, None) ya da (None, None, hata yanıtı) döndürür.
+def read_analysis_upload():
+    # Boyut sınırını gövde okunmadan önce kontrol et
+    if request.content_length is not None and request.content_length > ANALYSIS_MAX_UPLOAD_BYTES:
+        return None, None, (jsonify({
+            'success': False,
+            'error': 'Resim dosyası çok büyük'
+        }), 413)
+    
+    if request.is_json:
+        params = request.get_json()
+        try:
+            image_bytes = decode_image_data(params.get('image') or '')
+        except Exception:
+            return None, None, (jsonify({
+                'success': False,
+                'error': 'Resim verisi çözümlenemedi'
+            }), 400)
+    elif request.mimetype == 'multipart/form-data':
+        # Form ayrıştırıcı gövdeyi okuyacağından uzunluk önceden bilinmeli
+        if request.content_length is None:
+            return None, None, (jsonify({
+                'success': False,
+                'error': 'Content-Length başlığı gereklidir'
+            }), 411)
+        
+        file = request.files.get('image')
+        if file is None or file.filename == '':
+            return None, None, (jsonify({
+                'success': False,
+                'error': 'Resim dosyası bulunamadı'
+            }), 400)
+        
+        if not allowed_file(file.filename):
+            return None, None, (jsonify({
+                'success': False,
+                'error': 'Geçersiz dosya formatı'
+            }), 400)
+        
+        image_bytes = file.stream.read(ANALYSIS_MAX_UPLOAD_BYTES + 1)
+        params = request.form
+    else:
+        # Ham gövdeyi parça parça oku, sınır aşılırsa okumayı bırak
+        buffer = bytearray()
+        while len(buffer) <= ANALYSIS_MAX_UPLOAD_BYTES:
+            chunk = request.stream.read(64 * 1024)
+            if not chunk:
+                break
+            buffer += chunk
+        image_bytes = bytes(buffer)
+        params = request.args
+    
+    if len(image_bytes) > ANALYSIS_MAX_UPLOAD_BYTES:
+        return None, None, (jsonify({
+            'success': False,
+            'error': 'Resim dosyası çok büyük'
+        }), 413)
+    
+    if not image_bytes:
+        return None, None, (jsonify({
+            'success': False,
+            'error': 'Resim verisi bulunamadı'
+        }), 400)
+    
+    if not params.get('patient_id') or not params.get('doctor_id'):
+        return None, None, (jsonify({
+            'success': False,
+            'error': 'Hasta ID ve Doktor ID gereklidir'
+        }), 400)
+    
+    return image_bytes, params, None
+
+# Görüntüyü base64/JSON yerine ham byte olarak alan analiz endpoint'i.
+@app.route('/api/analyze-embryo/upload', methods=['POST'])
+def analyze_embryo_upload():
+    try:
+        image_bytes, params, error_response = read_analysis_upload()
+        if error_response is not None:
+            return error_response
+        
+        # Aynı buffer hem modele hem diske gider
+        image_hash = image_sha256(image_bytes)
+        result = analyze_and_save(params.get('patient_id'), params.get('doctor_id'), image_bytes,
+                                  params.get('notes', ''), image_hash)
+        
+        return jsonify(result)
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Arka plan işinde analiz: görüntü gönderimde diske yazılmıştır
+def run_analysis_job(job):
+    with open(os.path.join(app.config['UPLOAD_FOLDER'], job['image_path']), 'rb') as f:
+        image_bytes = f.read()
+    
+    result = predict_embryo_image(image_bytes, job['image_hash'])
+    if result['success']:
+        result['image_path'] = job['image_path']
+        save_analysis_report(job['patient_id'], job['doctor_id'], image_bytes, result,
+                             job['notes'], job['image_hash'])
+    return result
+
+analysis_jobs = AnalysisJobManager(DB_NAME, run_analysis_job)
+
+# Asenkron analiz: iş kimliği hemen döner, sonuç sorgulanarak veya SSE ile alınır
+@app.route('/api/analyze-embryo/jobs', methods=['POST'])
+def submit_analysis_job():
+    try:
+        image_bytes, params, error_response = read_analysis_upload()
+        if error_response is not None:
+            return error_response
+        
+        # Görüntü işten önce diske yazılır, böylece iş yeniden başlatmadan sonra da çalışabilir
+        image_hash = image_sha256(image_bytes)
+        image_path = write_upload(image_bytes)
+        job_id = analysis_jobs.submit(
+            params.get('patient_id'),
+            params.get('doctor_id'),
+            image_path,
+            image_hash,
+            params.get('notes', '')
         )
         
-        model.load_state_dict(checkpoint)
-        model.eval()
-        return model
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/analyze-embryo/jobs/{job_id}',
+            'events_url': f'/api/analyze-embryo/jobs/{job_id}/events'
+        }), 202
+        
     except Exception as e:
-        print(f"Model yükleme hatası: {str(e)}")
-        raise
+        print(f"Analiz işi oluşturma hatası: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
 
-# Model tahmin fonksiyonu
-def predict_embryo_class(image_data):
+@app.route('/api/analyze-embryo/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'İş bulunamadı'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    }), 200
+
+# İş durumunu Server-Sent Events ile gönder; iş bitince akış kapanır
+@app.route('/api/analyze-embryo/jobs/<job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    if analysis_jobs.get(job_id) is None:
+        return jsonify({
+            'success': False,
+            'message': 'İş bulunamadı'
+        }), 404
+    
+    def events():
+        last_status = None
+        while True:
+            job = analysis_jobs.get(job_id)
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: {job['status']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            if job['status'] in TERMINAL_STATUSES:
+                break
+            if not analysis_jobs.wait_for_update(JOB_EVENTS_HEARTBEAT_SECONDS):
+                # Bağlantıyı açık tutmak için yorum satırı
+                yield ": keepalive\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Önbellekte bulunmayan görüntüleri (pending indeksleri) tek seferde modelden geçir
+def predict_pending_batch(image_bytes_list, pending, results):
+    if inference_client is not None:
+        # Ayrı servis istekleri kendi mikro-batch kuyruğunda birleştirir
+        predictions = list(preprocess_executor.map(
+            lambda index: inference_client.predict(image_bytes_list[index]), pending
+        ))
+        for index, prediction in zip(pending, predictions):
+            results[index] = remote_prediction(prediction)
+            results[index]['cached'] = False
+        return
+    
+    # Ön işlemeyi paralel yap, her görüntü batch tensöründeki kendi satırına yazılır
+    from preprocessing import image_preprocessor
+    input_batch = image_preprocessor.new_batch(len(pending))
+    list(preprocess_executor.map(
+        lambda row: image_to_tensor(image_bytes_list[pending[row]], out=input_batch[row]),
+        range(len(pending))
+    ))
+    
+    # Kalan görüntüleri tek bir tensör batch'i olarak modelden geçir
+    probabilities, model_version, features = model_registry.predict_full(input_batch)
+    for row, index in enumerate(pending):
+        results[index] = build_prediction(probabilities[row])
+        results[index]['cached'] = False
+        results[index]['model_version'] = model_version
+        results[index]['embedding'] = encode_embedding(features[row]) if features is not None else None
+
+# Bir kültür kabındaki tüm embriyoları tek istekte analiz et
+@app.route('/api/analyze-embryo/batch', methods=['POST'])
+def analyze_embryo_batch():
     try:
-        print("Tahmin işlemi başlıyor...")
-        # Base64'ten resmi decode et
-        image_bytes = base64.b64decode(image_data.split(',')[1])
-        image = Image.open(io.BytesIO(image_bytes))
-        print(f"Resim başarıyla açıldı. Boyut: {image.size}, Format: {image.format}")
-        
-        # Resmi model için hazırla - eğitim sırasında kullanılan dönüşümlerle tam olarak eşleştir
-        transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5])
-        ])
+        data = request.get_json()
+        images = data.get('images') or []
+        patient_id = data.get('patient_id')
+        doctor_id = data.get('doctor_id')
+        notes = data.get('notes', '')
         
-        print("Resim dönüştürülüyor...")
-        input_tensor = transform(image)
-        print(f"Tensor boyutu: {input_tensor.shape}")
-        input_batch = input_tensor.unsqueeze(0)
-        print(f"Batch tensor boyutu: {input_batch.shape}")
+        if not images or not isinstance(images, list):
+            return jsonify({
+                'success': False,
+                'error': 'Resim listesi bulunamadı'
+            }), 400
         
-        # Model tahmini yap
-        print("Model yükleniyor...")
-        model = load_model()
-        print("Model yüklendi, tahmin yapılıyor...")
+        if len(images) > BATCH_ANALYSIS_MAX_IMAGES:
+            return jsonify({
+                'success': False,
+                'error': f'Tek istekte en fazla {BATCH_ANALYSIS_MAX_IMAGES} resim gönderilebilir'
+            }), 400
         
-        with torch.no_grad():
-            output = model(input_batch)
-            print(f"Model çıktı boyutu: {output.shape}")
-            
-        # En yüksek olasılıklı sınıfı bul
-        _, predicted_idx = torch.max(output, 1)
-        print(f"Tahmin edilen indeks: {predicted_idx.item()}")
-        
-        # main.py'deki sınıf isimleri ile eşleştir
-        class_names = [
-            "2-1-1", "2-1-2", "2-1-3", "2-2-1", "2-2-2", "2-2-3",
-            "2-3-3",
-            "3-1-1", "3-1-2", "3-1-3",
-            "3-2-1", "3-2-2", "3-2-3",
-            "3-3-2", "3-3-3",
-            "4-2-2",
-            "Arrested", "Early", "Morula"
-        ]
-
-
-        # İndeksin sınıf listesinin sınırları içinde olduğundan emin ol
-        if predicted_idx.item() >= len(class_names):
-            print(f"UYARI: Tahmin indeksi ({predicted_idx.item()}) sınıf listesinin uzunluğundan ({len(class_names)}) büyük!")
-            predicted_idx = torch.tensor([len(class_names) - 1])  # Son sınıfı kullan
-        
-        predicted_class = class_names[predicted_idx.item()]
-        print(f"Tahmin edilen sınıf: {predicted_class}")
-        
-        # Tahmin güvenini hesapla
-        probabilities = torch.nn.functional.softmax(output, dim=1)[0]
-        confidence = probabilities[predicted_idx.item()].item() * 100  # Yüzde olarak
-        print(f"Güven skoru: %{round(confidence, 2)}")
-        
-        # Sınıf detaylarını al
-        if predicted_class in EMBRYO_CLASSES:
-            class_details = EMBRYO_CLASSES[predicted_class]
-            print(f"Sınıf detayları: {class_details}")
-        else:
-            print(f"UYARI: {predicted_class} sınıfı EMBRYO_CLASSES sözlüğünde bulunamadı!")
-            class_details = {
-                'hücre_sayısı': 'Bilinmiyor',
-                'fragmentasyon': 'Bilinmiyor',
-                'simetri': 'Bilinmiyor'
-            }
+        if not patient_id or not doctor_id:
+            return jsonify({
+                'success': False,
+                'error': 'Hasta ID ve Doktor ID gereklidir'
+            }), 400
         
-        print("Tahmin işlemi tamamlandı.")
-        return {
+        # Görüntüleri decode et
+        image_bytes_list = []
+        for index, image_data in enumerate(images):
+            try:
+                image_bytes_list.append(decode_image_data(image_data))
+            except Exception:
+                return jsonify({
+                    'success': False,
+                    'error': f'{index + 1}. resim çözümlenemedi'
+                }), 400
+        
+        # Önbellekte olan görüntüler için modeli çalıştırma
+        print(f"Toplu analiz başlıyor: {len(image_bytes_list)} resim")
+        model_version = current_model_version()
+        image_hashes = [image_sha256(image_bytes) for image_bytes in image_bytes_list]
+        results = [None] * len(image_bytes_list)
+        for index, image_hash in enumerate(image_hashes):
+            cached = prediction_cache.get(image_hash, model_version)
+            if cached is not None:
+                results[index] = cached_prediction(cached, model_version)
+        pending = [index for index, result in enumerate(results) if result is None]
+        
+        if pending:
+            # Tüm batch tek bir kuyruk slotu kullanır
+            with admission_controller.slot(doctor_id):
+                predict_pending_batch(image_bytes_list, pending, results)
+        
+        # Görüntüleri kaydet (önbellekteki dosyası duran görüntüler yeniden yazılmaz)
+        filenames = []
+        for index, image_bytes in enumerate(image_bytes_list):
+            unique_filename = existing_upload(results[index])
+            if unique_filename is None:
+                unique_filename = write_upload(image_bytes)
+                prediction_cache.put(image_hashes[index], results[index]['model_version'], results[index]['class'],
+                                     results[index]['confidence'], unique_filename,
+                                     results[index].get('probabilities'), results[index].get('embedding'))
+            filenames.append(unique_filename)
+        
+        # Tüm raporları tek bir transaction içinde kaydet
+        with sqlite3.connect(DB_NAME) as conn:
+            cursor = conn.cursor()
+            for index, result in enumerate(results):
+                cursor.execute('''
+                    INSERT INTO reports (patient_id, doctor_id, image_path, result, confidence, notes, model_version,
+                                         probabilities)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    patient_id,
+                    doctor_id,
+                    filenames[index],
+                    result['class'],
+                    result['confidence'],
+                    notes,
+                    result['model_version'],
+                    probabilities_blob(result)
+                ))
+                result['index'] = index
+                result['report_id'] = cursor.lastrowid
+                result['image_path'] = filenames[index]
+            conn.commit()
+        
+        store_embeddings([(result['report_id'], result.pop('embedding', None)) for result in results])
+        queue_gradcam([(result['image_path'], result['class']) for result in results])
+        
+        return jsonify({
             'success': True,
-            'class': predicted_class,
-            'details': class_details,
-            'confidence': round(confidence, 2)
-        }
+            'count': len(results),
+            'results': results,
+            'message': f'{len(results)} rapor başarıyla kaydedildi'
+        })
         
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
     except Exception as e:
-        return {
+        print(f"Toplu analiz hatası: {str(e)}")
+        return jsonify({
             'success': False,
             'error': str(e)
-        }
+        }), 500
 
-@app.route('/api/analyze-embryo', methods=['POST'])
-def analyze_embryo():
+# Kuyu görüntülerini (N, 224, 224, 3 uint8) tek seferde sınıflandır
+def predict_plate_wells(pixels):
+    if inference_client is not None:
+        # Ayrı servis her kuyuyu ayrı istek olarak alır ve kendi mikro-batch kuyruğunda birleştirir
+        def predict_well(row):
+            from PIL import Image
+            buffer = io.BytesIO()
+            Image.fromarray(pixels[row]).save(buffer, format='PNG')
+            return inference_client.predict(buffer.getvalue())
+        
+        results = [remote_prediction(prediction) for prediction in preprocess_executor.map(predict_well, range(len(pixels)))]
+    else:
+        from preprocessing import image_preprocessor
+        input_batch = image_preprocessor.new_batch(len(pixels))
+        for row in range(len(pixels)):
+            image_preprocessor.normalize(pixels[row], out=input_batch[row])
+        
+        # Tüm kuyular tek forward çağrısında
+        probabilities, model_version, features = model_registry.predict_full(input_batch)
+        results = []
+        for row in range(len(pixels)):
+            result = build_prediction(probabilities[row])
+            result['model_version'] = model_version
+            result['embedding'] = encode_embedding(features[row]) if features is not None else None
+            results.append(result)
+    
+    for result in results:
+        result['cached'] = False
+    return results
+
+# Çok kuyulu plaka görüntüsü: görüntü kuyulara bölünür, tüm kuyular tek forward'da sınıflandırılır
+# ve her kuyu için bir rapor tek transaction'da kaydedilir.
+#   grid: '4x6' gibi satır x sütun düzeni ya da 'auto' (varsayılan, kuyu aralığı görüntüden bulunur)
+#   wells: yalnızca analiz edilecek kuyular (ör. ["A1", "B2"]); boş kuyular atlanabilir
+#   margin: kuyu kenarından kırpılacak pay (hücre boyutuna oranı)
+@app.route('/api/analyze-embryo/plate', methods=['POST'])
+def analyze_embryo_plate():
     try:
         data = request.get_json()
         image_data = data.get('image')
@@ -1123,59 +1919,509 @@ def analyze_embryo():
             return jsonify({
                 'success': False,
                 'error': 'Resim verisi bulunamadı'
-            })
+            }), 400
         
         if not patient_id or not doctor_id:
             return jsonify({
                 'success': False,
                 'error': 'Hasta ID ve Doktor ID gereklidir'
-            })
-            
-        # Analiz sonucunu al
-        result = predict_embryo_class(image_data)
+            }), 400
         
-        if result['success']:
-            # Base64 görüntüyü kaydet
-            image_bytes = base64.b64decode(image_data.split(',')[1])
-            # Benzersiz dosya adı oluştur
-            unique_filename = f"{int(time.time())}_embryo.jpg"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            
-            # Uploads klasörünü oluştur
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            # Dosyayı kaydet
-            with open(filepath, 'wb') as f:
-                f.write(image_bytes)
-            
-            # Veritabanına raporu kaydet
-            with sqlite3.connect(DB_NAME) as conn:
-                cursor = conn.cursor()
+        try:
+            grid = parse_grid(data.get('grid', 'auto'))
+            margin = float(data.get('margin', PLATE_WELL_MARGIN))
+            if not 0 <= margin < 0.5:
+                raise ValueError('Kenar payı 0 ile 0.5 arasında olmalıdır')
+            selected = data.get('wells')
+            if isinstance(selected, str):
+                selected = selected.split(',')
+            image_bytes = decode_image_data(image_data)
+            image, (rows, columns), wells, pixels = tile_plate(image_bytes, grid, margin, selected)
+        except (ValueError, IndexError, OSError) as e:
+            # Geçersiz düzen / kuyu listesi ya da çözümlenemeyen görüntü
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        print(f"Plaka analizi başlıyor: {rows}x{columns} düzen, {len(wells)} kuyu")
+        with admission_controller.slot(doctor_id):
+            results = predict_plate_wells(pixels)
+        
+        # Her kuyunun özgün çözünürlükteki kesiti raporun görüntüsü olarak kaydedilir
+        # (düzen verildiyse plaka küçültülerek decode edildiği için kesitler için tam çözünürlükte yeniden açılır)
+        native, scale = native_image(image_bytes, image)
+        well_images = list(preprocess_executor.map(lambda well: well_image_bytes(native, well['box'], scale), wells))
+        # Aynı saniyedeki plaka analizleri birbirinin kesitlerinin üzerine yazmasın
+        plate_prefix = f"{int(time.time())}_{uuid.uuid4().hex[:8]}_plate"
+        filenames = []
+        for well, well_bytes in zip(wells, well_images):
+            filenames.append(write_upload(well_bytes, f"{plate_prefix}_{well['well']}_embryo.jpg"))
+        
+        # Tüm kuyuların raporları tek bir transaction içinde kaydedilir
+        with sqlite3.connect(DB_NAME) as conn:
+            cursor = conn.cursor()
+            for index, (well, result) in enumerate(zip(wells, results)):
                 cursor.execute('''
-                    INSERT INTO reports (patient_id, doctor_id, image_path, result, confidence, notes)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO reports (patient_id, doctor_id, image_path, result, confidence, notes, model_version,
+                                         probabilities)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     patient_id,
                     doctor_id,
-                    unique_filename,
+                    filenames[index],
                     result['class'],
                     result['confidence'],
-                    notes
+                    f"Kuyu {well['well']}" + (f" - {notes}" if notes else ''),
+                    result['model_version'],
+                    probabilities_blob(result)
                 ))
-                conn.commit()
-                
-                # Eklenen raporun ID'sini al
-                report_id = cursor.lastrowid
-                result['report_id'] = report_id
-                result['message'] = 'Rapor başarıyla kaydedildi'
+                result['well'] = well['well']
+                result['row'] = well['row']
+                result['column'] = well['column']
+                result['box'] = [int(round(value)) for value in well['box']]
+                result['report_id'] = cursor.lastrowid
+                result['image_path'] = filenames[index]
+            conn.commit()
         
-        return jsonify(result)
+        store_embeddings([(result['report_id'], result.pop('embedding', None)) for result in results])
+        queue_gradcam([(result['image_path'], result['class']) for result in results])
+        
+        return jsonify({
+            'success': True,
+            'grid': f'{rows}x{columns}',
+            'count': len(results),
+            'results': results,
+            'message': f'{len(results)} kuyu için rapor başarıyla kaydedildi'
+        })
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        print(f"Plaka analizi hatası: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Zaman atlamalı (time-lapse) dizi: aynı embriyonun kareleri geldikçe sınıflandırılır,
+# evre geçişleri önceki kareler yeniden işlenmeden güncellenir.
+timelapse_store = TimelapseStore(DB_NAME)
+
+# Kare zamanını epoch saniyeye çevir (sayı veya ISO 8601; verilmezse şimdiki zaman)
+def frame_timestamp(value):
+    if value is None or value == '':
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+
+# Tek kareyi sınıflandır: (olasılıklar, model sürümü). Eşzamanlı kareler mikro-batch
+# kuyruğunda tek forward'da birleşir. preprocess_executor içinde çalışır; kabul kuyruğu slotu
+# istek thread'inde alınır (havuz thread'i slot beklerse slot tutan batch/plaka istekleriyle kilitlenir).
+def predict_frame(image_bytes):
+    if inference_client is not None:
+        prediction = inference_client.predict(image_bytes)
+        return prediction['probabilities'], prediction['model_version']
+    probabilities, model_version, _ = inference_batcher.predict(image_to_tensor(image_bytes))
+    return probabilities.tolist(), model_version
+
+# Akıştaki kareyi kabul kuyruğundan geçirip havuza gönder; slot kare bitince bırakılır
+def submit_frame(image_bytes, doctor_id):
+    admission_controller.acquire(doctor_id)
+    start = time.perf_counter()
+    future = preprocess_executor.submit(predict_frame, image_bytes)
+    future.add_done_callback(lambda _: admission_controller.release(time.perf_counter() - start))
+    return future
+
+@app.route('/api/timelapse', methods=['POST'])
+def create_timelapse():
+    try:
+        data = request.get_json()
+        patient_id = data.get('patient_id')
+        doctor_id = data.get('doctor_id')
+        
+        if not patient_id or not doctor_id:
+            return jsonify({
+                'success': False,
+                'error': 'Hasta ID ve Doktor ID gereklidir'
+            }), 400
+        
+        sequence_id = timelapse_store.create(patient_id, doctor_id, data.get('notes', ''))
+        return jsonify({
+            'success': True,
+            'sequence_id': sequence_id,
+            'message': 'Zaman atlamalı dizi oluşturuldu'
+        }), 201
         
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
+        }), 500
+
+# Dizinin NDJSON akışı: her satır {"image": <data URL>, "captured_at": ...}. Kareler okundukça
+# sınıflandırmaya gönderilir; sonuçlar geliş sırasıyla kaydedilip satır satır geri akıtılır.
+def stream_timelapse_frames(sequence_id, doctor_id):
+    pending = deque()
+    
+    def finished(block):
+        # Sıradaki tamamlanmış kareleri tek transaction'da kaydet
+        frames = []
+        while pending and (block or pending[0][1].done()):
+            captured_at, future = pending.popleft()
+            probabilities, model_version = future.result()
+            frames.append((captured_at, probabilities, model_version))
+            block = False
+        if not frames:
+            return []
+        update = timelapse_store.add_frames(sequence_id, frames)
+        lines = [json.dumps(frame, ensure_ascii=False) + '\n' for frame in update['frames']]
+        lines.extend(json.dumps({'transition': transition}, ensure_ascii=False) + '\n'
+                     for transition in update['transitions'])
+        return lines
+    
+    try:
+        while True:
+            line = request.stream.readline(TIMELAPSE_MAX_LINE_BYTES)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            frame = json.loads(line)
+            image_bytes = decode_image_data(frame.get('image') or '')
+            pending.append((frame_timestamp(frame.get('captured_at')),
+                            submit_frame(image_bytes, doctor_id)))
+            # Kuyruk penceresi doluysa en eski karenin bitmesini bekle
+            yield from finished(len(pending) >= TIMELAPSE_STREAM_WINDOW)
+        while pending:
+            yield from finished(True)
+        
+        sequence = timelapse_store.get(sequence_id)
+        yield json.dumps({
+            'done': True,
+            'stage': sequence['stage'],
+            'frame_count': sequence['frame_count']
+        }, ensure_ascii=False) + '\n'
+    except Exception as e:
+        print(f"Zaman atlamalı akış hatası ({sequence_id}): {str(e)}")
+        yield json.dumps({'success': False, 'error': str(e)}, ensure_ascii=False) + '\n'
+
+# Kare ekleme: JSON {"frames": [{"image", "captured_at"}, ...]} ya da application/x-ndjson akışı
+@app.route('/api/timelapse/<sequence_id>/frames', methods=['POST'])
+def add_timelapse_frames(sequence_id):
+    try:
+        sequence = timelapse_store.get(sequence_id)
+        if sequence is None:
+            return jsonify({
+                'success': False,
+                'error': 'Zaman atlamalı dizi bulunamadı'
+            }), 404
+        
+        if request.mimetype == 'application/x-ndjson':
+            return Response(stream_with_context(stream_timelapse_frames(sequence_id, sequence['doctor_id'])),
+                            mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+        
+        frames = (request.get_json() or {}).get('frames') or []
+        if not frames or not isinstance(frames, list):
+            return jsonify({
+                'success': False,
+                'error': 'Kare listesi bulunamadı'
+            }), 400
+        
+        if len(frames) > TIMELAPSE_MAX_FRAMES:
+            return jsonify({
+                'success': False,
+                'error': f'Tek istekte en fazla {TIMELAPSE_MAX_FRAMES} kare gönderilebilir (daha uzun diziler için NDJSON akışı kullanın)'
+            }), 400
+        
+        try:
+            captured = [frame_timestamp(frame.get('captured_at')) for frame in frames]
+            image_bytes_list = [decode_image_data(frame.get('image') or '') for frame in frames]
+        except (ValueError, IndexError):
+            return jsonify({
+                'success': False,
+                'error': 'Kare verisi çözümlenemedi'
+            }), 400
+        
+        # Kareler paralel ön işlenir ve batch kuyruğunda birlikte sınıflandırılır (tek kabul slotuyla)
+        with admission_controller.slot(sequence['doctor_id']):
+            predictions = list(preprocess_executor.map(predict_frame, image_bytes_list))
+        # Zaman sırası korunur; dizideki son kareden eski kareler atlanır
+        order = sorted(range(len(frames)), key=captured.__getitem__)
+        update = timelapse_store.add_frames(sequence_id, [
+            (captured[index], predictions[index][0], predictions[index][1]) for index in order
+        ])
+        
+        return jsonify({
+            'success': True,
+            'sequence_id': sequence_id,
+            'stage': update['stage'],
+            'frames': update['frames'],
+            'transitions': update['transitions']
         })
+        
+    except AdmissionRejected as e:
+        return admission_rejected_response(e)
+    except Exception as e:
+        print(f"Zaman atlamalı kare hatası: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Dizinin zaman çizelgesi: since_frame ile yalnızca yeni kareler, probabilities=1 ile tüm sınıf olasılıkları
+@app.route('/api/timelapse/<sequence_id>', methods=['GET'])
+def get_timelapse(sequence_id):
+    try:
+        sequence = timelapse_store.get(sequence_id)
+        if sequence is None:
+            return jsonify({
+                'success': False,
+                'error': 'Zaman atlamalı dizi bulunamadı'
+            }), 404
+        
+        frames, transitions = timelapse_store.timeline(
+            sequence_id,
+            since_frame=request.args.get('since_frame', 0, type=int),
+            include_probabilities=request.args.get('probabilities') == '1'
+        )
+        return jsonify({
+            'success': True,
+            'sequence': sequence,
+            'frames': frames,
+            'transitions': transitions
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Hastanın embriyolarını transfer önceliği için sırala.
+# Skor saklanan olasılık vektörlerinden vektörel olarak hesaplanır, model çalıştırılmaz.
+#   score=quality (varsayılan): sınıfların genel kalite puanlarına göre beklenen kalite
+#   score=confidence: tahmin güveni
+#   score=class&class=<sınıf>: tek bir sınıfın olasılığı
+#   weights=3-1-1:1,Morula:0.8: özel sınıf ağırlıkları
+# since/until (YYYY-MM-DD) ile tek bir tedavi döngüsünün raporları seçilebilir.
+@app.route('/api/patients/<int:patient_id>/embryo-ranking', methods=['GET'])
+def rank_patient_embryos(patient_id):
+    try:
+        score = request.args.get('score', 'quality')
+        if score not in RANKING_SCORES:
+            return jsonify({
+                'success': False,
+                'message': f"Geçersiz sıralama skoru. Geçerli değerler: {', '.join(RANKING_SCORES)}"
+            }), 400
+        
+        weights = None
+        if request.args.get('weights'):
+            try:
+                weights = parse_weights(request.args['weights'])
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': f'Geçersiz ağırlıklar: {str(e)}'
+                }), 400
+        
+        query = '''
+            SELECT id, doctor_id, image_path, result, confidence, created_at, model_version, probabilities
+            FROM reports
+            WHERE patient_id = ?
+        '''
+        params = [patient_id]
+        if request.args.get('doctor_id'):
+            query += ' AND doctor_id = ?'
+            params.append(request.args['doctor_id'])
+        if request.args.get('since'):
+            query += ' AND date(created_at) >= date(?)'
+            params.append(request.args['since'])
+        if request.args.get('until'):
+            query += ' AND date(created_at) <= date(?)'
+            params.append(request.args['until'])
+        
+        with sqlite3.connect(DB_NAME) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(query, params).fetchall()
+        
+        try:
+            ranked = rank_reports(rows, score, request.args.get('class'), weights)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        limit = request.args.get('limit', type=int)
+        if limit:
+            ranked = ranked[:limit]
+        
+        return jsonify({
+            'success': True,
+            'patient_id': patient_id,
+            'score': 'weights' if weights is not None else score,
+            'count': len(ranked),
+            'rankings': [{
+                'rank': position + 1,
+                'report_id': rows[index]['id'],
+                'doctor_id': rows[index]['doctor_id'],
+                'image_path': rows[index]['image_path'],
+                'result': rows[index]['result'],
+                'confidence': rows[index]['confidence'],
+                'created_at': rows[index]['created_at'],
+                'model_version': rows[index]['model_version'],
+                'score': round(value, 4),
+                # Olasılık vektörü saklanmamış eski raporlarda skor sınıf ve güvenden yaklaşık hesaplanır
+                'approximate': approximate,
+                'top_classes': top_classes
+            } for position, (index, value, approximate, top_classes) in enumerate(ranked)]
+        }), 200
+        
+    except Exception as e:
+        print(f"Embriyo sıralama hatası: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Embriyolar sıralanırken bir hata oluştu',
+            'error': str(e)
+        }), 500
+
+# Benzer embriyolar: raporun ResNet50 öznitelik vektörüne en yakın k geçmiş rapor.
+# Sonuç olarak raporun sınıfı, sonuç (outcome) olarak embriyoya bağlı en son randevu döner.
+@app.route('/api/reports/<int:report_id>/similar', methods=['GET'])
+def similar_embryos(report_id):
+    try:
+        k = request.args.get('k', 10, type=int)
+        if not k or k < 1 or k > SIMILAR_EMBRYOS_MAX_K:
+            return jsonify({
+                'success': False,
+                'message': f'k 1 ile {SIMILAR_EMBRYOS_MAX_K} arasında olmalıdır'
+            }), 400
+        
+        vector = embedding_store.get(report_id)
+        if vector is None:
+            return jsonify({
+                'success': False,
+                'message': 'Bu rapor için öznitelik vektörü bulunamadı'
+            }), 404
+        
+        start = time.perf_counter()
+        neighbours = embedding_index.search(vector, k, exclude=(report_id,))
+        search_ms = (time.perf_counter() - start) * 1000
+        
+        ids = [neighbour_id for neighbour_id, _ in neighbours]
+        placeholders = ','.join('?' * len(ids))
+        with sqlite3.connect(DB_NAME) as conn:
+            conn.row_factory = sqlite3.Row
+            reports = {row['id']: row for row in conn.execute(f'''
+                SELECT id, patient_id, image_path, result, confidence, created_at, model_version
+                FROM reports
+                WHERE id IN ({placeholders})
+            ''', ids)} if ids else {}
+            # Her embriyo için bağlı en son randevu (transfer vb.) sonucu temsil eder
+            outcomes = {row['linked_embryo_id']: row for row in conn.execute(f'''
+                SELECT linked_embryo_id, appointment_type, status, date_time
+                FROM appointments
+                WHERE linked_embryo_id IN ({placeholders})
+                ORDER BY date_time
+            ''', ids)} if ids else {}
+        
+        similar = []
+        for neighbour_id, similarity in neighbours:
+            report = reports.get(neighbour_id)
+            # İndekste kalan ama veritabanından silinmiş raporları atla
+            if report is None:
+                continue
+            outcome = outcomes.get(neighbour_id)
+            similar.append({
+                'report_id': neighbour_id,
+                'similarity': round(similarity, 4),
+                'patient_id': report['patient_id'],
+                'image_path': report['image_path'],
+                'result': report['result'],
+                'confidence': report['confidence'],
+                'created_at': report['created_at'],
+                'model_version': report['model_version'],
+                'outcome': {
+                    'type': outcome['appointment_type'],
+                    'status': outcome['status'],
+                    'date_time': outcome['date_time']
+                } if outcome is not None else None
+            })
+        
+        return jsonify({
+            'success': True,
+            'report_id': report_id,
+            'count': len(similar),
+            'search_ms': round(search_ms, 2),
+            'similar': similar
+        }), 200
+        
+    except Exception as e:
+        print(f"Benzer embriyo arama hatası: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Benzer embriyolar aranırken bir hata oluştu',
+            'error': str(e)
+        }), 500
+
+# Raporun Grad-CAM kaplaması (PNG). Henüz üretilmediyse arka plan kuyruğuna alınır ve
+# 202 + Retry-After döner; üretilmiş kaplama ETag ile koşullu (304) sunulur.
+@app.route('/api/reports/<int:report_id>/gradcam', methods=['GET'])
+def get_report_gradcam(report_id):
+    try:
+        if gradcam_worker is None:
+            return jsonify({
+                'success': False,
+                'message': 'Grad-CAM bu yapılandırmada kullanılamıyor'
+            }), 503
+        
+        with sqlite3.connect(DB_NAME) as conn:
+            row = conn.execute('SELECT image_path, result FROM reports WHERE id = ?', (report_id,)).fetchone()
+        if row is None:
+            return jsonify({
+                'success': False,
+                'message': 'Rapor bulunamadı'
+            }), 404
+        
+        image_path, class_name = row
+        overlay_path = gradcam_worker.path(image_path, class_name)
+        if os.path.exists(overlay_path):
+            response = send_file(overlay_path, mimetype='image/png', conditional=True, etag=True)
+            # URL sabit, sınıf yeniden puanlamada değişebilir: her kullanımda ETag ile doğrulanır
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        
+        if not image_path or not os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], image_path)):
+            return jsonify({
+                'success': False,
+                'message': 'Raporun görüntü dosyası bulunamadı'
+            }), 404
+        
+        if not gradcam_worker.submit(image_path, class_name):
+            response = jsonify({
+                'success': False,
+                'message': 'Grad-CAM kuyruğu dolu, lütfen tekrar deneyin'
+            })
+            response.headers['Retry-After'] = '10'
+            return response, 503
+        
+        response = jsonify({
+            'success': True,
+            'status': 'pending',
+            'message': 'Grad-CAM hazırlanıyor'
+        })
+        response.headers['Retry-After'] = '2'
+        return response, 202
+        
+    except Exception as e:
+        print(f"Grad-CAM hatası: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Grad-CAM alınırken bir hata oluştu',
+            'error': str(e)
+        }), 500
 
 # Appointment endpoints
 # This duplicate route was removed to fix the conflict with the existing create_appointment function
@@ -1580,4 +2826,12 @@ def delete_user():
 
 if __name__ == '__main__':
     init_db()
+    # Sadece API sunan süreçler EMBRYO_PRELOAD_MODEL=0 ile torch yüklemeden açılır;
+    # ayrı çıkarım servisi kullanılıyorsa model bu süreçte hiç yüklenmez
+    if inference_client is None and os.environ.get('EMBRYO_PRELOAD_MODEL', '1') == '1':
+        model_registry.load()
+        # Kayıtlı model dağıtımını uygula ve değişiklikleri izle
+        model_deployment.sync()
+        model_deployment.start()
+    analysis_jobs.recover()
     app.run(debug=True, port=5000)
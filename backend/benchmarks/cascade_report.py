@@ -0,0 +1,110 @@
+"""
+Kademeli (cascade) tahmini yalnizca ResNet50 ile karsilastirir.
+
+Kullanim (backend klasorunden):
+    python benchmarks/cascade_report.py [--images holdout] [--train-data uploads] [--thresholds 0.8 0.9 0.95]
+
+Her esik icin ResNet50'ye yonlendirme (escalation) orani, yalnizca ResNet50'ye gore
+hizlanma ve top-1 uyumu raporlanir. Ogrenci model EMBRYO_CASCADE_MODEL_PATH'ten okunur.
+Ogrencinin damitildigi (distill_student.py --data) goruntulerle olculen uyum iyimserdir;
+--images ile ayrilmis (held-out) bir klasor verin.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from cascade import CASCADE_ARCH, CASCADE_MODEL_PATH, CascadeClassifier
+from inference_backends import create_backend
+from model_registry import INFERENCE_BACKEND, INFERENCE_ENGINE, MODEL_PATH
+from preprocessing import image_preprocessor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_images(folder):
+    paths = sorted(glob.glob(os.path.join(folder, '*')))
+    batch = image_preprocessor.new_batch(len(paths))
+    for row, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            image_preprocessor.preprocess(f.read(), out=batch[row])
+    return batch
+
+
+def run(predict, batch, batch_size):
+    outputs = []
+    start = time.perf_counter()
+    for offset in range(0, len(batch), batch_size):
+        outputs.append(predict(batch[offset:offset + batch_size]))
+    elapsed = time.perf_counter() - start
+    return torch.cat(outputs), elapsed / len(batch) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Kademeli tahmin raporu')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--student', default=CASCADE_MODEL_PATH)
+    parser.add_argument('--arch', default=CASCADE_ARCH)
+    parser.add_argument('--images', default=os.path.join(BACKEND_DIR, 'uploads'))
+    parser.add_argument('--train-data', default=os.path.join(BACKEND_DIR, 'uploads'),
+                        help='Öğrencinin damıtıldığı görüntü klasörü')
+    parser.add_argument('--thresholds', nargs='+', type=float, default=[0.7, 0.8, 0.9, 0.95])
+    parser.add_argument('--batch-size', type=int, default=1)
+    args = parser.parse_args()
+
+    batch = load_images(args.images)
+    if not len(batch):
+        print(f"{args.images} içinde görüntü bulunamadı")
+        return 1
+    images_dir = os.path.abspath(args.images)
+    train_dir = os.path.abspath(args.train_data)
+    if os.path.commonpath([images_dir, train_dir]) in (images_dir, train_dir):
+        print("UYARI: Değerlendirme öğrencinin damıtıldığı görüntülerle yapılıyor; uyum oranları iyimser olabilir.\n")
+
+    teacher = create_backend(INFERENCE_BACKEND, args.model, INFERENCE_ENGINE).load()
+    cascade = CascadeClassifier(args.student, args.arch).load()
+
+    # Isınma
+    teacher.predict(batch[:1])
+    cascade.predict_student(batch[:1])
+
+    expected, teacher_ms = run(teacher.predict, batch, args.batch_size)
+    expected_classes = expected.argmax(dim=1)
+    _, student_ms = run(cascade.predict_student, batch, args.batch_size)
+
+    print(f"{len(batch)} görüntü, batch={args.batch_size}")
+    print(f"Yalnızca ResNet50: {teacher_ms:.2f} ms/görüntü, yalnızca öğrenci: {student_ms:.2f} ms/görüntü\n")
+    print(f"{'eşik':>6} {'yönlendirme':>12} {'ms/görüntü':>11} {'hızlanma':>9} {'uyum':>8} {'öğrenci uyumu':>14}")
+
+    for threshold in args.thresholds:
+        cascade.threshold = threshold
+        escalated = []
+
+        def predict(input_batch):
+            probabilities, rows = cascade.predict_with_escalation(input_batch, teacher.predict)
+            mask = torch.zeros(len(input_batch), dtype=torch.bool)
+            mask[rows] = True
+            escalated.append(mask)
+            return probabilities
+
+        outputs, cascade_ms = run(predict, batch, args.batch_size)
+        escalated = torch.cat(escalated)
+        matches = outputs.argmax(dim=1) == expected_classes
+        answered = ~escalated
+        # Öğrencinin kendi cevap verdiği görüntülerde ResNet50 ile uyum
+        student_agreement = matches[answered].float().mean().item() if answered.any() else float('nan')
+
+        print(f"{threshold:>6.2f} {escalated.float().mean().item() * 100:>11.1f}% {cascade_ms:>11.2f} "
+              f"{teacher_ms / cascade_ms:>8.2f}x {matches.float().mean().item() * 100:>7.1f}% "
+              f"{student_agreement * 100:>13.1f}%")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
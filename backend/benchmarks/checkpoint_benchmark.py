@@ -0,0 +1,86 @@
+"""
+Model dosyasi bicimlerinin yukleme suresini ve surec bellegini karsilastirir.
+
+Kullanim (backend klasorunden):
+    python convert_checkpoint.py --dtype fp32
+    python convert_checkpoint.py --dtype fp16
+    python benchmarks/checkpoint_benchmark.py [--runs 3]
+
+Her olcum yeni bir Python surecinde yapilir. Kirli (dirty) sayfalar sureci basina ek
+maliyettir; mmap ile eslenen temiz (clean) dosya sayfalari tum iscilerce paylasilir
+ve bellek baskisinda diskten yeniden okunabilir.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = r'''
+import json, os, sys, time
+import torch
+from model_registry import ModelRegistry
+registry = ModelRegistry(model_path=sys.argv[1])
+start = time.perf_counter()
+registry.load()
+elapsed = time.perf_counter() - start
+
+memory = {}
+try:
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            if key in ('Rss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'):
+                memory[key] = int(value.split()[0])
+except OSError:
+    pass
+
+print(json.dumps({'load_seconds': elapsed, 'memory_kb': memory}))
+'''
+
+VARIANTS = (
+    ('torch.load (eski)', 'best_resnet50_clean.pth', '0'),
+    ('mmap fp32', 'best_resnet50_clean.fp32.pt', '1'),
+    ('mmap fp16', 'best_resnet50_clean.fp16.pt', '1'),
+)
+
+
+def measure(path, mmap):
+    env = dict(os.environ, EMBRYO_MODEL_MMAP=mmap)
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT, path],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model dosyası yükleme benchmark')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'biçim':<18} {'yükleme (s)':>12} {'RSS (MB)':>9} {'kirli (MB)':>11} {'temiz (MB)':>11}")
+    for label, filename, mmap in VARIANTS:
+        path = os.path.join(BACKEND_DIR, filename)
+        if not os.path.exists(path):
+            print(f"{label:<18} dosya yok: {filename}")
+            continue
+
+        samples = [measure(path, mmap) for _ in range(args.runs)]
+        memory = samples[-1]['memory_kb']
+        dirty = memory.get('Private_Dirty', 0) + memory.get('Shared_Dirty', 0)
+        clean = memory.get('Private_Clean', 0) + memory.get('Shared_Clean', 0)
+        print(f"{label:<18} "
+              f"{statistics.median(s['load_seconds'] for s in samples):>12.3f} "
+              f"{memory.get('Rss', 0) / 1024:>9.1f} "
+              f"{dirty / 1024:>11.1f} "
+              f"{clean / 1024:>11.1f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
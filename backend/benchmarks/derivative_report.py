@@ -0,0 +1,65 @@
+"""
+Yuklenen goruntulerin turev (kucuk resim / onizleme) boyutlarini ve uretim suresini raporlar.
+
+Kullanim (backend klasorunden):
+    python benchmarks/derivative_report.py [--images uploads] [--limit 50]
+
+Turevler gecici bir klasore uretilir; derivatives klasoru degistirilmez. Her boyut ve bicim
+icin orijinale gore ortalama dosya boyutu ve goruntu basina uretim suresi yazdirilir.
+"""
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from image_derivatives import DERIVATIVE_QUALITY, DERIVATIVE_SIZES, DerivativeStore
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Görüntü türevi raporu')
+    parser.add_argument('--images', default=os.path.join(BACKEND_DIR, 'uploads'))
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--sizes', default=DERIVATIVE_SIZES)
+    parser.add_argument('--quality', type=int, default=DERIVATIVE_QUALITY)
+    args = parser.parse_args()
+
+    paths = sorted(path for path in glob.glob(os.path.join(args.images, '*.*'))
+                   if os.path.splitext(path)[1].lower() in ('.jpg', '.jpeg', '.png'))[:args.limit]
+    if not paths:
+        print(f"{args.images} içinde görüntü bulunamadı")
+        return 1
+
+    folder = tempfile.mkdtemp(prefix='derivatives-')
+    try:
+        for path in paths:
+            shutil.copy(path, folder)
+        filenames = [os.path.basename(path) for path in paths]
+        original_kb = sum(os.path.getsize(path) for path in paths) / len(paths) / 1024
+
+        store = DerivativeStore(folder, folder=os.path.join(folder, 'derivatives'), sizes=args.sizes,
+                                quality=args.quality)
+        print(f"{len(paths)} görüntü, orijinal ortalama {original_kb:.1f} KB\n")
+        print(f"{'boyut':>8} {'biçim':>6} {'KB/görüntü':>11} {'oran':>7} {'ms/görüntü':>11}")
+
+        for size in store.sizes:
+            for image_format in store.formats:
+                start = time.perf_counter()
+                targets = [store.get(filename, size, image_format) for filename in filenames]
+                elapsed_ms = (time.perf_counter() - start) / len(filenames) * 1000
+                average_kb = sum(os.path.getsize(target) for target in targets) / len(targets) / 1024
+                print(f"{size:>8} {image_format:>6} {average_kb:>11.1f} {average_kb / original_kb * 100:>6.1f}% "
+                      f"{elapsed_ms:>11.2f}")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Benzer embriyo indeksinin ekleme hizini, sorgu gecikmesini ve dogrulugunu olcer.
+
+Kullanim (backend klasorunden):
+    python benchmarks/embedding_index_benchmark.py [--count 500000] [--queries 200] [--k 10] [--batch 1000]
+
+Gecici bir klasorde kumelenmis sentetik 2048 boyutlu vektorlerle depo olusturulur. Sorgu
+p50/p99 gecikmesi ve tam (2048 boyutlu) taramaya gore recall@k raporlanir.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from embedding_store import EMBEDDING_DIM, INDEX_DIM, BruteForceIndex, EmbeddingStore, encode_embedding
+
+
+def synthetic_vectors(rng, centers, count):
+    # Gerçek özniteliklere benzer şekilde sınıf merkezleri etrafında kümelenmiş vektörler
+    labels = rng.integers(0, len(centers), count)
+    return centers[labels] + rng.standard_normal((count, EMBEDDING_DIM)).astype(np.float32) * 0.5
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Embedding indeksi ölçümü')
+    parser.add_argument('--count', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--batch', type=int, default=1000, help='Tek add_many çağrısındaki kayıt sayısı')
+    parser.add_argument('--index-dim', type=int, default=INDEX_DIM)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((19, EMBEDDING_DIM)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = EmbeddingStore(directory, index_dim=args.index_dim)
+        index = BruteForceIndex(store)
+
+        insert_seconds = 0.0
+        for offset in range(0, args.count, args.batch):
+            size = min(args.batch, args.count - offset)
+            vectors = synthetic_vectors(rng, centers, size)
+            items = [(offset + row + 1, encode_embedding(vector)) for row, vector in enumerate(vectors)]
+            start = time.perf_counter()
+            store.add_many(items)
+            insert_seconds += time.perf_counter() - start
+        print(f"{args.count} vektör eklendi: {args.count / insert_seconds:.0f} kayıt/sn "
+              f"(disk: {sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)) / 1e6:.0f} MB)")
+
+        # Tek kayıtlı artımlı ekleme gecikmesi
+        latencies = []
+        for row in range(100):
+            start = time.perf_counter()
+            store.add(args.count + row + 1, encode_embedding(synthetic_vectors(rng, centers, 1)[0]))
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"Tek kayıt ekleme: p50 {percentile(latencies, 50):.2f} ms, p99 {percentile(latencies, 99):.2f} ms")
+
+        vectors, _, ids = store.snapshot()
+        query_ids = rng.choice(ids, size=min(args.queries, len(ids)), replace=False)
+
+        # Isınma (mmap sayfaları)
+        index.search(store.get(int(query_ids[0])), args.k)
+
+        latencies = []
+        recalls = []
+        for report_id in query_ids.tolist():
+            query = store.get(report_id)
+            start = time.perf_counter()
+            neighbours = index.search(query, args.k, exclude=(report_id,))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+            # Tam tarama ile karşılaştır (parça parça, bellek sınırlı)
+            exact = np.concatenate([
+                np.asarray(vectors[offset:offset + 65536], dtype=np.float32) @ query
+                for offset in range(0, len(vectors), 65536)
+            ])
+            exact[np.flatnonzero(ids == report_id)] = -np.inf
+            expected = set(ids[np.argpartition(-exact, args.k)[:args.k]].tolist())
+            recalls.append(len(expected & {neighbour_id for neighbour_id, _ in neighbours}) / args.k)
+
+        print(f"Sorgu (k={args.k}, izdüşüm={args.index_dim}): p50 {percentile(latencies, 50):.2f} ms, "
+              f"p99 {percentile(latencies, 99):.2f} ms, recall@{args.k} {np.mean(recalls):.3f}")
+        del vectors, ids
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+serve.py icin 1..N isci ile verim olcekleme benchmark'i.
+
+Kullanim (backend klasorunden):
+    python benchmarks/prefork_benchmark.py [--max-workers 4] [--duration 20]
+
+Her isci sayisi icin serve.py gecici bir veritabani kopyasi ve uploads klasoru ile baslatilir,
+tahmin onbellegi kapatilir ve /api/analyze-embryo/upload endpoint'ine esazamanli istek gonderilir.
+Saniyedeki istek, gecikme yuzdelikleri ve surec agacinin toplam PSS bellegi raporlanir
+(PSS paylasilan sayfalari surecler arasinda boler; copy-on-write paylasimi burada gorunur).
+"""
+import argparse
+import glob
+import os
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def pss_mb(root_pid):
+    """
+    Ana surec ve iscilerinin toplam PSS degeri (Linux)
+    """
+    pids = [root_pid]
+    try:
+        with open(f'/proc/{root_pid}/task/{root_pid}/children') as f:
+            pids += [int(pid) for pid in f.read().split()]
+    except OSError:
+        return None
+
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                for line in f:
+                    if line.startswith('Pss:'):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            return None
+    return total_kb / 1024
+
+
+def wait_until_ready(base_url, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/model/health', timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def load_test(url, images, concurrency, duration):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client(offset):
+        nonlocal errors
+        index = offset
+        while time.perf_counter() < stop_at:
+            request = urllib.request.Request(url, data=images[index % len(images)], method='POST',
+                                             headers={'Content-Type': 'application/octet-stream'})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    response.read()
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                with lock:
+                    errors += 1
+            index += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return latencies, errors
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-fork ölçekleme benchmark')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--threads', type=int, default=1, help='İşçi başına torch thread')
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    images = []
+    for path in sorted(glob.glob(os.path.join(BACKEND_DIR, 'uploads', '*'))):
+        with open(path, 'rb') as f:
+            images.append(f.read())
+    if not images:
+        print("uploads/ içinde görüntü bulunamadı")
+        return 1
+
+    with sqlite3.connect(os.path.join(BACKEND_DIR, 'embryo_ai.db')) as conn:
+        patient = conn.execute("SELECT id FROM users WHERE role = 'patient' LIMIT 1").fetchone()
+        doctor = conn.execute("SELECT id FROM users WHERE role = 'doctor' LIMIT 1").fetchone()
+    patient_id = patient[0] if patient else 1
+    doctor_id = doctor[0] if doctor else 1
+
+    worker_counts = sorted({1, 2, 4, 8, args.max_workers} & set(range(1, args.max_workers + 1)))
+    base_url = f'http://127.0.0.1:{args.port}'
+    url = f'{base_url}/api/analyze-embryo/upload?patient_id={patient_id}&doctor_id={doctor_id}'
+
+    print(f"{'işçi':>5} {'istek/s':>9} {'hızlanma':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'hata':>5} {'PSS (MB)':>9}")
+    baseline = None
+    for workers in worker_counts:
+        workdir = tempfile.mkdtemp(prefix='embryo-bench-')
+        shutil.copy(os.path.join(BACKEND_DIR, 'embryo_ai.db'), os.path.join(workdir, 'embryo_ai.db'))
+        env = dict(
+            os.environ,
+            EMBRYO_DB_PATH=os.path.join(workdir, 'embryo_ai.db'),
+            EMBRYO_UPLOAD_FOLDER=os.path.join(workdir, 'uploads'),
+            EMBRYO_PREDICTION_CACHE='0',
+            # Aynı görüntüler tekrar gönderildiği için paylaşılan sonuçlar ölçümü şişirmesin
+            EMBRYO_SINGLE_FLIGHT_LINGER_SECONDS='0'
+        )
+        server = subprocess.Popen(
+            [sys.executable, 'serve.py', '--workers', str(workers), '--threads', str(args.threads),
+             '--host', '127.0.0.1', '--port', str(args.port)],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            if not wait_until_ready(base_url):
+                print(f"{workers:>5} sunucu hazır olmadı")
+                continue
+            latencies, errors = load_test(url, images, concurrency=workers * 2, duration=args.duration)
+            memory = pss_mb(server.pid)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=30)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        throughput = len(latencies) / args.duration
+        baseline = baseline or throughput
+        print(f"{workers:>5} {throughput:>9.2f} {throughput / baseline:>8.2f}x "
+              f"{percentile(latencies, 50) or 0:>9.1f} {percentile(latencies, 99) or 0:>9.1f} "
+              f"{errors:>5} {memory if memory is not None else float('nan'):>9.1f}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
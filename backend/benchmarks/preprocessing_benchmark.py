@@ -0,0 +1,122 @@
+"""
+Eski transforms.Compose on islemesi ile ImagePreprocessor'u karsilastirir.
+
+Kullanim (backend klasorunden):
+    python benchmarks/preprocessing_benchmark.py [--repeat 50] [--size 1600]
+
+uploads/ klasorundeki goruntulere ek olarak, draft modunun etkisini gormek icin
+bu goruntulerden buyutulmus JPEG kopyalar da olusturulur.
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+
+from preprocessing import ImagePreprocessor
+
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads')
+
+# Draft modunda kabul edilen ortalama mutlak fark (normalize edilmiş [-1, 1] aralığında ~2.5/255)
+DRAFT_MEAN_TOLERANCE = 0.02
+# Draft kapalıyken sadece float yuvarlama farkı beklenir
+EXACT_MAX_TOLERANCE = 1e-5
+
+
+def reference_preprocess(image_bytes):
+    # app.py'deki önceki uygulama: her çağrıda Compose oluşturulur
+    image = Image.open(io.BytesIO(image_bytes))
+    transform = transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5])
+    ])
+    return transform(image.convert('RGB'))
+
+
+def load_samples(large_size):
+    samples = []
+    for path in sorted(glob.glob(os.path.join(UPLOAD_FOLDER, '*')))[:10]:
+        with open(path, 'rb') as f:
+            data = f.read()
+        samples.append((os.path.basename(path), data))
+
+        # Aynı görüntünün mikroskop çıktısı boyutunda JPEG kopyası
+        image = Image.open(io.BytesIO(data)).convert('RGB')
+        image = image.resize((large_size, int(large_size * image.height / image.width)), Image.BICUBIC)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=92)
+        samples.append((f"{os.path.basename(path)}@{large_size}.jpg", buffer.getvalue()))
+    return samples
+
+
+def time_per_call(fn, samples, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, data in samples:
+            fn(data)
+    return (time.perf_counter() - start) / (repeat * len(samples)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Görüntü ön işleme mikro-benchmark')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--size', type=int, default=1600, help='Büyük JPEG kopyalarının genişliği')
+    args = parser.parse_args()
+
+    samples = load_samples(args.size)
+    if not samples:
+        print(f"{UPLOAD_FOLDER} içinde görüntü bulunamadı")
+        return 1
+
+    exact = ImagePreprocessor(draft=False)
+    fast = ImagePreprocessor(draft=True)
+
+    # Sayısal eşdeğerlik kontrolü
+    failures = 0
+    print(f"{'görüntü':<36} {'tam max fark':>14} {'draft ort. fark':>16} {'draft max fark':>15}")
+    for name, data in samples:
+        expected = reference_preprocess(data)
+        exact_diff = (exact.preprocess(data) - expected).abs().max().item()
+        draft_diff = (fast.preprocess(data) - expected).abs()
+        print(f"{name:<36} {exact_diff:>14.2e} {draft_diff.mean().item():>16.4f} {draft_diff.max().item():>15.4f}")
+        if exact_diff > EXACT_MAX_TOLERANCE or draft_diff.mean().item() > DRAFT_MEAN_TOLERANCE:
+            failures += 1
+
+    # Hız karşılaştırması
+    torch.set_num_threads(1)
+    small = [s for s in samples if '@' not in s[0]]
+    large = [s for s in samples if '@' in s[0]]
+    print()
+    print(f"{'set':<12} {'Compose (ms)':>14} {'draft=False (ms)':>18} {'draft=True (ms)':>17}")
+    for label, subset in (('orijinal', small), (f'{args.size}px JPEG', large)):
+        reference_ms = time_per_call(reference_preprocess, subset, args.repeat)
+        exact_ms = time_per_call(exact.preprocess, subset, args.repeat)
+        fast_ms = time_per_call(fast.preprocess, subset, args.repeat)
+        print(f"{label:<12} {reference_ms:>14.2f} {exact_ms:>18.2f} {fast_ms:>17.2f}")
+
+    # Önceden ayrılmış batch tensörüne yazma
+    batch = fast.new_batch(len(large))
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for index, (_, data) in enumerate(large):
+            fast.preprocess(data, out=batch[index])
+    batch_ms = (time.perf_counter() - start) / (args.repeat * len(large)) * 1000
+    print(f"{'batch out=':<12} {'':>14} {'':>18} {batch_ms:>17.2f}")
+
+    if failures:
+        print(f"\nUYARI: {failures} görüntü tolerans dışında")
+        return 1
+    print("\nTüm görüntüler tolerans içinde.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+INT8 nicemlenmis modelleri fp32 modelle karsilastirir.
+
+Kullanim (backend klasorunden):
+    python benchmarks/quantization_report.py [--images uploads] [--engines int8-static int8-dynamic]
+
+Her motor icin toplam top-1 uyumu, 19 sinifin her biri icin uyum ve guven kaymasi,
+goruntu basina sure ve serilestirilmis model boyutu raporlanir. int8-dynamic ResNet50'de yalnizca
+son fc katmanini nicemler (tabloda 'fc' ile isaretlenir); onerilen INT8 motoru int8-static'tir.
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from embryo_classes import CLASS_NAMES
+from model_registry import MODEL_PATH, build_model
+from preprocessing import image_preprocessor
+from quantization import CALIBRATION_DIR, load_calibration_batches, quantize_model
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# int8-dynamic ResNet50'de yalnızca son fc katmanını nicemler
+ENGINE_LABELS = {'int8-dynamic': 'int8-dyn (fc)'}
+
+
+def load_images(folder):
+    paths = sorted(glob.glob(os.path.join(folder, '*')))
+    batch = image_preprocessor.new_batch(len(paths))
+    for row, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            image_preprocessor.preprocess(f.read(), out=batch[row])
+    return paths, batch
+
+
+def run(model, batch, batch_size):
+    outputs = []
+    start = time.perf_counter()
+    with torch.no_grad():
+        for offset in range(0, len(batch), batch_size):
+            outputs.append(torch.nn.functional.softmax(model(batch[offset:offset + batch_size]), dim=1))
+    elapsed = time.perf_counter() - start
+    return torch.cat(outputs), elapsed / len(batch) * 1000
+
+
+def serialized_mb(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='INT8 / fp32 karşılaştırma raporu')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--images', default=os.path.join(BACKEND_DIR, 'uploads'))
+    parser.add_argument('--calibration', default=CALIBRATION_DIR)
+    parser.add_argument('--engines', nargs='+', default=['int8-static', 'int8-dynamic'])
+    parser.add_argument('--batch-size', type=int, default=16)
+    args = parser.parse_args()
+
+    paths, batch = load_images(args.images)
+    if not paths:
+        print(f"{args.images} içinde görüntü bulunamadı")
+        return 1
+    if os.path.abspath(args.images) == os.path.abspath(args.calibration):
+        print("UYARI: Değerlendirme ve kalibrasyon aynı görüntülerle yapılıyor; sonuçlar iyimser olabilir.\n")
+
+    state_dict = torch.load(args.model, map_location=torch.device('cpu'))
+    fp32_model = build_model()
+    fp32_model.load_state_dict(state_dict)
+    fp32_model.eval()
+
+    reference, fp32_ms = run(fp32_model, batch, args.batch_size)
+    reference_top = reference.argmax(dim=1)
+    reference_conf = reference.gather(1, reference_top.unsqueeze(1)).squeeze(1)
+
+    print(f"Görüntü sayısı: {len(paths)}")
+    print(f"{'motor':<14} {'top-1 uyum':>11} {'ort. güven kayması':>19} {'ort. L1':>9} {'ms/görüntü':>11} {'boyut (MB)':>11}")
+    print(f"{'fp32':<14} {'-':>11} {'-':>19} {'-':>9} {fp32_ms:>11.2f} {serialized_mb(fp32_model):>11.1f}")
+
+    calibration_batches = None
+    per_engine = {}
+    for engine in args.engines:
+        if engine == 'int8-static' and calibration_batches is None:
+            calibration_batches = load_calibration_batches(args.calibration)
+        fresh = build_model()
+        fresh.load_state_dict(state_dict)
+        fresh.eval()
+        quantized = quantize_model(fresh, state_dict, engine, calibration_batches)
+
+        probabilities, ms = run(quantized, batch, args.batch_size)
+        top = probabilities.argmax(dim=1)
+        agree = (top == reference_top)
+        # Güven kayması: fp32'nin seçtiği sınıfın olasılığındaki değişim (yüzde puan)
+        drift = (probabilities.gather(1, reference_top.unsqueeze(1)).squeeze(1) - reference_conf).abs() * 100
+        l1 = (probabilities - reference).abs().sum(dim=1)
+        per_engine[engine] = (agree, drift)
+
+        print(f"{ENGINE_LABELS.get(engine, engine):<14} {agree.float().mean().item() * 100:>10.1f}% {drift.mean().item():>18.2f}p "
+              f"{l1.mean().item():>9.4f} {ms:>11.2f} {serialized_mb(quantized):>11.1f}")
+
+    # Sınıf bazında (fp32 tahminine göre gruplanmış) uyum ve güven kayması
+    for engine, (agree, drift) in per_engine.items():
+        print(f"\n{ENGINE_LABELS.get(engine, engine)} - sınıf bazında")
+        print(f"{'sınıf':<10} {'n':>5} {'uyum':>8} {'güven kayması':>14}")
+        for index, class_name in enumerate(CLASS_NAMES):
+            mask = reference_top == index
+            count = int(mask.sum().item())
+            if count == 0:
+                print(f"{class_name:<10} {0:>5} {'-':>8} {'-':>14}")
+                continue
+            print(f"{class_name:<10} {count:>5} {agree[mask].float().mean().item() * 100:>7.1f}% "
+                  f"{drift[mask].mean().item():>13.2f}p")
+
+    if 'int8-dynamic' in per_engine:
+        print("\nNot: int8-dynamic yalnızca fc katmanını nicemler, konvolüsyonlar fp32 kalır; önerilen motor int8-static.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""
+app.py icin soguk baslatma suresini ve bellek kullanimini olcer.
+
+Kullanim (backend klasorunden):
+    python benchmarks/startup_benchmark.py [--runs 5]
+
+Iki surec tipi karsilastirilir:
+    api-only   : app modulu ice aktarilir, model yuklenmez (EMBRYO_PRELOAD_MODEL=0)
+    inference  : app ice aktarilir, ardindan model ve on isleme modulleri yuklenir
+Her olcum yeni bir Python surecinde yapilir.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_SCRIPT = r'''
+import json, os, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+error = None
+if sys.argv[1] == 'inference':
+    try:
+        import preprocessing
+        app.model_registry.load()
+    except Exception as e:
+        error = str(e)
+ready = time.perf_counter()
+
+rss_kb = None
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+print(json.dumps({
+    'import_seconds': imported - start,
+    'ready_seconds': ready - start,
+    'rss_mb': rss_kb / 1024 if rss_kb else None,
+    'torch_loaded': 'torch' in sys.modules,
+    'reportlab_loaded': any(name.startswith('reportlab') for name in sys.modules),
+    'error': error
+}))
+'''
+
+
+def measure(mode):
+    env = dict(os.environ, EMBRYO_PRELOAD_MODEL='0')
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT, mode],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    # app.py içe aktarılırken yazdırılan satırları atla, son satır JSON'dur
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Soğuk başlatma benchmark')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'süreç':<11} {'import (s)':>11} {'hazır (s)':>10} {'RSS (MB)':>9} {'torch':>6} {'reportlab':>10}")
+    for mode in ('api-only', 'inference'):
+        samples = [measure(mode) for _ in range(args.runs)]
+        last = samples[-1]
+        print(f"{mode:<11} "
+              f"{statistics.median(s['import_seconds'] for s in samples):>11.3f} "
+              f"{statistics.median(s['ready_seconds'] for s in samples):>10.3f} "
+              f"{statistics.median(s['rss_mb'] for s in samples):>9.1f} "
+              f"{'evet' if last['torch_loaded'] else 'hayır':>6} "
+              f"{'evet' if last['reportlab_loaded'] else 'hayır':>10}")
+        if last['error']:
+            print(f"  UYARI: model yüklenemedi ({last['error']}); süre yalnızca içe aktarmaları kapsar")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
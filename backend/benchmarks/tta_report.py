@@ -0,0 +1,90 @@
+"""
+Test zamani cogaltmanin (TTA) maliyetini ve etkisini raporlar.
+
+Kullanim (backend klasorunden):
+    python benchmarks/tta_report.py [--images uploads] [--thresholds 0.5 0.6 0.8] [--transforms hflip,vflip,rot90,rot180,rot270]
+
+Her esik icin cogaltilan goruntu orani, sinifi degisen goruntu sayisi ve goruntu basina sure
+raporlanir. Karsilastirma icin tum gorunumlerin ayri ayri (sirali istekler gibi) calistirilmasi
+da olculur.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from inference_backends import create_backend
+from model_registry import INFERENCE_BACKEND, INFERENCE_ENGINE, MODEL_PATH
+from preprocessing import image_preprocessor
+from test_time_augmentation import TTA_TRANSFORMS, TRANSFORMS, TestTimeAugmentation
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_images(folder):
+    paths = sorted(glob.glob(os.path.join(folder, '*')))
+    batch = image_preprocessor.new_batch(len(paths))
+    for row, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            image_preprocessor.preprocess(f.read(), out=batch[row])
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TTA raporu')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--images', default=os.path.join(BACKEND_DIR, 'uploads'))
+    parser.add_argument('--thresholds', nargs='+', type=float, default=[0.5, 0.6, 0.7, 0.8])
+    parser.add_argument('--transforms', default=TTA_TRANSFORMS)
+    args = parser.parse_args()
+
+    batch = load_images(args.images)
+    if not len(batch):
+        print(f"{args.images} içinde görüntü bulunamadı")
+        return 1
+
+    backend = create_backend(INFERENCE_BACKEND, args.model, INFERENCE_ENGINE).load()
+    backend.predict(batch[:1])
+
+    # TTA olmadan: görüntü başına tek forward
+    start = time.perf_counter()
+    baseline = torch.cat([backend.predict(batch[row:row + 1]) for row in range(len(batch))])
+    baseline_ms = (time.perf_counter() - start) / len(batch) * 1000
+
+    tta = TestTimeAugmentation(transforms=args.transforms)
+    print(f"{len(batch)} görüntü, {len(tta.transforms)} ek görünüm ({', '.join(tta.transforms)})")
+
+    # Karşılaştırma: tüm görünümler ayrı ayrı istek olarak
+    start = time.perf_counter()
+    for row in range(len(batch)):
+        image = batch[row:row + 1]
+        for name in tta.transforms:
+            backend.predict(TRANSFORMS[name](image))
+    sequential_ms = (time.perf_counter() - start) / len(batch) * 1000 + baseline_ms
+
+    print(f"TTA yok: {baseline_ms:.2f} ms/görüntü, tüm görünümler sırayla: {sequential_ms:.2f} ms/görüntü\n")
+    print(f"{'eşik':>6} {'çoğaltılan':>11} {'ms/görüntü':>11} {'sınıfı değişen':>15}")
+
+    for threshold in args.thresholds:
+        tta.threshold = threshold
+        tta.reset_stats()
+        start = time.perf_counter()
+        for row in range(len(batch)):
+            image = batch[row:row + 1]
+            tta.refine(image, backend.predict(image), backend.predict)
+        elapsed_ms = (time.perf_counter() - start) / len(batch) * 1000
+        stats = tta.stats()
+        print(f"{threshold:>6.2f} {stats['augmentation_rate'] * 100:>10.1f}% {elapsed_ms:>11.2f} {stats['changed']:>15}")
+
+    low_confidence = (baseline.max(dim=1).values < min(args.thresholds)).sum().item()
+    print(f"\nEn düşük eşiğin altında kalan görüntü: {low_confidence}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
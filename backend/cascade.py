@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+
+from embryo_classes import CLASS_NAMES
+from model_artifacts import resolve_path
+
+# Kademeli (cascade) tahmin: önce küçük model, emin değilse ResNet50
+CASCADE_ENABLED = os.environ.get('EMBRYO_CASCADE', '0') == '1'
+# ResNet50 çıktılarına karşı damıtılmış (distill) küçük modelin ağırlıkları
+CASCADE_MODEL_PATH = resolve_path(os.environ.get('EMBRYO_CASCADE_MODEL_PATH', 'embryo_student_resnet18.pth'))
+# Küçük modelin mimarisi: 'resnet18' veya 'mobilenet_v3_small'
+CASCADE_ARCH = os.environ.get('EMBRYO_CASCADE_ARCH', 'resnet18')
+# Küçük modelin cevabının kabul edildiği en düşük softmax güveni (0-1)
+CASCADE_THRESHOLD = float(os.environ.get('EMBRYO_CASCADE_THRESHOLD', '0.9'))
+
+STUDENT_ARCHS = ('resnet18', 'mobilenet_v3_small')
+
+
+def build_student(arch=CASCADE_ARCH, num_classes=len(CLASS_NAMES), pretrained=False):
+    """
+    Kucuk (ogrenci) modelin mimarisini olusturur
+    """
+    import torch
+    from torchvision import models
+
+    from model_registry import attach_classifier_head
+
+    weights = 'DEFAULT' if pretrained else None
+    if arch == 'resnet18':
+        return attach_classifier_head(models.resnet18(weights=weights), num_classes)
+    if arch == 'mobilenet_v3_small':
+        model = models.mobilenet_v3_small(weights=weights)
+        model.classifier[-1] = torch.nn.Linear(model.classifier[-1].in_features, num_classes)
+        return model
+    raise ValueError(f"Geçersiz öğrenci model mimarisi: {arch}")
+
+
+class CascadeClassifier:
+    """
+    Once kucuk modeli calistirir; softmax guveni esigin altinda kalan
+    goruntuler ResNet50'ye (fallback) yonlendirilir.
+    """
+
+    def __init__(self, model_path=CASCADE_MODEL_PATH, arch=CASCADE_ARCH, threshold=CASCADE_THRESHOLD):
+        if arch not in STUDENT_ARCHS:
+            raise ValueError(f"Geçersiz öğrenci model mimarisi: {arch}")
+        self.model_path = model_path
+        self.arch = arch
+        self.threshold = threshold
+        self.module = None
+        self.load_time = None
+
+        self._stats_lock = threading.Lock()
+        self.items = 0
+        self.escalated = 0
+
+    def load(self):
+        import torch
+
+        from model_artifacts import load_model_weights
+        from model_registry import INPUT_SIZE
+
+        start = time.perf_counter()
+        model, _ = load_model_weights(lambda: build_student(self.arch), self.model_path)
+        with torch.no_grad():
+            model(torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE))
+        self.module = model
+        self.load_time = time.perf_counter() - start
+        print(f"Kademeli tahmin modeli hazır: {self.model_path} ({self.arch}, eşik {self.threshold})")
+        return self
+
+    @property
+    def version(self):
+        # Eşik veya öğrenci ağırlıkları değişince sonuçlar da değişebilir
+        try:
+            stat = os.stat(self.model_path)
+            identity = f"{os.path.basename(self.model_path)}-{stat.st_size}-{int(stat.st_mtime)}"
+        except OSError:
+            identity = 'unknown'
+        return f"cascade-{identity}@{self.threshold:g}"
+
+    def predict_student(self, input_batch):
+        import torch
+
+        with torch.no_grad():
+            return torch.nn.functional.softmax(self.module(input_batch), dim=1)
+
+    def predict(self, input_batch, fallback, record=True):
+        """
+        (N, 19) olasiliklari dondurur. fallback(batch) guvensiz satirlar icin ResNet50'dir.
+        record=False ise istatistiklere sayilmaz (golge moddaki aday surum).
+        """
+        return self.predict_with_escalation(input_batch, fallback, record)[0]
+
+    def predict_with_escalation(self, input_batch, fallback, record=True):
+        probabilities = self.predict_student(input_batch)
+        confidence = probabilities.max(dim=1).values
+        escalate = (confidence < self.threshold).nonzero(as_tuple=True)[0]
+        if len(escalate):
+            # Yalnızca emin olunmayan satırlar büyük modelden geçer
+            probabilities[escalate] = fallback(input_batch[escalate])
+
+        if not record:
+            return probabilities, escalate
+        with self._stats_lock:
+            self.items += len(input_batch)
+            self.escalated += len(escalate)
+        return probabilities, escalate
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.items = 0
+            self.escalated = 0
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'model_path': self.model_path,
+                'arch': self.arch,
+                'threshold': self.threshold,
+                'items': self.items,
+                'escalated': self.escalated,
+                'escalation_rate': round(self.escalated / self.items, 4) if self.items else None
+            }
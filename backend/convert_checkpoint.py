@@ -0,0 +1,37 @@
+"""
+best_resnet50_clean.pth dosyasini mmap ile yuklenebilen model dosyasina donusturur.
+
+Kullanim (backend klasorunden):
+    python convert_checkpoint.py [--model best_resnet50_clean.pth] [--dtype fp16] [--output best_resnet50_clean.fp16.pt]
+
+Dosyanin yanina SHA-256 iceren bir manifest (<dosya>.json) yazilir; yuklemede dogrulanir.
+fp16 dosya diskte ve sayfa onbelleginde yarim yer kaplar, yuklenirken float32'ye yukseltilir.
+Yeni dosya EMBRYO_MODEL_PATH ile kullanilir.
+"""
+import argparse
+import os
+import sys
+
+from model_artifacts import ARTIFACT_DTYPES, convert_checkpoint
+from model_registry import MODEL_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Model ağırlıklarını mmap biçimine dönüştür')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--dtype', choices=ARTIFACT_DTYPES, default='fp32')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.model)[0]}.{args.dtype}.pt"
+    manifest = convert_checkpoint(args.model, output, args.dtype)
+
+    print(f"Model dosyası yazıldı: {output}")
+    print(f"  boyut: {manifest['size_bytes'] / (1024 * 1024):.1f} MB ({manifest['dtype']})")
+    print(f"  sha256: {manifest['sha256']}")
+    print(f"Kullanım: EMBRYO_MODEL_PATH={os.path.abspath(output)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
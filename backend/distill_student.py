@@ -0,0 +1,128 @@
+"""
+Kademeli tahmin icin kucuk (ogrenci) modeli ResNet50 ciktilarina karsi damitir (distillation).
+
+Kullanim (backend klasorunden):
+    python distill_student.py --data uploads [--arch resnet18] [--epochs 10] [--pretrained]
+
+Etiket gerekmez: hedefler ResNet50'nin sicaklikla yumusatilmis softmax ciktilaridir.
+Goruntulerin %10'u ayrilir ve egitim sonunda ogrencinin ResNet50 ile uyumu raporlanir.
+Kaydedilen agirliklar EMBRYO_CASCADE_MODEL_PATH ile kullanilir.
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+
+import torch
+
+from cascade import CASCADE_ARCH, CASCADE_MODEL_PATH, STUDENT_ARCHS, build_student
+from inference_backends import EagerBackend
+from model_registry import MODEL_PATH
+from preprocessing import image_preprocessor
+
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png')
+
+
+def find_images(folder):
+    paths = []
+    for pattern in IMAGE_PATTERNS:
+        paths.extend(glob.glob(os.path.join(folder, '**', pattern), recursive=True))
+    return sorted(paths)
+
+
+def load_batch(paths):
+    batch = image_preprocessor.new_batch(len(paths))
+    for row, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            image_preprocessor.preprocess(f.read(), out=batch[row])
+    return batch
+
+
+def teacher_logits(teacher, paths, batch_size):
+    outputs = []
+    with torch.no_grad():
+        for offset in range(0, len(paths), batch_size):
+            outputs.append(teacher(load_batch(paths[offset:offset + batch_size])))
+    return torch.cat(outputs)
+
+
+def agreement(student, paths, targets, batch_size):
+    student.eval()
+    matches = 0
+    with torch.no_grad():
+        for offset in range(0, len(paths), batch_size):
+            predicted = student(load_batch(paths[offset:offset + batch_size])).argmax(dim=1)
+            matches += (predicted == targets[offset:offset + batch_size].argmax(dim=1)).sum().item()
+    return matches / len(paths) if paths else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Öğrenci modeli ResNet50 çıktılarına karşı damıt')
+    parser.add_argument('--data', required=True, help='Görüntü klasörü (alt klasörler dahil)')
+    parser.add_argument('--teacher', default=MODEL_PATH)
+    parser.add_argument('--arch', choices=STUDENT_ARCHS, default=CASCADE_ARCH)
+    parser.add_argument('--output', default=CASCADE_MODEL_PATH)
+    parser.add_argument('--pretrained', action='store_true', help='ImageNet ağırlıklarıyla başla')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--lr', type=float, default=1e-3)
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = find_images(args.data)
+    if len(paths) < 2:
+        print(f"{args.data} içinde yeterli görüntü bulunamadı")
+        return 1
+
+    random.Random(args.seed).shuffle(paths)
+    holdout_size = max(1, len(paths) // 10)
+    holdout, train = paths[:holdout_size], paths[holdout_size:]
+    print(f"{len(train)} eğitim, {len(holdout)} doğrulama görüntüsü")
+
+    # Öğretmen çıktıları bir kez hesaplanır
+    teacher = EagerBackend(args.teacher).load().module
+    train_targets = teacher_logits(teacher, train, args.batch_size)
+    holdout_targets = teacher_logits(teacher, holdout, args.batch_size)
+    del teacher
+
+    torch.manual_seed(args.seed)
+    student = build_student(args.arch, pretrained=args.pretrained)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.lr)
+    scheduler = torch.optim.lr_scheduler.CosineAnnealingLR(optimizer, T_max=args.epochs)
+    temperature = args.temperature
+
+    for epoch in range(args.epochs):
+        student.train()
+        order = torch.randperm(len(train)).tolist()
+        total_loss = 0.0
+        for offset in range(0, len(order), args.batch_size):
+            indices = order[offset:offset + args.batch_size]
+            batch = load_batch([train[i] for i in indices])
+            # Embriyo görüntüleri yatay çevirmeye karşı değişmezdir
+            flip = torch.rand(len(indices)) < 0.5
+            batch[flip] = batch[flip].flip(-1)
+
+            soft_targets = torch.nn.functional.softmax(train_targets[indices] / temperature, dim=1)
+            log_probs = torch.nn.functional.log_softmax(student(batch) / temperature, dim=1)
+            loss = torch.nn.functional.kl_div(log_probs, soft_targets, reduction='batchmean') * temperature ** 2
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item() * len(indices)
+        scheduler.step()
+
+        score = agreement(student, holdout, holdout_targets, args.batch_size)
+        print(f"Epoch {epoch + 1}/{args.epochs}: kayıp {total_loss / len(train):.4f}, "
+              f"ResNet50 ile uyum %{score * 100:.1f}")
+
+    student.eval()
+    torch.save(student.state_dict(), args.output)
+    print(f"Öğrenci model kaydedildi: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
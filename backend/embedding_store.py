@@ -0,0 +1,283 @@
+import os
+import threading
+from contextlib import contextmanager
+
+from model_artifacts import resolve_path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: süreçler arası dosya kilidi yok (geliştirme ortamında tek süreç çalışır)
+    fcntl = None
+
+# Rapor başına ResNet50 özniteliklerinin (son katman öncesi) saklandığı klasör
+EMBEDDING_DIR = resolve_path(os.environ.get('EMBRYO_EMBEDDING_DIR', 'embeddings'))
+# Aday seçimi için rastgele izdüşüm boyutu (vektörler bu boyuta indirgenip taranır)
+INDEX_DIM = int(os.environ.get('EMBRYO_EMBEDDING_INDEX_DIM', '128'))
+# k komşu için izdüşümde seçilip tam vektörle yeniden sıralanan aday çarpanı
+RERANK_FACTOR = int(os.environ.get('EMBRYO_EMBEDDING_RERANK', '20'))
+# Komşu arama yöntemi (ileride 'ivf' / 'hnsw' eklenebilir)
+EMBEDDING_INDEX = os.environ.get('EMBRYO_EMBEDDING_INDEX', 'brute-force')
+
+EMBEDDING_DIM = 2048
+# Vektörler L2-normalize edilip rapor başına 4 KB float16 olarak saklanır
+EMBEDDING_DTYPE = '<f2'
+PROJECTION_SEED = 2048
+
+
+def encode_embedding(features):
+    """
+    Oznitelik vektorunu L2-normalize edip float16 byte dizisine cevirir
+    """
+    import numpy as np
+
+    vector = np.asarray(features, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector = vector / norm
+    return vector.astype(EMBEDDING_DTYPE).tobytes()
+
+
+class EmbeddingStore:
+    """
+    Rapor oznitelik vektorlerini sadece sona ekleme yapilan duz dosyalarda tutar:
+    vectors.f16 (N x 2048 float16), projected-<d>.f32 (N x d izdusum) ve ids.i64 (rapor ID'leri).
+    Dosyalar mmap ile okunur; baska sureclerin ekledigi kayitlar refresh() ile gorunur olur.
+    """
+
+    def __init__(self, directory=EMBEDDING_DIR, dim=EMBEDDING_DIM, index_dim=INDEX_DIM):
+        self.directory = directory
+        self.dim = dim
+        self.index_dim = index_dim
+        self._lock = threading.Lock()
+        self._repaired = False
+        self._projection = None
+        self._count = 0
+        self._vectors = None
+        self._projected = None
+        self._ids = None
+        self._positions = {}
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @property
+    def _files(self):
+        # (dosya, satır başına byte) - ID dosyası en son yazılır
+        return (
+            (self._path('vectors.f16'), self.dim * 2),
+            (self._path(f'projected-{self.index_dim}.f32'), self.index_dim * 4),
+            (self._path('ids.i64'), 8)
+        )
+
+    def projection(self):
+        """
+        Sabit tohumlu Gauss izdusum matrisi (dim x index_dim); her surecte ayni uretilir
+        """
+        import numpy as np
+
+        if self._projection is None:
+            rng = np.random.default_rng(PROJECTION_SEED)
+            matrix = rng.standard_normal((self.dim, self.index_dim)) / np.sqrt(self.index_dim)
+            self._projection = matrix.astype(np.float32)
+        return self._projection
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path('lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _row_counts(self):
+        return [
+            os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+            for path, row_bytes in self._files
+        ]
+
+    def _repair(self):
+        """
+        Yarim kalan yazimlari keser ve eksik izdusum satirlarini (ör. INDEX_DIM degistiyse)
+        tam vektorlerden yeniden hesaplar. Dosya kilidi tutulurken cagrilmalidir.
+        """
+        import numpy as np
+
+        vectors_file, projected_file, ids_file = self._files
+        counts = self._row_counts()
+        count = min(counts[0], counts[2])
+        for path, row_bytes in (vectors_file, ids_file):
+            if os.path.exists(path) and os.path.getsize(path) > count * row_bytes:
+                os.truncate(path, count * row_bytes)
+
+        path, row_bytes = projected_file
+        projected = os.path.getsize(path) // row_bytes if os.path.exists(path) else 0
+        if projected > count:
+            os.truncate(path, count * row_bytes)
+        elif projected < count:
+            print(f"Embedding izdüşümü yeniden hesaplanıyor: {count - projected} kayıt")
+            vectors = np.memmap(vectors_file[0], dtype=EMBEDDING_DTYPE, mode='r', shape=(count, self.dim))
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.truncate(projected * row_bytes)
+                f.seek(projected * row_bytes)
+                for offset in range(projected, count, 65536):
+                    chunk = np.asarray(vectors[offset:offset + 65536], dtype=np.float32)
+                    f.write((chunk @ self.projection()).astype('<f4').tobytes())
+            del vectors
+
+    def _ensure_repaired(self):
+        # Çağıran self._lock'u tutuyor olmalı
+        if not self._repaired:
+            with self._file_lock():
+                self._repair()
+            self._repaired = True
+
+    def refresh(self):
+        """
+        Diskteki yeni kayitlari (baska sureclerin ekledikleri dahil) gorunur yapar, kayit sayisini dondurur
+        """
+        import numpy as np
+
+        with self._lock:
+            self._ensure_repaired()
+            count = min(self._row_counts())
+            if count <= self._count:
+                return self._count
+
+            vectors_file, projected_file, ids_file = self._files
+            self._vectors = np.memmap(vectors_file[0], dtype=EMBEDDING_DTYPE, mode='r', shape=(count, self.dim))
+            self._projected = np.memmap(projected_file[0], dtype='<f4', mode='r', shape=(count, self.index_dim))
+            self._ids = np.memmap(ids_file[0], dtype='<i8', mode='r', shape=(count,))
+            for position, report_id in enumerate(self._ids[self._count:count].tolist(), start=self._count):
+                self._positions[report_id] = position
+            self._count = count
+            return count
+
+    def snapshot(self):
+        """
+        (vektorler, izdusumler, ID'ler) mmap dizilerini dondurur; kayit yoksa None
+        """
+        self.refresh()
+        with self._lock:
+            if not self._count:
+                return None
+            return self._vectors, self._projected, self._ids
+
+    def add_many(self, items):
+        """
+        [(rapor_id, float16 vektor byte'lari)] kayitlarini dosyalarin sonuna ekler
+        """
+        import numpy as np
+
+        items = [(int(report_id), embedding) for report_id, embedding in items if embedding is not None]
+        if not items:
+            return 0
+
+        vectors = np.frombuffer(b''.join(embedding for _, embedding in items), dtype=EMBEDDING_DTYPE)
+        if vectors.size != len(items) * self.dim:
+            raise ValueError(f"Embedding boyutu {self.dim} olmalı")
+        vectors = vectors.reshape(len(items), self.dim)
+        projected = (vectors.astype(np.float32) @ self.projection()).astype('<f4')
+        ids = np.array([report_id for report_id, _ in items], dtype='<i8')
+
+        with self._lock:
+            self._ensure_repaired()
+            with self._file_lock():
+                vectors_file, projected_file, ids_file = self._files
+                for (path, _), data in ((vectors_file, vectors), (projected_file, projected), (ids_file, ids)):
+                    with open(path, 'ab') as f:
+                        f.write(data.tobytes())
+        return len(items)
+
+    def add(self, report_id, embedding):
+        return self.add_many([(report_id, embedding)])
+
+    def position(self, report_id):
+        # Yeniden puanlanan raporlar sona tekrar eklenir; geçerli olan son satırdır
+        with self._lock:
+            return self._positions.get(int(report_id))
+
+    def get(self, report_id):
+        """
+        Raporun float32 oznitelik vektorunu ya da None dondurur
+        """
+        import numpy as np
+
+        self.refresh()
+        with self._lock:
+            position = self._positions.get(int(report_id))
+            if position is None:
+                return None
+            return np.asarray(self._vectors[position], dtype=np.float32)
+
+    def __len__(self):
+        return self.refresh()
+
+
+class BruteForceIndex:
+    """
+    Tum kayitlari vektorel NumPy ile tarar: once d boyutlu izdusumle (N x d matris-vektor
+    carpimi) aday secilir, adaylar tam 2048 boyutlu vektorlerle kosinus benzerligine gore
+    yeniden siralanir. Yeni kayitlar dosyaya eklendigi an aranabilir; ayri bir insa adimi yoktur.
+    """
+
+    def __init__(self, store, rerank_factor=RERANK_FACTOR):
+        self.store = store
+        self.rerank_factor = rerank_factor
+
+    def search(self, vector, k=10, exclude=()):
+        """
+        En benzer k kaydi [(rapor_id, benzerlik)] olarak dondurur
+        """
+        import numpy as np
+
+        snapshot = self.store.snapshot()
+        if snapshot is None:
+            return []
+        vectors, projected, ids = snapshot
+
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(query))
+        if norm > 0:
+            query = query / norm
+
+        exclude = set(exclude)
+        wanted = k + len(exclude)
+        candidate_count = min(len(ids), wanted * self.rerank_factor)
+        scores = projected @ (query @ self.store.projection())
+        if candidate_count < len(ids):
+            candidates = np.argpartition(-scores, candidate_count - 1)[:candidate_count]
+        else:
+            candidates = np.arange(len(ids))
+        # Sıralı okuma mmap sayfalarında daha az rastgele erişim yapar
+        candidates.sort()
+
+        similarities = np.asarray(vectors[candidates], dtype=np.float32) @ query
+        neighbours = []
+        for row in np.argsort(-similarities, kind='stable'):
+            report_id = int(ids[candidates[row]])
+            if report_id in exclude or self.store.position(report_id) != candidates[row]:
+                continue
+            neighbours.append((report_id, float(similarities[row])))
+            if len(neighbours) == k:
+                break
+        return neighbours
+
+
+EMBEDDING_INDEXES = {
+    'brute-force': BruteForceIndex,
+}
+
+
+def create_index(store, name=EMBEDDING_INDEX):
+    if name not in EMBEDDING_INDEXES:
+        raise ValueError(f"Geçersiz embedding indeksi: {name} (geçerli: {', '.join(EMBEDDING_INDEXES)})")
+    return EMBEDDING_INDEXES[name](store)
+
+
+embedding_store = EmbeddingStore()
+embedding_index = create_index(embedding_store)
@@ -248,3 +248,14 @@ EMBRYO_CLASSES = {
         }
     }
 }
+
+# Modelin çıktı indeksleriyle eşleşen sınıf isimleri (eğitimdeki sıra ile aynı)
+CLASS_NAMES = [
+    "2-1-1", "2-1-2", "2-1-3", "2-2-1", "2-2-2", "2-2-3",
+    "2-3-3",
+    "3-1-1", "3-1-2", "3-1-3",
+    "3-2-1", "3-2-2", "3-2-3",
+    "3-3-2", "3-3-3",
+    "4-2-2",
+    "Arrested", "Early", "Morula"
+]
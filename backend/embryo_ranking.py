@@ -0,0 +1,108 @@
+import struct
+
+from embryo_classes import CLASS_NAMES, EMBRYO_CLASSES
+
+# 19 sınıflık olasılık vektörü rapor başına 38 byte'lık float16 (little-endian) blob olarak saklanır
+PROBABILITY_FORMAT = f'<{len(CLASS_NAMES)}e'
+PROBABILITY_DTYPE = '<f2'
+
+# Sıralama skorları: beklenen kalite, tahmin güveni veya tek bir sınıfın olasılığı
+RANKING_SCORES = ('quality', 'confidence', 'class')
+
+
+def encode_probabilities(probabilities):
+    return struct.pack(PROBABILITY_FORMAT, *probabilities)
+
+
+def decode_probabilities(blob):
+    return list(struct.unpack(PROBABILITY_FORMAT, blob))
+
+
+def class_quality(class_name):
+    """
+    Sinifin genel kalite yildizlarindan 0-1 arasi agirlik (1 yildiz = 0, 5 yildiz = 1)
+    """
+    stars = EMBRYO_CLASSES.get(class_name, {}).get('vizuel', {}).get('genel_kalite', '')
+    count = stars.count('★')
+    return (count - 1) / 4 if count else 0.0
+
+
+QUALITY_WEIGHTS = [class_quality(class_name) for class_name in CLASS_NAMES]
+
+
+def parse_weights(text):
+    """
+    '3-1-1:1,Morula:0.8' bicimindeki sinif agirliklarini 19 elemanli listeye cevirir
+    """
+    weights = [0.0] * len(CLASS_NAMES)
+    for item in text.split(','):
+        class_name, _, value = item.partition(':')
+        class_name = class_name.strip()
+        if class_name not in CLASS_NAMES:
+            raise ValueError(f"Bilinmeyen sınıf: {class_name}")
+        weights[CLASS_NAMES.index(class_name)] = float(value)
+    return weights
+
+
+def probability_matrix(rows):
+    """
+    Raporlarin olasilik vektorlerini (N, 19) float32 matrise donusturur. Olasilik vektoru
+    olmayan eski raporlar icin tahmin edilen sinifa guven, kalan olasilik diger siniflara
+    esit dagitilir. (matris, yaklasik_mi maskesi) dondurur.
+    """
+    import numpy as np
+
+    count = len(rows)
+    matrix = np.empty((count, len(CLASS_NAMES)), dtype=np.float32)
+    stored = np.array([row['probabilities'] is not None for row in rows], dtype=bool)
+
+    if stored.any():
+        # Tüm blob'lar tek bir buffer'dan tek seferde çözülür
+        blob = b''.join(row['probabilities'] for row in rows if row['probabilities'] is not None)
+        matrix[stored] = np.frombuffer(blob, dtype=PROBABILITY_DTYPE).reshape(-1, len(CLASS_NAMES))
+
+    for index in np.flatnonzero(~stored):
+        row = rows[index]
+        confidence = min(max((row['confidence'] or 0) / 100.0, 0.0), 1.0)
+        matrix[index] = (1.0 - confidence) / (len(CLASS_NAMES) - 1)
+        if row['result'] in CLASS_NAMES:
+            matrix[index, CLASS_NAMES.index(row['result'])] = confidence
+
+    return matrix, ~stored
+
+
+def rank_reports(rows, score='quality', class_name=None, weights=None, top_k=3):
+    """
+    Raporlari modeli calistirmadan, saklanan olasilik vektorlerinden vektorel olarak siralar.
+    Her rapor icin (indeks, skor, yaklasik_mi, en olasi siniflar) listesini skor sirasiyla dondurur.
+    """
+    import numpy as np
+
+    if score not in RANKING_SCORES:
+        raise ValueError(f"Geçersiz sıralama skoru: {score}")
+    if not rows:
+        return []
+
+    matrix, approximate = probability_matrix(rows)
+    if weights is not None:
+        scores = matrix @ np.asarray(weights, dtype=np.float32)
+    elif score == 'quality':
+        scores = matrix @ np.asarray(QUALITY_WEIGHTS, dtype=np.float32)
+    elif score == 'confidence':
+        scores = matrix.max(axis=1)
+    else:
+        if class_name not in CLASS_NAMES:
+            raise ValueError(f"Bilinmeyen sınıf: {class_name}")
+        scores = matrix[:, CLASS_NAMES.index(class_name)]
+
+    order = np.argsort(-scores, kind='stable')
+    top = np.argsort(-matrix, axis=1)[:, :top_k]
+    return [
+        (
+            int(index),
+            float(scores[index]),
+            bool(approximate[index]),
+            [{'class': CLASS_NAMES[c], 'probability': round(float(matrix[index, c]), 4)} for c in top[index]]
+        )
+        for index in order
+    ]
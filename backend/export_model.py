@@ -0,0 +1,85 @@
+"""
+best_resnet50_clean.pth agirliklarini TorchScript ve ONNX formatlarina aktarir.
+
+Kullanim (backend klasorunden):
+    python export_model.py [--model best_resnet50_clean.pth] [--formats torchscript onnx] [--benchmark]
+
+Disa aktarilan her model eager modelle karsilastirilir. --benchmark ile her arka ucun
+bu makinedeki hizi olculur; EMBRYO_INFERENCE_BACKEND ile en hizlisi secilebilir.
+"""
+import argparse
+import sys
+import time
+
+import torch
+
+from inference_backends import EagerBackend, artifact_path, create_backend, export_onnx, export_torchscript
+from model_registry import INPUT_SIZE, MODEL_PATH
+
+EXPORTERS = {
+    'torchscript': export_torchscript,
+    'onnx': export_onnx
+}
+
+# Dışa aktarılan modelin olasılıklarında kabul edilen en büyük fark
+MAX_PROBABILITY_DIFF = 1e-4
+
+
+def time_backend(backend, batch_size, repeat):
+    batch = torch.randn(batch_size, 3, INPUT_SIZE, INPUT_SIZE)
+    backend.predict(batch)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        backend.predict(batch)
+    return (time.perf_counter() - start) / (repeat * batch_size) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Modeli TorchScript / ONNX formatına aktar')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--formats', nargs='+', choices=sorted(EXPORTERS), default=sorted(EXPORTERS))
+    parser.add_argument('--benchmark', action='store_true', help='Arka uçların hızını ölç')
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 8])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    eager = EagerBackend(args.model).load()
+    sample = torch.randn(4, 3, INPUT_SIZE, INPUT_SIZE)
+    expected = eager.predict(sample)
+
+    backends = {'eager': eager}
+    failed = False
+    for name in args.formats:
+        path = artifact_path(args.model, name)
+        print(f"{name} dışa aktarılıyor: {path}")
+        EXPORTERS[name](eager.module, path)
+
+        try:
+            backend = create_backend(name, args.model).load()
+        except Exception as e:
+            print(f"  {name} yüklenemedi: {str(e)}")
+            failed = True
+            continue
+
+        diff = (backend.predict(sample) - expected).abs().max().item()
+        status = 'tamam' if diff <= MAX_PROBABILITY_DIFF else 'FARK ÇOK BÜYÜK'
+        print(f"  eager ile en büyük olasılık farkı: {diff:.2e} ({status})")
+        failed = failed or diff > MAX_PROBABILITY_DIFF
+        backends[name] = backend
+
+    if args.benchmark:
+        print()
+        header = ''.join(f"{f'batch={size} (ms/görüntü)':>24}" for size in args.batch_sizes)
+        print(f"{'arka uç':<14}{header}")
+        timings = {}
+        for name, backend in backends.items():
+            timings[name] = [time_backend(backend, size, args.repeat) for size in args.batch_sizes]
+            print(f"{name:<14}" + ''.join(f"{value:>24.2f}" for value in timings[name]))
+        fastest = min(timings, key=lambda name: timings[name][-1])
+        print(f"\nBu makinede en hızlı arka uç: {fastest} (EMBRYO_INFERENCE_BACKEND={fastest})")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import os
+import queue
+import threading
+import time
+
+from embryo_classes import CLASS_NAMES
+from model_artifacts import resolve_path
+
+# Yeni raporlar için arka planda Grad-CAM ısı haritası üret (kapatmak için EMBRYO_GRADCAM=0)
+GRADCAM_ENABLED = os.environ.get('EMBRYO_GRADCAM', '1') == '1'
+# Kuyruk birikince tek forward'da işlenen en fazla görüntü sayısı
+GRADCAM_BATCH_SIZE = int(os.environ.get('EMBRYO_GRADCAM_BATCH_SIZE', '8'))
+# Bekleyen en fazla iş; kuyruk doluysa harita ilk istendiğinde üretilir
+GRADCAM_QUEUE_SIZE = int(os.environ.get('EMBRYO_GRADCAM_QUEUE_SIZE', '1000'))
+# Kaplamanın en uzun kenarı (piksel) ve ısı haritasının saydamlığı
+GRADCAM_MAX_SIZE = int(os.environ.get('EMBRYO_GRADCAM_MAX_SIZE', '512'))
+GRADCAM_ALPHA = float(os.environ.get('EMBRYO_GRADCAM_ALPHA', '0.45'))
+# Kaplamaların saklandığı klasör (uploads dışında; kalibrasyon / damıtma uploads'taki görüntüleri okur)
+GRADCAM_DIR = resolve_path(os.environ.get('EMBRYO_GRADCAM_DIR', 'gradcam'))
+
+
+def overlay_filename(image_path, class_name):
+    """
+    Kaplama GRADCAM_DIR altinda goruntu adi ve sinif adiyla saklanir
+    (yeniden puanlamada sinif degisirse eski kaplama kullanilmaz)
+    """
+    stem = os.path.splitext(image_path)[0]
+    return f"{stem}.gradcam-{class_name}.png"
+
+
+def classifier_weights(model):
+    """
+    Son Linear katmanin (19, 2048) agirliklari; dinamik INT8 katmanlarda de-quantize edilir
+    """
+    import torch
+
+    linear = model.fc[-1] if isinstance(model.fc, torch.nn.Sequential) else model.fc
+    weight = linear.weight() if callable(linear.weight) else linear.weight
+    if weight.is_quantized:
+        weight = weight.dequantize()
+    return weight.detach().float()
+
+
+def class_activation_maps(model, input_batch, class_indices):
+    """
+    (N, 7, 7) aktivasyon haritalarini [0, 1] araliginda dondurur.
+    ResNet50'de layer4 -> global ortalama havuzlama -> Linear oldugu icin sinif skorunun
+    layer4 aktivasyonuna gore gradyaninin uzamsal ortalamasi Linear agirliklarinin
+    (1/HW olcekli) kendisidir; Grad-CAM geri yayilim yapmadan tek forward ile hesaplanir.
+    """
+    import torch
+
+    with torch.no_grad():
+        x = model.maxpool(model.relu(model.bn1(model.conv1(input_batch))))
+        activations = model.layer4(model.layer3(model.layer2(model.layer1(x))))
+        weights = classifier_weights(model)[class_indices]
+        cams = torch.relu(torch.einsum('nc,nchw->nhw', weights, activations))
+        peak = cams.flatten(1).max(dim=1).values.clamp(min=1e-8)
+        return cams / peak[:, None, None]
+
+
+def jet_colormap(values):
+    # [0, 1] değerlerini mavi -> yeşil -> kırmızı RGB'ye çevir (H, W, 3 uint8)
+    import numpy as np
+
+    channels = [np.clip(1.5 - np.abs(4 * values - offset), 0, 1) for offset in (3, 2, 1)]
+    return (np.stack(channels, axis=-1) * 255).astype(np.uint8)
+
+
+def render_overlay(image, cam, alpha=GRADCAM_ALPHA, max_size=GRADCAM_MAX_SIZE):
+    """
+    7x7 haritayi goruntu boyutuna buyutup renklendirir ve goruntuyle karistirir (PIL RGB)
+    """
+    import numpy as np
+    from PIL import Image
+
+    image = image.convert('RGB')
+    image.thumbnail((max_size, max_size))
+    heatmap = Image.fromarray((cam * 255).astype(np.uint8), mode='L').resize(image.size, Image.BILINEAR)
+    colored = Image.fromarray(jet_colormap(np.asarray(heatmap, dtype=np.float32) / 255))
+    return Image.blend(image, colored, alpha)
+
+
+class GradCamWorker:
+    """
+    Grad-CAM kaplamalarini tek bir arka plan thread'inde uretir. Kuyruk bosken isler tek tek,
+    birikmisse GRADCAM_BATCH_SIZE'a kadar birlestirilip tek forward'da islenir.
+    Kaplama dosyasi varsa is atlanir; dosya diskteki tek dogruluk kaynagidir.
+    """
+
+    def __init__(self, upload_folder, get_model, folder=GRADCAM_DIR, batch_size=GRADCAM_BATCH_SIZE,
+                 queue_size=GRADCAM_QUEUE_SIZE):
+        # get_model() -> çağrılabilir ResNet50 modülü
+        self.upload_folder = upload_folder
+        self.folder = folder
+        self.get_model = get_model
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.generated = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.last_error = None
+
+    def path(self, image_path, class_name):
+        return os.path.join(self.folder, overlay_filename(image_path, class_name))
+
+    def _start(self):
+        # Çağıran self._lock'u tutuyor olmalı
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='gradcam-worker', daemon=True)
+            self._thread.start()
+
+    def submit(self, image_path, class_name):
+        """
+        Kaplamayi kuyruga ekler; zaten varsa ya da bekliyorsa bir sey yapmaz.
+        Kuyruk doluysa False doner.
+        """
+        if class_name not in CLASS_NAMES or not image_path:
+            return False
+        key = (image_path, class_name)
+        with self._lock:
+            if key in self._pending or os.path.exists(self.path(image_path, class_name)):
+                return True
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self._pending.add(key)
+            self._start()
+        return True
+
+    def is_pending(self, image_path, class_name):
+        with self._lock:
+            return (image_path, class_name) in self._pending
+
+    def _collect(self):
+        # İlk işi bekle, ardından kuyrukta biriken işleri batch'e ekle
+        items = [self._queue.get()]
+        while len(items) < self.batch_size:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                self._generate(items)
+            except Exception as e:
+                print(f"Grad-CAM üretilemedi: {str(e)}")
+                with self._lock:
+                    self.failed += len(items)
+                    self.last_error = str(e)
+            finally:
+                with self._lock:
+                    self._pending.difference_update(items)
+
+    def _generate(self, items):
+        import torch
+        from PIL import Image
+
+        from preprocessing import image_preprocessor
+
+        images = []
+        for image_path, class_name in items:
+            try:
+                image = Image.open(os.path.join(self.upload_folder, image_path))
+                image.load()
+                images.append((image_path, class_name, image))
+            except OSError as e:
+                print(f"Grad-CAM görüntüsü okunamadı ({image_path}): {str(e)}")
+                with self._lock:
+                    self.failed += 1
+        if not images:
+            return
+
+        batch = image_preprocessor.new_batch(len(images))
+        for row, (_, _, image) in enumerate(images):
+            image_preprocessor.preprocess_image(image.convert('RGB'), out=batch[row])
+        class_indices = torch.tensor([CLASS_NAMES.index(class_name) for _, class_name, _ in images])
+
+        start = time.perf_counter()
+        cams = class_activation_maps(self.get_model(), batch, class_indices).numpy()
+        elapsed = time.perf_counter() - start
+
+        for (image_path, class_name, image), cam in zip(images, cams):
+            target = self.path(image_path, class_name)
+            # Yarım yazılmış dosya sunulmasın diye önce geçici dosyaya yazılır
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temporary = f"{target}.{os.getpid()}.tmp"
+            render_overlay(image, cam).save(temporary, format='PNG', optimize=True)
+            os.replace(temporary, target)
+
+        with self._lock:
+            self.generated += len(images)
+            self.batches += 1
+        print(f"Grad-CAM: {len(images)} kaplama üretildi ({elapsed * 1000:.0f} ms)")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': True,
+                'queued': self._queue.qsize(),
+                'generated': self.generated,
+                'batches': self.batches,
+                'average_batch': round(self.generated / self.batches, 2) if self.batches else None,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'last_error': self.last_error
+            }
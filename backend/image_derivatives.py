@@ -0,0 +1,176 @@
+import hashlib
+import os
+import threading
+
+from werkzeug.security import safe_join
+
+from model_artifacts import resolve_path
+from single_flight import SingleFlight
+
+# Türevlerin saklandığı klasör (uploads dışında; uploads/* okuyan kalibrasyon ve benchmark'lar etkilenmesin)
+DERIVATIVE_DIR = resolve_path(os.environ.get('EMBRYO_DERIVATIVE_DIR', 'derivatives'))
+# Türev boyutları: ad:en uzun kenar (piksel)
+DERIVATIVE_SIZES = os.environ.get('EMBRYO_DERIVATIVE_SIZES', 'thumb:160,preview:640')
+# JPEG / WebP kalitesi (1-100)
+DERIVATIVE_QUALITY = int(os.environ.get('EMBRYO_DERIVATIVE_QUALITY', '80'))
+# Türevler yükleme sırasında arka planda hazırlansın (0 ise ilk istekte üretilir)
+DERIVATIVES_ON_UPLOAD = os.environ.get('EMBRYO_DERIVATIVES_ON_UPLOAD', '1') == '1'
+
+DERIVATIVE_MIMETYPES = {
+    'jpeg': 'image/jpeg',
+    'webp': 'image/webp',
+}
+
+
+def parse_sizes(text):
+    sizes = {}
+    for item in text.split(','):
+        name, _, value = item.partition(':')
+        if not name.strip() or not value.strip().isdigit():
+            raise ValueError(f"Geçersiz türev boyutu: {item}")
+        sizes[name.strip()] = int(value)
+    return sizes
+
+
+def webp_supported():
+    from PIL import features
+    return features.check('webp')
+
+
+class DerivativeStore:
+    """
+    Yuklenen goruntulerin kucuk resim / onizleme turevlerini DERIVATIVE_DIR altinda
+    uretir ve saklar. Ayni turev icin eszamanli istekler tek uretimde birlesir; dosya
+    gecici addan atomik olarak yerine konur. Kaynak dosya degisirse turev yeniden uretilir.
+    """
+
+    def __init__(self, upload_folder, folder=DERIVATIVE_DIR, sizes=DERIVATIVE_SIZES, quality=DERIVATIVE_QUALITY):
+        self.upload_folder = upload_folder
+        self.folder = folder
+        self.sizes = parse_sizes(sizes)
+        self.quality = quality
+        self._flights = SingleFlight(linger=0)
+        self._etags = {}
+        self._lock = threading.Lock()
+        self._webp = None
+
+        self.generated = 0
+        self.hits = 0
+
+    @property
+    def formats(self):
+        # Pillow WebP desteği olmadan derlendiyse yalnızca JPEG
+        if self._webp is None:
+            self._webp = webp_supported()
+        return tuple(DERIVATIVE_MIMETYPES) if self._webp else ('jpeg',)
+
+    def source_path(self, filename):
+        path = safe_join(self.upload_folder, filename)
+        if path is None:
+            raise ValueError(f"Geçersiz dosya adı: {filename}")
+        return path
+
+    def path(self, filename, size, image_format):
+        stem = os.path.splitext(filename)[0]
+        path = safe_join(self.folder, f"{stem}.{size}.{image_format}")
+        if path is None:
+            raise ValueError(f"Geçersiz dosya adı: {filename}")
+        return path
+
+    def source_version(self, filename):
+        """
+        Kaynak dosyanin boyut ve degisiklik zamanindan kisa surum anahtari (URL'de ?v= olarak).
+        Dosya degisirse URL de degistigi icin turevler kalici (immutable) onbelleklenebilir.
+        Dosya yoksa None.
+        """
+        try:
+            stat = os.stat(self.source_path(filename))
+        except (OSError, ValueError):
+            return None
+        return hashlib.sha256(f"{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()[:12]
+
+    def get(self, filename, size, image_format):
+        """
+        Turev dosyasinin yolunu dondurur; yoksa ya da kaynaktan eskiyse uretir.
+        Kaynak yoksa FileNotFoundError, gecersiz boyut/bicimde ValueError firlatir.
+        """
+        if size not in self.sizes:
+            raise ValueError(f"Geçersiz boyut: {size} (geçerli: {', '.join(self.sizes)})")
+        if image_format not in self.formats:
+            raise ValueError(f"Geçersiz biçim: {image_format} (geçerli: {', '.join(self.formats)})")
+
+        source = self.source_path(filename)
+        source_mtime = os.stat(source).st_mtime_ns
+        target = self.path(filename, size, image_format)
+        try:
+            if os.stat(target).st_mtime_ns >= source_mtime:
+                with self._lock:
+                    self.hits += 1
+                return target
+        except FileNotFoundError:
+            pass
+
+        self._flights.do(target, lambda: self._generate(source, target, self.sizes[size], image_format))
+        return target
+
+    def _generate(self, source, target, max_side, image_format):
+        from PIL import Image, ImageOps
+
+        with Image.open(source) as image:
+            if image.format == 'JPEG':
+                # Hedef boyuta yakın DCT ölçeğinde decode et
+                image.draft('RGB', (max_side, max_side))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            temporary = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            if image_format == 'webp':
+                image.save(temporary, format='WEBP', quality=self.quality, method=4)
+            else:
+                image.save(temporary, format='JPEG', quality=self.quality, optimize=True, progressive=True)
+            os.replace(temporary, target)
+
+        with self._lock:
+            self.generated += 1
+        return target
+
+    def generate_all(self, filename):
+        """
+        Yukleme sirasinda tum boyut ve bicimleri hazirlar; hata yuklemeyi etkilemez
+        """
+        for size in self.sizes:
+            for image_format in self.formats:
+                try:
+                    self.get(filename, size, image_format)
+                except Exception as e:
+                    print(f"Görüntü türevi üretilemedi ({filename}, {size}, {image_format}): {str(e)}")
+                    return
+
+    def etag(self, path):
+        """
+        Dosya iceriginin SHA-256 ozetinden guclu ETag; boyut ve degisiklik zamanina gore onbelleklenir
+        """
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._etags.get(path)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+        with open(path, 'rb') as f:
+            etag = hashlib.sha256(f.read()).hexdigest()[:32]
+        with self._lock:
+            self._etags[path] = (key, etag)
+        return etag
+
+    def stats(self):
+        with self._lock:
+            return {
+                'sizes': self.sizes,
+                'formats': list(self.formats),
+                'generated': self.generated,
+                'hits': self.hits
+            }
@@ -0,0 +1,191 @@
+import os
+
+import torch
+
+from model_artifacts import load_model_weights
+from model_registry import INPUT_SIZE, build_model, model_nbytes
+
+# Dışa aktarılmış model dosyaları (verilmezse ağırlık dosyasının yanına yazılır)
+TORCHSCRIPT_PATH = os.environ.get('EMBRYO_TORCHSCRIPT_PATH')
+ONNX_PATH = os.environ.get('EMBRYO_ONNX_PATH')
+ONNX_OPSET = 13
+
+
+def artifact_path(model_path, backend_name):
+    """
+    Bir arka uc icin disa aktarilmis model dosyasinin yolu
+    """
+    stem = os.path.splitext(model_path)[0]
+    if backend_name == 'torchscript':
+        return TORCHSCRIPT_PATH or f"{stem}.torchscript.pt"
+    if backend_name == 'onnx':
+        return ONNX_PATH or f"{stem}.onnx"
+    return model_path
+
+
+class InferenceBackend:
+    """
+    Cikarim arka uclari icin ortak arayuz.
+    predict() (N, 3, 224, 224) float32 tensor alir ve (N, 19) softmax olasiliklarini dondurur.
+    """
+
+    name = None
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        # Eager/TorchScript için çağrılabilir modül, ONNX Runtime için None
+        self.module = None
+
+    def load(self):
+        raise NotImplementedError
+
+    def predict(self, input_batch):
+        raise NotImplementedError
+
+    def predict_with_features(self, input_batch):
+        """
+        (olasiliklar, (N, 2048) sondan bir onceki katman ozellikleri) dondurur.
+        Ozellikleri veremeyen arka uclarda ikinci eleman None'dir.
+        """
+        return self.predict(input_batch), None
+
+    def nbytes(self):
+        return model_nbytes(self.module) if self.module is not None else None
+
+
+class EagerBackend(InferenceBackend):
+    name = 'eager'
+
+    def __init__(self, model_path, engine='fp32'):
+        super().__init__(model_path)
+        self.engine = engine
+
+    def load(self):
+        # Ağırlıklar mmap ile dosyadan eşlenir ve sağlama toplamı doğrulanır
+        model, checkpoint = load_model_weights(build_model, self.model_path)
+
+        # İsteğe bağlı INT8 nicemleme (torch.quantization yalnızca gerekirse içe aktarılır)
+        if self.engine != 'fp32':
+            from quantization import quantize_model
+            model = quantize_model(model, checkpoint, self.engine)
+
+        self.module = model
+        return self
+
+    def predict(self, input_batch):
+        with torch.no_grad():
+            output = self.module(input_batch)
+        return torch.nn.functional.softmax(output, dim=1)
+
+    def predict_with_features(self, input_batch):
+        # Statik INT8 modelde katmanlar arası tensörler nicemlenmiştir
+        if self.engine == 'int8-static':
+            return self.predict(input_batch), None
+
+        # torchvision ResNet.forward ile aynı adımlar; havuzlama çıktısı ayrıca döndürülür
+        model = self.module
+        with torch.no_grad():
+            x = model.maxpool(model.relu(model.bn1(model.conv1(input_batch))))
+            x = model.layer4(model.layer3(model.layer2(model.layer1(x))))
+            features = torch.flatten(model.avgpool(x), 1)
+            output = model.fc(features)
+        return torch.nn.functional.softmax(output, dim=1), features
+
+
+class TorchScriptBackend(InferenceBackend):
+    name = 'torchscript'
+
+    def load(self):
+        path = artifact_path(self.model_path, self.name)
+        module = torch.jit.load(path, map_location=torch.device("cpu"))
+        module.eval()
+        # Dondurulmuş grafikte Conv+BN birleştirme gibi çıkarım optimizasyonları
+        if hasattr(torch.jit, 'optimize_for_inference'):
+            module = torch.jit.optimize_for_inference(module)
+        self.module = module
+        return self
+
+    def predict(self, input_batch):
+        with torch.no_grad():
+            output = self.module(input_batch)
+        return torch.nn.functional.softmax(output, dim=1)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    name = 'onnx'
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        self.session = None
+        self.input_name = None
+
+    def load(self):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise RuntimeError("ONNX arka ucu için onnxruntime paketi kurulmalıdır")
+
+        path = artifact_path(self.model_path, self.name)
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = torch.get_num_threads()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        return self
+
+    def predict(self, input_batch):
+        logits = self.session.run(None, {self.input_name: input_batch.numpy()})[0]
+        return torch.nn.functional.softmax(torch.from_numpy(logits), dim=1)
+
+    def nbytes(self):
+        try:
+            return os.path.getsize(artifact_path(self.model_path, self.name))
+        except OSError:
+            return None
+
+
+INFERENCE_BACKENDS = {
+    'eager': EagerBackend,
+    'torchscript': TorchScriptBackend,
+    'onnx': OnnxRuntimeBackend
+}
+
+
+def create_backend(name, model_path, engine='fp32'):
+    if name not in INFERENCE_BACKENDS:
+        raise ValueError(f"Geçersiz çıkarım arka ucu: {name}")
+    if name == 'eager':
+        return EagerBackend(model_path, engine)
+    if engine != 'fp32':
+        raise ValueError(f"{engine} motoru yalnızca eager arka ucu ile kullanılabilir")
+    return INFERENCE_BACKENDS[name](model_path)
+
+
+def export_torchscript(model, path):
+    """
+    Eager modeli izleyip (trace) dondurur ve kaydeder
+    """
+    example = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    frozen = torch.jit.freeze(traced)
+    frozen.save(path)
+    return path
+
+
+def export_onnx(model, path, opset=ONNX_OPSET):
+    """
+    Eager modeli dinamik batch boyutlu ONNX grafigine aktarir
+    """
+    example = torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            example,
+            path,
+            input_names=['input'],
+            output_names=['logits'],
+            dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+            opset_version=opset
+        )
+    return path
@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from model_registry import model_registry
+
+# Bir forward çağrısında birleştirilecek en fazla istek sayısı
+MAX_BATCH_SIZE = int(os.environ.get('EMBRYO_BATCH_MAX_SIZE', '8'))
+# İlk istek geldikten sonra diğer istekler için beklenecek en uzun süre (ms)
+MAX_WAIT_MS = float(os.environ.get('EMBRYO_BATCH_MAX_WAIT_MS', '5'))
+
+
+class InferenceBatcher:
+    """
+    Eşzamanlı tahmin isteklerini kısa bir pencere boyunca toplayıp
+    tek bir batch forward çağrısı ile çalıştırır.
+    run_batch(batch) -> (çıktılar, model sürümü, özellikler ya da None) döndürür; her istek
+    kendi Future nesnesi üzerinden (çıktı satırı, model sürümü, özellik satırı) sonucunu alır.
+    """
+
+    def __init__(self, run_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # İstatistikler
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self._latencies = deque(maxlen=1000)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name='inference-batcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, input_tensor):
+        """
+        Tek bir (3, 224, 224) tensörü kuyruğa ekler ve Future döndürür
+        """
+        self.start()
+        future = Future()
+        self._queue.put((input_tensor, future, time.perf_counter()))
+        return future
+
+    def predict(self, input_tensor, timeout=None):
+        return self.submit(input_tensor).result(timeout=timeout)
+
+    def _collect(self):
+        # İlk isteği bekle, ardından pencere dolana veya batch dolana kadar topla
+        items = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    items.append(self._queue.get_nowait())
+                else:
+                    items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        # Kuyruk thread'i ilk istekle başlar; torch o ana kadar içe aktarılmaz
+        import torch
+
+        while True:
+            items = self._collect()
+            # İptal edilmiş istekleri atla
+            live = [item for item in items if item[1].set_running_or_notify_cancel()]
+            if not live:
+                continue
+
+            try:
+                batch = torch.stack([tensor for tensor, _, _ in live])
+                outputs, version, features = self.run_batch(batch)
+            except Exception as e:
+                print(f"Batch tahmin hatası: {str(e)}")
+                for _, future, _ in live:
+                    future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for row, (_, future, _) in enumerate(live):
+                future.set_result((outputs[row], version, features[row] if features is not None else None))
+
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(live)
+                self.largest_batch = max(self.largest_batch, len(live))
+                self._latencies.extend(finished - enqueued for _, _, enqueued in live)
+
+    def stats(self):
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            batches = self.batches
+            items = self.items
+            largest = self.largest_batch
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p / 100.0 * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 2)
+
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self._queue.qsize(),
+            'batches': batches,
+            'items': items,
+            'avg_batch_size': round(items / batches, 2) if batches else None,
+            'largest_batch': largest,
+            'latency_p50_ms': percentile(50),
+            'latency_p99_ms': percentile(99)
+        }
+
+
+# Uygulama genelinde paylaşılan kuyruk
+inference_batcher = InferenceBatcher(model_registry.predict_full)
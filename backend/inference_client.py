@@ -0,0 +1,143 @@
+import http.client
+import json
+import os
+import socket
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+from admission import AdmissionRejected
+
+# Ayrı çıkarım servisinin adresi; boşsa model Flask sürecinde çalıştırılır.
+# Örnekler: unix:///tmp/embryo-inference.sock, http://127.0.0.1:8000
+INFERENCE_URL = os.environ.get('EMBRYO_INFERENCE_URL', '')
+# Tek bir tahmin isteği için zaman aşımı (saniye)
+INFERENCE_TIMEOUT = float(os.environ.get('EMBRYO_INFERENCE_TIMEOUT', '30'))
+# Servisten alınan model sürümünün yeniden sorgulanma aralığı (saniye)
+MODEL_VERSION_TTL = 30
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    TCP yerine yerel Unix soketi uzerinden HTTP baglantisi
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+class InferenceClient:
+    """
+    inference_service.py'deki /predict endpoint'ine baglanan istemci.
+    Her thread kendi keep-alive baglantisini kullanir.
+    """
+
+    def __init__(self, url, timeout=INFERENCE_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        parts = urlsplit(url)
+        if parts.scheme == 'unix':
+            self.socket_path = unquote(parts.netloc + parts.path)
+            self.host = None
+            self.port = None
+        elif parts.scheme == 'http':
+            self.socket_path = None
+            self.host = parts.hostname
+            self.port = parts.port or 80
+        else:
+            raise ValueError(f"Desteklenmeyen çıkarım servisi adresi: {url}")
+
+        self._local = threading.local()
+        self._version = None
+        self._version_checked = 0.0
+        self._version_lock = threading.Lock()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.socket_path:
+                conn = UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+            else:
+                conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _request(self, method, path, body=None, headers=None):
+        """
+        (durum kodu, JSON govde, yanit basliklari) dondurur
+        """
+        # Sunucu boşta kalan keep-alive bağlantısını kapatmış olabilir; bir kez yeniden dene
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                payload = response.read()
+                return response.status, json.loads(payload) if payload else {}, response.headers
+            except (ConnectionError, http.client.HTTPException, socket.timeout, OSError):
+                self._reset()
+                if attempt == 1:
+                    raise RuntimeError(f"Çıkarım servisine ulaşılamadı: {self.url}")
+            except ValueError:
+                self._reset()
+                raise RuntimeError("Çıkarım servisinden geçersiz yanıt alındı")
+
+    def predict(self, image_bytes):
+        """
+        {'class', 'confidence', 'model_version'} dondurur; hata durumunda RuntimeError.
+        Servis mesgulse (503) AdmissionRejected firlatilir, Flask tarafi 429 + Retry-After doner.
+        """
+        status, data, headers = self._request('POST', '/predict', body=image_bytes, headers={
+            'Content-Type': 'application/octet-stream'
+        })
+        if status == 503:
+            retry_after = headers.get('Retry-After', '1')
+            raise AdmissionRejected(data.get('error') or 'Çıkarım servisi meşgul, lütfen tekrar deneyin',
+                                    int(retry_after) if retry_after.isdigit() else 1)
+        if status != 200 or not data.get('success'):
+            raise RuntimeError(data.get('error') or f"Çıkarım servisi hatası (HTTP {status})")
+
+        with self._version_lock:
+            self._version = data['model_version']
+            self._version_checked = time.monotonic()
+        return data
+
+    def health(self):
+        try:
+            status, data, _ = self._request('GET', '/health')
+        except RuntimeError as e:
+            return {'success': False, 'error': str(e)}
+        data['success'] = status == 200 and data.get('success', False)
+        return data
+
+    @property
+    def model_version(self):
+        # Önbellek anahtarı için servisteki modelin sürümü
+        with self._version_lock:
+            if self._version is not None and time.monotonic() - self._version_checked < MODEL_VERSION_TTL:
+                return self._version
+
+        status, data, _ = self._request('GET', '/health')
+        if status != 200:
+            raise RuntimeError(data.get('error') or 'Çıkarım servisi hazır değil')
+        with self._version_lock:
+            self._version = data['model']['version']
+            self._version_checked = time.monotonic()
+            return self._version
+
+
+# Flask tarafında paylaşılan istemci (EMBRYO_INFERENCE_URL verilmemişse None)
+inference_client = InferenceClient(INFERENCE_URL) if INFERENCE_URL else None
@@ -0,0 +1,244 @@
+"""
+Bagimsiz asenkron cikarim servisi (FastAPI / ASGI).
+
+Kullanim (backend klasorunden):
+    uvicorn inference_service:app --port 8000
+    uvicorn inference_service:app --uds /tmp/embryo-inference.sock
+
+Model surum yonetimi (X-Admin-Token): POST /model/versions, POST /model/shadow/promote,
+DELETE /model/shadow. Degisiklikler Flask API'dekiyle ayni paylasilan dagitim dosyasina
+yazilir; servisin tum surecleri (uvicorn --workers) degisikligi uygular.
+
+POST /predict hem frontend'in gonderdigi multipart 'file' alanini hem de Flask API'nin
+gonderdigi ham application/octet-stream govdesini kabul eder. Ön isleme sinirli bir
+thread havuzunda, model cagrisi paylasilan mikro-batch kuyrugunda yapilir; event loop
+hicbir zaman bloklanmaz. Flask API bu servise EMBRYO_INFERENCE_URL ile baglanir.
+"""
+import asyncio
+import base64
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from embedding_store import encode_embedding
+from embryo_classes import CLASS_NAMES
+from inference_batcher import inference_batcher
+from model_artifacts import resolve_path
+from model_registry import model_deployment, model_registry
+
+# Ön işleme (decode + resize) için thread sayısı
+INFERENCE_WORKERS = int(os.environ.get('EMBRYO_INFERENCE_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Aynı anda işlenen en fazla istek; aşılırsa 503 + Retry-After döner
+INFERENCE_MAX_PENDING = int(os.environ.get('EMBRYO_INFERENCE_MAX_PENDING', '64'))
+# Tek görüntü için en büyük gövde boyutu (byte)
+INFERENCE_MAX_UPLOAD_BYTES = int(os.environ.get('EMBRYO_MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+
+# Model yönetimi endpoint'leri için gizli anahtar (X-Admin-Token); verilmezse bu endpoint'ler kapalıdır
+MODEL_ADMIN_TOKEN = os.environ.get('EMBRYO_ADMIN_TOKEN')
+
+preprocess_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix='inference-preprocess')
+pending_requests = 0
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Model ilk istekten önce yüklenir; yükleme event loop'u bloklamasın
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(preprocess_executor, model_registry.load)
+    # Kayıtlı model dağıtımını uygula ve değişiklikleri izle
+    await loop.run_in_executor(preprocess_executor, model_deployment.sync)
+    model_deployment.start()
+    yield
+    preprocess_executor.shutdown(wait=False)
+
+
+app = FastAPI(title='Embryo AI Inference', lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+
+
+def error_response(status_code, message, headers=None):
+    return JSONResponse({'success': False, 'error': message}, status_code=status_code, headers=headers)
+
+
+def image_to_tensor(image_bytes):
+    from preprocessing import image_preprocessor
+    return image_preprocessor.preprocess(image_bytes)
+
+
+def prediction_from_probabilities(probabilities, model_version, features=None):
+    predicted_idx = min(int(probabilities.argmax().item()), len(CLASS_NAMES) - 1)
+    predicted_class = CLASS_NAMES[predicted_idx]
+    confidence = round(probabilities[predicted_idx].item() * 100, 2)
+    return {
+        'success': True,
+        'class': predicted_class,
+        'confidence': confidence,
+        'model_version': model_version,
+        # CLASS_NAMES sırasıyla 19 sınıfın olasılıkları
+        'probabilities': probabilities.tolist(),
+        # UploadForm.js sözleşmesi: her embriyo için derece
+        'embryos': [{'grade': predicted_class, 'confidence': confidence}],
+        # Benzer embriyo araması için L2-normalize float16 öznitelik vektörü (base64)
+        'embedding': base64.b64encode(encode_embedding(features)).decode('ascii') if features is not None else None
+    }
+
+
+async def read_image(request):
+    if request.headers.get('content-type', '').startswith('multipart/form-data'):
+        form = await request.form()
+        upload = form.get('file') or form.get('image')
+        if upload is None or isinstance(upload, str):
+            return None
+        return await upload.read(INFERENCE_MAX_UPLOAD_BYTES + 1)
+
+    # Content-Length olmayan (chunked) gövde de sınırı aşar aşmaz kesilir; bellekte sınırdan fazlası tutulmaz
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > INFERENCE_MAX_UPLOAD_BYTES:
+            break
+    return b''.join(chunks)
+
+
+@app.post('/predict')
+async def predict(request: Request):
+    global pending_requests
+
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > INFERENCE_MAX_UPLOAD_BYTES:
+        return error_response(413, 'Resim dosyası çok büyük')
+
+    if pending_requests >= INFERENCE_MAX_PENDING:
+        return error_response(503, 'Çıkarım servisi meşgul, lütfen tekrar deneyin', {'Retry-After': '1'})
+
+    # Sayaç yalnızca event loop thread'inde değişir, kilit gerekmez
+    pending_requests += 1
+    try:
+        image_bytes = await read_image(request)
+        if not image_bytes:
+            return error_response(400, 'Resim verisi bulunamadı')
+        if len(image_bytes) > INFERENCE_MAX_UPLOAD_BYTES:
+            return error_response(413, 'Resim dosyası çok büyük')
+
+        loop = asyncio.get_running_loop()
+        try:
+            input_tensor = await loop.run_in_executor(preprocess_executor, image_to_tensor, image_bytes)
+        except Exception:
+            return error_response(400, 'Resim verisi çözümlenemedi')
+
+        try:
+            probabilities, model_version, features = await asyncio.wrap_future(inference_batcher.submit(input_tensor))
+        except Exception as e:
+            print(f"Tahmin hatası: {str(e)}")
+            return error_response(500, str(e))
+
+        return prediction_from_probabilities(probabilities, model_version, features)
+    finally:
+        pending_requests -= 1
+
+
+def admin_error(request):
+    token = request.headers.get('x-admin-token', '')
+    if not MODEL_ADMIN_TOKEN or not hmac.compare_digest(token, MODEL_ADMIN_TOKEN):
+        return error_response(403, 'Bu işlem için yetkiniz yok')
+    return None
+
+
+async def run_blocking(fn, *args):
+    # Dağıtım dosyası kilidi / yazımı event loop'u bloklamasın
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+@app.post('/model/versions')
+async def deploy_model_version(request: Request):
+    error = admin_error(request)
+    if error is not None:
+        return error
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = {}
+    if not isinstance(data, dict) or not data.get('model_path'):
+        return error_response(400, 'Model dosyası yolu gereklidir')
+
+    model_path = resolve_path(data['model_path'])
+    if not os.path.isfile(model_path):
+        return error_response(404, 'Model dosyası bulunamadı')
+    try:
+        sample_rate = float(data.get('sample_rate', 0.1))
+    except (TypeError, ValueError):
+        return error_response(400, 'Geçersiz örnekleme oranı')
+
+    deployment = await run_blocking(model_deployment.deploy, model_path, data.get('version'),
+                                    bool(data.get('shadow')), sample_rate)
+    return JSONResponse({
+        'success': True,
+        'message': 'Model sürümü arka planda yükleniyor',
+        'deployment': deployment,
+        'model': model_registry.status()
+    }, status_code=202)
+
+
+@app.post('/model/shadow/promote')
+async def promote_shadow_model(request: Request):
+    error = admin_error(request)
+    if error is not None:
+        return error
+
+    shadow = model_registry.status()['shadow']
+    try:
+        deployment = await run_blocking(model_deployment.promote)
+    except RuntimeError as e:
+        return error_response(409, str(e))
+    return JSONResponse({'success': True, 'shadow': shadow, 'deployment': deployment}, status_code=202)
+
+
+@app.delete('/model/shadow')
+async def stop_shadow_model(request: Request):
+    error = admin_error(request)
+    if error is not None:
+        return error
+
+    shadow = model_registry.status()['shadow']
+    try:
+        deployment = await run_blocking(model_deployment.stop_shadow)
+    except RuntimeError as e:
+        return error_response(404, str(e))
+    return JSONResponse({'success': True, 'shadow': shadow, 'deployment': deployment}, status_code=202)
+
+
+@app.get('/health')
+async def health():
+    status = model_registry.status()
+    return JSONResponse({
+        'success': status['ready'],
+        'model': status,
+        'batching': inference_batcher.stats(),
+        'pending_requests': pending_requests,
+        'max_pending_requests': INFERENCE_MAX_PENDING
+    }, status_code=200 if status['ready'] else 503)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Embriyo çıkarım servisi')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--uds', help='TCP yerine Unix soketinden dinle')
+    args = parser.parse_args()
+
+    if args.uds:
+        uvicorn.run(app, uds=args.uds)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Ağırlık dosyası için beklenen SHA-256; verilmezse dosyanın yanındaki manifest kullanılır
+MODEL_SHA256 = os.environ.get('EMBRYO_MODEL_SHA256')
+# Sağlama (checksum) doğrulamasını kapatmak için EMBRYO_MODEL_VERIFY=0
+MODEL_VERIFY = os.environ.get('EMBRYO_MODEL_VERIFY', '1') == '1'
+# Ağırlıkları dosyadan mmap ile eşle (sayfalar süreçler arasında paylaşılır)
+MODEL_MMAP = os.environ.get('EMBRYO_MODEL_MMAP', '1') == '1'
+
+ARTIFACT_DTYPES = ('fp32', 'fp16')
+
+
+def resolve_path(path):
+    """
+    Goreli yollari calisma klasorune degil backend klasorune gore cozer
+    """
+    if os.path.isabs(path):
+        return path
+    return os.path.join(BACKEND_DIR, path)
+
+
+def manifest_path(path):
+    return f"{path}.json"
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(path):
+    try:
+        with open(manifest_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def verify_checksum(path, expected=None):
+    """
+    Beklenen SHA-256 biliniyorsa dosyayi dogrular; uyusmazsa RuntimeError firlatir
+    """
+    if expected is None:
+        manifest = read_manifest(path)
+        expected = manifest.get('sha256') if manifest else None
+    if expected is None:
+        return None
+
+    actual = file_sha256(path)
+    if actual != expected.lower():
+        raise RuntimeError(f"Model dosyası sağlama toplamı uyuşmuyor: {path} (beklenen {expected}, bulunan {actual})")
+    return actual
+
+
+def load_checkpoint(path, expected_sha256=MODEL_SHA256, verify=MODEL_VERIFY, mmap=MODEL_MMAP):
+    """
+    State dict'i yukler. mmap ile tensorler dosya sayfalarina eslenir; fp16 saklanan
+    agirliklar float32'ye yukseltilir (bu durumda tensorler surece ozel kopyalardir).
+    """
+    import torch
+
+    if verify:
+        verify_checksum(path, expected_sha256)
+
+    kwargs = {'map_location': torch.device("cpu")}
+    state_dict = None
+    if mmap:
+        try:
+            state_dict = torch.load(path, mmap=True, weights_only=True, **kwargs)
+        except (TypeError, RuntimeError) as e:
+            # Eski torch sürümü veya zip olmayan eski .pth biçimi
+            print(f"Ağırlıklar mmap ile yüklenemedi, normal yükleme yapılıyor: {str(e)}")
+    if state_dict is None:
+        state_dict = torch.load(path, **kwargs)
+
+    return {
+        name: tensor.float() if tensor.dtype == torch.float16 else tensor
+        for name, tensor in state_dict.items()
+    }
+
+
+def load_model_weights(build, path):
+    """
+    build() ile olusturulan modele agirliklari yukler. Destekleniyorsa model 'meta'
+    cihazinda (bellek ayirmadan, rastgele baslatma yapmadan) kurulur ve parametreler
+    yuklenen tensorlere dogrudan baglanir (assign=True).
+    """
+    import torch
+
+    state_dict = load_checkpoint(path)
+    try:
+        with torch.device('meta'):
+            model = build()
+        model.load_state_dict(state_dict, assign=True)
+    except (TypeError, AttributeError, RuntimeError):
+        # torch < 2.1: normal kurulum ve kopyalayarak yükleme
+        model = build()
+        model.load_state_dict(state_dict)
+    model.eval()
+    return model, state_dict
+
+
+def convert_checkpoint(source, target, dtype='fp32'):
+    """
+    Checkpoint'i mmap ile yuklenebilen zip bicimine yazar ve SHA-256 iceren manifest olusturur
+    """
+    import torch
+
+    if dtype not in ARTIFACT_DTYPES:
+        raise ValueError(f"Geçersiz ağırlık veri tipi: {dtype}")
+
+    state_dict = torch.load(source, map_location=torch.device("cpu"))
+    if dtype == 'fp16':
+        state_dict = {
+            name: tensor.half() if tensor.is_floating_point() else tensor
+            for name, tensor in state_dict.items()
+        }
+    # mmap için her tensör kendi bitişik depolamasına sahip olmalı
+    state_dict = {name: tensor.contiguous().clone() for name, tensor in state_dict.items()}
+    torch.save(state_dict, target)
+
+    manifest = {
+        'source': os.path.basename(source),
+        'dtype': dtype,
+        'sha256': file_sha256(target),
+        'size_bytes': os.path.getsize(target),
+        'tensors': len(state_dict),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    with open(manifest_path(target), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,158 @@
+import json
+import os
+import signal
+import threading
+from contextlib import contextmanager
+
+from model_artifacts import resolve_path
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: süreçler arası dosya kilidi yok (geliştirme ortamında tek süreç çalışır)
+    fcntl = None
+
+# Model sürüm değişikliklerinin (yeni sürüm, gölge aday, terfi, durdurma) süreçler arasında paylaşıldığı dosya
+MODEL_DEPLOYMENT_FILE = resolve_path(os.environ.get('EMBRYO_MODEL_DEPLOYMENT_FILE', 'model_deployment.json'))
+# Dosyadaki değişikliklerin sinyal gelmeden de fark edilmesi için kontrol aralığı (saniye)
+MODEL_DEPLOYMENT_POLL_SECONDS = float(os.environ.get('EMBRYO_MODEL_DEPLOYMENT_POLL_SECONDS', '5'))
+# serve.py ana sürecinin pid'i; değişiklikten sonra ona SIGUSR1 gönderilir, o da tüm işçilere iletir
+SERVE_PID_ENV = 'EMBRYO_SERVE_PID'
+DEPLOYMENT_SIGNAL = getattr(signal, 'SIGUSR1', None)
+
+
+def empty_state():
+    # active/shadow None: varsayılan model, gölge aday yok
+    return {'generation': 0, 'active': None, 'shadow': None}
+
+
+class ModelDeployment:
+    """
+    Istenen model surumlerini ({'generation', 'active', 'shadow'}) paylasilan bir JSON dosyasinda
+    tutar. Yonetim istegini hangi surec alirsa alsin dosyayi gunceller; her surec (pre-fork
+    iscileri, cikarim servisi) dosyayi kendi arka plan thread'inde kendi kayit nesnesine uygular.
+    Yeniden baslatilan isciler de baslarken ayni durumu uygular.
+    """
+
+    def __init__(self, registry, path=MODEL_DEPLOYMENT_FILE, poll_seconds=MODEL_DEPLOYMENT_POLL_SECONDS):
+        self.registry = registry
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self._mtime = None
+
+    @contextmanager
+    def _file_lock(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.lock", 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def read(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return empty_state()
+
+    def update(self, change):
+        """
+        change(durum) durumu yerinde degistirir; gecersizse ValueError / RuntimeError firlatabilir.
+        Yeni durum atomik olarak yazilir ve tum sureclere bildirilir.
+        """
+        with self._file_lock():
+            state = self.read()
+            change(state)
+            state['generation'] += 1
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            os.replace(temporary, self.path)
+        self.notify()
+        return state
+
+    def deploy(self, model_path, version=None, shadow=False, sample_rate=0.1):
+        target = {'model_path': model_path, 'version': version}
+
+        def change(state):
+            if shadow:
+                state['shadow'] = dict(target, sample_rate=sample_rate)
+            else:
+                state['active'] = target
+        return self.update(change)
+
+    def promote(self):
+        def change(state):
+            if state.get('shadow') is None:
+                raise RuntimeError('Gölge modda aday model yok')
+            shadow = state['shadow']
+            state['active'] = {'model_path': shadow['model_path'], 'version': shadow.get('version')}
+            state['shadow'] = None
+        return self.update(change)
+
+    def stop_shadow(self):
+        def change(state):
+            if state.get('shadow') is None:
+                raise RuntimeError('Gölge modda aday model yok')
+            state['shadow'] = None
+        return self.update(change)
+
+    def notify(self):
+        # Bu süreç hemen uygular; serve.py altında ana süreç sinyali diğer işçilere iletir
+        self.start()
+        serve_pid = os.environ.get(SERVE_PID_ENV)
+        if serve_pid and DEPLOYMENT_SIGNAL is not None and int(serve_pid) != os.getpid():
+            try:
+                os.kill(int(serve_pid), DEPLOYMENT_SIGNAL)
+            except ProcessLookupError:
+                pass
+
+    def sync(self):
+        """
+        Dosyadaki durumu bu surecin kayit nesnesine uygular (yeni surum yuklenene kadar bloklar)
+        """
+        try:
+            self._mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        self.registry.apply_deployment(self.read())
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if mtime == self._mtime:
+                continue
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Model dağıtımı uygulanamadı: {str(e)}")
+
+    def start(self):
+        """
+        Bu surecin izleme thread'ini baslatir; ilk kontrol hemen yapilir.
+        Fork sonrasi thread'ler cocuk surece gecmedigi icin her surec kendi thread'ini baslatir.
+        """
+        with self._start_lock:
+            if self._thread_pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, name='model-deployment', daemon=True)
+                self._thread.start()
+                self._thread_pid = os.getpid()
+        self.wake()
+
+    def wake(self):
+        # Sinyal işleyicisinden çağrılabilir: kilit almaz, yalnızca olay bayrağını kurar
+        self._mtime = None
+        self._wake.set()
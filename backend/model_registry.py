@@ -0,0 +1,534 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cascade import CASCADE_ENABLED, CascadeClassifier
+from embryo_classes import CLASS_NAMES
+from model_artifacts import resolve_path
+from model_deployment import ModelDeployment
+from test_time_augmentation import TTA_ENABLED, TestTimeAugmentation
+
+# Model ağırlık dosyası (ortam değişkeni ile değiştirilebilir; göreli yollar backend klasörüne göre çözülür)
+MODEL_PATH = resolve_path(os.environ.get('EMBRYO_MODEL_PATH', 'best_resnet50_clean.pth'))
+# Model sürümü; verilmezse ağırlık dosyasının adı, boyutu ve değişiklik zamanından türetilir
+MODEL_VERSION = os.environ.get('EMBRYO_MODEL_VERSION')
+
+# Modelin beklediği giriş boyutu
+INPUT_SIZE = 224
+
+
+# Çıkarım motoru: 'fp32' (varsayılan), 'int8-static' (önerilen INT8) veya 'int8-dynamic'
+# (yalnızca son fc katmanı nicemlenir, konvolüsyonlar fp32 kalır)
+INFERENCE_ENGINE = os.environ.get('EMBRYO_INFERENCE_ENGINE', 'fp32')
+INFERENCE_ENGINES = ('fp32', 'int8-dynamic', 'int8-static')
+
+# Çıkarım arka ucu: 'eager' (varsayılan), 'torchscript' veya 'onnx'
+INFERENCE_BACKEND = os.environ.get('EMBRYO_INFERENCE_BACKEND', 'eager')
+
+
+def attach_classifier_head(model, num_classes=len(CLASS_NAMES)):
+    """
+    Egitimde kullanilan Dropout + Linear siniflandirma katmanini ekler
+    """
+    import torch
+
+    model.fc = torch.nn.Sequential(
+        torch.nn.Dropout(0.5),
+        torch.nn.Linear(model.fc.in_features, num_classes)
+    )
+    return model
+
+
+def build_model(num_classes=len(CLASS_NAMES)):
+    """
+    Kaydedilen modele uygun ResNet50 mimarisini olusturur (agirliklar yuklenmez)
+    """
+    from torchvision import models
+
+    return attach_classifier_head(models.resnet50(), num_classes)
+
+
+def model_nbytes(model):
+    """
+    Modelin parametre ve buffer'larinin bellekte kapladigi byte miktari
+    """
+    total = 0
+    for tensor in list(model.parameters()) + list(model.buffers()):
+        total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def current_rss_bytes():
+    """
+    Surecin anlik RSS degeri (Linux disinda None doner)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class LoadedModel:
+    """
+    Yuklenmis ve isitilmis tek bir model surumu. Trafik surumler arasinda bu nesnenin
+    referansi degistirilerek atomik olarak aktarilir.
+    """
+
+    def __init__(self, backend, model_path, version, cascade=None, tta=None):
+        self.backend = backend
+        self.model_path = model_path
+        self.version = version
+        self.cascade = cascade
+        self.tta = tta
+        # Dağıtımda istenen sürüm adı (None ise dosyadan türetilir); dağıtım hedefiyle karşılaştırılır
+        self.requested_version = None
+        # Gölge moddaki aday sürümün kademe / TTA çağrıları istatistiklere sayılmaz
+        self.record_stats = True
+        self.load_time = None
+        self.warmup_time = None
+        self.model_bytes = None
+        self.rss_delta_bytes = None
+        self.loaded_at = None
+        # Bu sürümle o anda çalışan tahmin sayısı; eski sürüm sıfıra inince bırakılır
+        self.in_flight = 0
+        self.retired = False
+
+    def predict(self, input_batch):
+        return self.predict_with_features(input_batch)[0]
+
+    def predict_with_features(self, input_batch):
+        # Kademeli modda küçük modelin cevapladığı satırlar için ResNet50 özellikleri yoktur
+        if self.cascade is not None:
+            probabilities = self.cascade.predict(input_batch, self.backend.predict, record=self.record_stats)
+            features = None
+        else:
+            probabilities, features = self.backend.predict_with_features(input_batch)
+        if self.tta is not None:
+            # Düşük güvenli satırların görünümleri parçalar halinde ek forward'larda ResNet50 ile çalışır
+            probabilities = self.tta.refine(input_batch, probabilities, self.backend.predict,
+                                            record=self.record_stats)
+        return probabilities, features
+
+    def close(self):
+        # Ağırlıklara olan referansları bırak
+        self.backend = None
+
+
+class ShadowComparison:
+    """
+    Aday surumu canli trafigin bir orneklemi uzerinde calistirip
+    aktif surumle uyumunu kaydeder. Aday sonuclari istemciye donmez.
+    """
+
+    def __init__(self, candidate, sample_rate):
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.compared = 0
+        self.agreed = 0
+        self.errors = 0
+        self._abs_diff_total = 0.0
+        # (aktif sınıf, aday sınıf) -> uyuşmayan tahmin sayısı
+        self.disagreements = {}
+        # Kuyruktaki / çalışan karşılaştırmalar; aday kapatılmadan önce boşaltılır
+        self._pending = set()
+        self._closed = False
+
+    def submit(self, executor, input_batch, active_probabilities):
+        with self._lock:
+            if self._closed:
+                return
+            future = executor.submit(self.compare, input_batch, active_probabilities)
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def drain(self):
+        """
+        Yeni karsilastirma kabul etmez, kuyruktakileri iptal eder ve calismakta olani bekler.
+        Aday kapatilmadan (close) once cagrilir; aksi halde kalan isler hata olarak sayilir.
+        """
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        wait(pending)
+
+    def compare(self, input_batch, active_probabilities):
+        try:
+            candidate_probabilities = self.candidate.predict(input_batch)
+        except Exception as e:
+            print(f"Gölge model hatası: {str(e)}")
+            with self._lock:
+                self.errors += 1
+            return
+
+        active_classes = active_probabilities.argmax(dim=1).tolist()
+        candidate_classes = candidate_probabilities.argmax(dim=1).tolist()
+        abs_diff = (candidate_probabilities - active_probabilities).abs().max(dim=1).values.sum().item()
+        with self._lock:
+            self.compared += len(active_classes)
+            self._abs_diff_total += abs_diff
+            for active_idx, candidate_idx in zip(active_classes, candidate_classes):
+                if active_idx == candidate_idx:
+                    self.agreed += 1
+                else:
+                    key = (CLASS_NAMES[active_idx], CLASS_NAMES[candidate_idx])
+                    self.disagreements[key] = self.disagreements.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            top = sorted(self.disagreements.items(), key=lambda item: item[1], reverse=True)[:10]
+            return {
+                'candidate_version': self.candidate.version,
+                'candidate_path': self.candidate.model_path,
+                'sample_rate': self.sample_rate,
+                'started_at': self.started_at,
+                'compared': self.compared,
+                'agreed': self.agreed,
+                'agreement_rate': round(self.agreed / self.compared, 4) if self.compared else None,
+                'mean_max_abs_diff': round(self._abs_diff_total / self.compared, 6) if self.compared else None,
+                'errors': self.errors,
+                'top_disagreements': [
+                    {'active': active, 'candidate': candidate, 'count': count}
+                    for (active, candidate), count in top
+                ]
+            }
+
+
+class ModelRegistry:
+    """
+    Surec genelinde aktif cikarim arka ucunu (eager, TorchScript, ONNX Runtime) tutar.
+    Model bir kez yuklenir, isinma (warm-up) yapilir ve tum isteklere ayni nesne verilir.
+    Yeni bir surum arka planda yuklenip isitildiktan sonra trafik atomik olarak ona gecer;
+    eski surum uzerindeki tahminler bitince eski surum birakilir.
+    torch yalnizca model yuklenirken ice aktarilir; sadece API sunan surecler bu maliyeti odemez.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, version=MODEL_VERSION, engine=INFERENCE_ENGINE,
+                 backend=INFERENCE_BACKEND, cascade=CASCADE_ENABLED, tta=TTA_ENABLED):
+        if engine not in INFERENCE_ENGINES:
+            raise ValueError(f"Geçersiz çıkarım motoru: {engine}")
+        self.model_path = model_path
+        self.engine = engine
+        self.backend_name = backend
+        self._version = version
+        self._active = None
+        # Kademeli modda önce küçük model çalışır (EMBRYO_CASCADE=1)
+        self.cascade = CascadeClassifier() if cascade else None
+        # Düşük güvenli tahminlerde test zamanı çoğaltma (EMBRYO_TTA=1)
+        self.tta = TestTimeAugmentation() if tta else None
+        self._lock = threading.Lock()
+        self._flight_lock = threading.Lock()
+        self.last_error = None
+
+        # Sürüm değişimi ve gölge (shadow) mod durumu
+        self._draining = []
+        self._shadow = None
+        self._shadow_executor = None
+        self.swap_state = 'idle'
+        self.swap_target = None
+        self.swap_error = None
+        # Bu sürece uygulanmış son dağıtım nesli (model_deployment)
+        self.deployment_generation = 0
+
+    def _version_for(self, model_path, version=None):
+        if version is None:
+            try:
+                stat = os.stat(model_path)
+                version = f"{os.path.basename(model_path)}-{stat.st_size}-{int(stat.st_mtime)}"
+            except OSError:
+                return 'unknown'
+        # Nicemlenmiş motorlar ve farklı arka uçlar farklı sonuç üretebileceği için sürüme dahil edilir
+        if self.backend_name != 'eager':
+            version = f"{version}+{self.backend_name}"
+        if self.engine != 'fp32':
+            version = f"{version}+{self.engine}"
+        if self.cascade is not None:
+            version = f"{version}+{self.cascade.version}"
+        if self.tta is not None:
+            version = f"{version}+{self.tta.version}"
+        return version
+
+    def _load_version(self, model_path, version=None):
+        import torch
+        from inference_backends import create_backend
+
+        print(f"Model yükleniyor: {model_path} ({self.backend_name}, {self.engine})")
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        backend = create_backend(self.backend_name, model_path, self.engine).load()
+        load_time = time.perf_counter() - start
+
+        # Isınma: ilk forward çağrısındaki tembel başlatmaları istek dışında yap
+        start = time.perf_counter()
+        backend.predict(torch.zeros(1, 3, INPUT_SIZE, INPUT_SIZE))
+        warmup_time = time.perf_counter() - start
+
+        if self.cascade is not None and self.cascade.module is None:
+            self.cascade.load()
+            # Bilinçli ödünleşim: öznitelik için her görüntüde ResNet50 çalıştırmak kademenin kazancını siler
+            print("UYARI: Kademeli modda küçük modelin kabul ettiği raporlar için öznitelik vektörü kaydedilmez; "
+                  "bu raporlar benzer embriyo aramasında görünmez. Eksikleri doldurmak için: python rescore_reports.py")
+
+        model = LoadedModel(backend, model_path, self._version_for(model_path, version), self.cascade, self.tta)
+        model.requested_version = version
+        model.load_time = load_time
+        model.warmup_time = warmup_time
+        rss_after = current_rss_bytes()
+        model.model_bytes = backend.nbytes()
+        if rss_before is not None and rss_after is not None:
+            model.rss_delta_bytes = rss_after - rss_before
+        model.loaded_at = time.time()
+
+        print(
+            f"Model hazır ({model.version}). Yükleme: {load_time:.2f}s, "
+            f"ısınma: {warmup_time:.2f}s, "
+            f"ağırlıklar: {(model.model_bytes or 0) / (1024 * 1024):.1f} MB"
+        )
+        return model
+
+    def load(self):
+        # Hızlı yol: model zaten yüklendiyse kilit almadan döndür
+        active = self._active
+        if active is not None:
+            return active.backend
+
+        with self._lock:
+            # Kilidi beklerken başka bir thread yüklemiş olabilir
+            if self._active is not None:
+                return self._active.backend
+
+            try:
+                self._active = self._load_version(self.model_path, self._version)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Model yükleme hatası: {str(e)}")
+                raise
+
+        return self._active.backend
+
+    def _get_active(self):
+        active = self._active
+        if active is None:
+            self.load()
+            active = self._active
+        return active
+
+    @property
+    def version(self):
+        active = self._active
+        if active is not None:
+            return active.version
+        return self._version_for(self.model_path, self._version)
+
+    def get_backend(self):
+        return self._get_active().backend
+
+    def get_model(self):
+        """
+        Cagrilabilir PyTorch modulu (ONNX Runtime arka ucunda bulunmaz)
+        """
+        module = self.get_backend().module
+        if module is None:
+            raise RuntimeError(f"{self.backend_name} arka ucu PyTorch modülü sağlamaz")
+        return module
+
+    def predict(self, input_batch):
+        """
+        (N, 3, 224, 224) tensor icin softmax olasiliklarini (N, 19) dondurur
+        """
+        return self.predict_full(input_batch)[0]
+
+    def predict_full(self, input_batch):
+        """
+        (olasiliklar, surum, 2048-d ozellikler ya da None) dondurur.
+        Surum degisimi sirasinda da sonucu ureten surum dogrudur.
+        """
+        with self._flight_lock:
+            model = self._active
+            if model is not None:
+                model.in_flight += 1
+        if model is None:
+            self.load()
+            return self.predict_full(input_batch)
+
+        try:
+            probabilities, features = model.predict_with_features(input_batch)
+        finally:
+            with self._flight_lock:
+                model.in_flight -= 1
+                drained = model.retired and model.in_flight == 0
+            if drained:
+                self._release(model)
+
+        shadow = self._shadow
+        if shadow is not None and random.random() < shadow.sample_rate:
+            # Gölge model istek yolunu yavaşlatmasın diye ayrı thread'de çalışır
+            shadow.submit(self._shadow_executor, input_batch, probabilities)
+        return probabilities, model.version, features
+
+    def _release(self, model):
+        with self._flight_lock:
+            if model in self._draining:
+                self._draining.remove(model)
+        model.close()
+        print(f"Eski model sürümü bırakıldı: {model.version}")
+
+    def _activate(self, candidate):
+        with self._flight_lock:
+            previous = self._active
+            # Tek referans ataması: sonraki tüm istekler yeni sürümü görür
+            candidate.record_stats = True
+            self._active = candidate
+            self.model_path = candidate.model_path
+            drained = False
+            if previous is not None:
+                previous.retired = True
+                drained = previous.in_flight == 0
+                if not drained:
+                    self._draining.append(previous)
+        print(f"Trafik yeni model sürümüne geçti: {candidate.version}")
+        if drained:
+            self._release(previous)
+
+    @staticmethod
+    def _matches(model, target):
+        # Yüklü sürüm dağıtım hedefiyle ({'model_path', 'version'}) aynı mı
+        return (model is not None and model.model_path == target['model_path']
+                and model.requested_version == target.get('version'))
+
+    def _load_target(self, target, shadow):
+        with self._lock:
+            self.swap_state = 'loading'
+            self.swap_target = {'model_path': target['model_path'], 'version': target.get('version'), 'shadow': shadow}
+            self.swap_error = None
+        try:
+            candidate = self._load_version(target['model_path'], target.get('version'))
+        except Exception as e:
+            print(f"Model sürümü yüklenemedi: {str(e)}")
+            self.swap_error = str(e)
+            self.swap_state = 'failed'
+            return None
+        self.swap_state = 'idle'
+        return candidate
+
+    def apply_deployment(self, state):
+        """
+        Paylasilan dagitim durumunu ({'generation', 'active', 'shadow'}; bkz. model_deployment)
+        bu surece uygular. Yeni surum gerekiyorsa yuklenip isitilir, ardindan trafik atomik
+        olarak gecer; cagri yukleme bitene kadar bloklar. Uygulanmis nesiller yok sayilir,
+        yukleme basarisiz olursa nesil ilerlemez (sonraki bildirimde yeniden denenir).
+        """
+        if state['generation'] <= self.deployment_generation:
+            return
+        # Aktif model henüz yüklenmediyse önce o yüklenir (gölge karşılaştırması için)
+        active = self._get_active()
+
+        target = state.get('active')
+        if target is not None and not self._matches(active, target):
+            shadow = self._shadow
+            if shadow is not None and self._matches(shadow.candidate, target):
+                # Terfi: aday zaten yüklü ve ısınmış, yeniden yüklenmez
+                self.promote_shadow()
+            else:
+                candidate = self._load_target(target, shadow=False)
+                if candidate is None:
+                    return
+                self._activate(candidate)
+
+        target = state.get('shadow')
+        shadow = self._shadow
+        if target is None:
+            if shadow is not None:
+                self.stop_shadow()
+        elif shadow is None or not self._matches(shadow.candidate, target):
+            candidate = self._load_target(target, shadow=True)
+            if candidate is None:
+                return
+            self.start_shadow(candidate, target.get('sample_rate', 0.1))
+        else:
+            shadow.sample_rate = max(0.0, min(1.0, target.get('sample_rate', shadow.sample_rate)))
+
+        self.deployment_generation = state['generation']
+
+    def start_shadow(self, candidate, sample_rate):
+        if self._shadow_executor is None:
+            self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-shadow')
+        previous = self._shadow
+        candidate.record_stats = False
+        self._shadow = ShadowComparison(candidate, max(0.0, min(1.0, sample_rate)))
+        if previous is not None:
+            previous.drain()
+            previous.candidate.close()
+        print(f"Gölge mod başladı: {candidate.version} (örnekleme %{sample_rate * 100:g})")
+
+    def promote_shadow(self):
+        """
+        Golge adayi aktif surum yapar (yeniden yukleme yapilmaz)
+        """
+        shadow = self._shadow
+        if shadow is None:
+            raise RuntimeError('Gölge modda aday model yok')
+        self._shadow = None
+        shadow.drain()
+        self._activate(shadow.candidate)
+        return shadow.stats()
+
+    def stop_shadow(self):
+        shadow = self._shadow
+        if shadow is None:
+            return None
+        self._shadow = None
+        shadow.drain()
+        shadow.candidate.close()
+        return shadow.stats()
+
+    def is_ready(self):
+        return self._active is not None
+
+    def status(self):
+        active = self._active
+        with self._flight_lock:
+            draining = [{'version': model.version, 'in_flight': model.in_flight} for model in self._draining]
+        shadow = self._shadow
+        return {
+            'ready': active is not None,
+            'model_path': self.model_path,
+            'version': self.version,
+            'backend': self.backend_name,
+            'engine': self.engine,
+            'load_time_seconds': active.load_time if active else None,
+            'warmup_time_seconds': active.warmup_time if active else None,
+            'model_bytes': active.model_bytes if active else None,
+            'rss_delta_bytes': active.rss_delta_bytes if active else None,
+            'loaded_at': active.loaded_at if active else None,
+            'in_flight': active.in_flight if active else 0,
+            'cascade': self.cascade.stats() if self.cascade is not None else None,
+            'tta': self.tta.stats() if self.tta is not None else None,
+            'swap': {
+                'generation': self.deployment_generation,
+                'state': self.swap_state,
+                'target': self.swap_target,
+                'error': self.swap_error
+            },
+            'draining': draining,
+            'shadow': shadow.stats() if shadow is not None else None,
+            'error': self.last_error
+        }
+
+
+# Uygulama genelinde paylaşılan kayıt
+model_registry = ModelRegistry()
+# Sürüm değişikliklerini tüm süreçlere (pre-fork işçileri, çıkarım servisi) yayan dağıtım durumu
+model_deployment = ModelDeployment(model_registry)
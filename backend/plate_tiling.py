@@ -0,0 +1,162 @@
+import os
+import re
+
+# Plaka görüntüsünde tek istekte kabul edilen en fazla kuyu sayısı
+PLATE_MAX_WELLS = int(os.environ.get('EMBRYO_PLATE_MAX_WELLS', '96'))
+# Her kuyunun kenarından kırpılan pay (hücre boyutuna oranı); komşu kuyuların kenarı karışmasın
+PLATE_WELL_MARGIN = float(os.environ.get('EMBRYO_PLATE_WELL_MARGIN', '0.05'))
+
+# Standart plaka adlandırması: satırlar harf, sütunlar sayı (A1, B3, ...); 384 kuyuya kadar
+ROW_LABELS = 'ABCDEFGHIJKLMNOP'
+MAX_COLUMNS = 24
+# Otomatik algılamada kullanılan küçültülmüş görüntünün en uzun kenarı
+DETECT_SIZE = 512
+# Yoğunluk profilindeki tekrarın kuyu düzeni sayılması için gereken en düşük otokorelasyon
+DETECT_MIN_CORRELATION = 0.3
+
+
+def parse_grid(text):
+    """
+    '4x6' bicimindeki duzeni (satir, sutun) olarak dondurur; 'auto' veya bos icin None
+    """
+    if not text or text == 'auto':
+        return None
+    match = re.fullmatch(r'\s*(\d+)\s*[xX×]\s*(\d+)\s*', str(text))
+    if not match:
+        raise ValueError(f"Geçersiz kuyu düzeni: {text} (ör. 4x6 veya auto)")
+    rows, columns = int(match.group(1)), int(match.group(2))
+    if not 1 <= rows <= len(ROW_LABELS) or not 1 <= columns <= MAX_COLUMNS:
+        raise ValueError(f"Kuyu düzeni en fazla {len(ROW_LABELS)}x{MAX_COLUMNS} olabilir")
+    return rows, columns
+
+
+def well_label(row, column):
+    return f"{ROW_LABELS[row]}{column + 1}"
+
+
+def _period_count(profile, max_count):
+    # Yoğunluk profilinin otokorelasyonundaki ilk belirgin tepe kuyu aralığını verir
+    import numpy as np
+
+    length = len(profile)
+    profile = profile - profile.mean()
+    spectrum = np.fft.rfft(profile, 2 * length)
+    autocorr = np.fft.irfft(spectrum * np.conj(spectrum), 2 * length)[:length]
+    if autocorr[0] <= 0:
+        return 1
+    # Yansız tahmin: her gecikmedeki örtüşen örnek sayısına göre ölçekle
+    autocorr = autocorr / (length - np.arange(length)) / (autocorr[0] / length)
+
+    for lag in range(max(2, length // max_count), length // 2):
+        if (autocorr[lag] >= DETECT_MIN_CORRELATION
+                and autocorr[lag] >= autocorr[lag - 1] and autocorr[lag] >= autocorr[lag + 1]):
+            return max(1, min(max_count, round(length / lag)))
+    return 1
+
+
+def detect_grid(image):
+    """
+    Kuyu duzenini satir ve sutun yogunluk profillerinin periyodundan tahmin eder.
+    Goruntunun kuyu alanina kirpilmis oldugu varsayilir; duzen bulunamazsa ValueError.
+    """
+    import numpy as np
+
+    gray = image.convert('L')
+    gray.thumbnail((DETECT_SIZE, DETECT_SIZE))
+    gray = np.asarray(gray, dtype=np.float32)
+
+    rows = _period_count(gray.mean(axis=1), len(ROW_LABELS))
+    columns = _period_count(gray.mean(axis=0), MAX_COLUMNS)
+    if rows * columns < 2:
+        raise ValueError("Kuyu düzeni otomatik algılanamadı, lütfen grid (ör. 4x6) belirtin")
+    return rows, columns
+
+
+def grid_wells(width, height, rows, columns, margin=PLATE_WELL_MARGIN):
+    """
+    Esit hucreli duzen icin her kuyunun {'well', 'row', 'column', 'box'} kaydini dondurur.
+    box=(sol, ust, sag, alt) piksel koordinatlaridir ve kenar payi kadar iceri cekilir.
+    """
+    cell_width = width / columns
+    cell_height = height / rows
+    wells = []
+    for row in range(rows):
+        for column in range(columns):
+            wells.append({
+                'well': well_label(row, column),
+                'row': row,
+                'column': column,
+                'box': (
+                    (column + margin) * cell_width,
+                    (row + margin) * cell_height,
+                    (column + 1 - margin) * cell_width,
+                    (row + 1 - margin) * cell_height
+                )
+            })
+    return wells
+
+
+def tile_plate(image_bytes, grid=None, margin=PLATE_WELL_MARGIN, selected=None):
+    """
+    Plaka goruntusunu bir kez decode edip kuyulara boler. (goruntu, (satir, sutun), kuyular, pikseller) dondurur;
+    pikseller her kuyu icin dogrudan kaynak goruntuden orneklenmis (N, 224, 224, 3) uint8 dizidir.
+    grid=None ise duzen otomatik algilanir; selected verilirse yalnizca o kuyular ('A1', ...) islenir.
+    """
+    import numpy as np
+
+    from preprocessing import ImagePreprocessor, image_preprocessor
+
+    if grid is not None:
+        # Düzen biliniyorsa JPEG, kuyu başına 224 pikseli karşılayan en küçük ölçekte decode edilir
+        size = image_preprocessor.size
+        image = image_preprocessor.open(image_bytes, draft_size=(grid[1] * size, grid[0] * size))
+    else:
+        # Otomatik algılama tam çözünürlükte yapılır
+        image = ImagePreprocessor(draft=False).open(image_bytes)
+
+    rows, columns = grid if grid is not None else detect_grid(image)
+    wells = grid_wells(image.width, image.height, rows, columns, margin)
+    if selected:
+        selected = {label.strip().upper() for label in selected}
+        unknown = selected - {well['well'] for well in wells}
+        if unknown:
+            raise ValueError(f"Düzende olmayan kuyular: {', '.join(sorted(unknown))}")
+        wells = [well for well in wells if well['well'] in selected]
+    if len(wells) > PLATE_MAX_WELLS:
+        raise ValueError(f"Tek istekte en fazla {PLATE_MAX_WELLS} kuyu analiz edilebilir")
+
+    pixels = np.empty((len(wells), image_preprocessor.size, image_preprocessor.size, 3), dtype=np.uint8)
+    for index, well in enumerate(wells):
+        pixels[index] = image_preprocessor.resize_region(image, well['box'])
+    return image, (rows, columns), wells, pixels
+
+
+def native_image(image_bytes, image):
+    """
+    tile_plate goruntuyu DCT olcekli (draft) decode ettiyse kaydedilecek kesitler icin plakayi
+    tam cozunurlukte yeniden acar. (goruntu, kutu olcegi) dondurur.
+    """
+    import io
+
+    from PIL import Image
+
+    from preprocessing import ImagePreprocessor
+
+    # Yalnızca başlık okunur; boyut aynıysa ikinci decode gerekmez
+    if Image.open(io.BytesIO(image_bytes)).size == image.size:
+        return image, 1.0
+    native = ImagePreprocessor(draft=False).open(image_bytes)
+    return native, native.width / image.width
+
+
+def well_image_bytes(image, box, scale=1.0, quality=95):
+    """
+    Kuyunun kesitini rapor goruntusu olarak JPEG byte'larina cevirir. box, tile_plate'in
+    goruntusundeki koordinatlardir; scale ile native_image goruntusune olceklenir.
+    """
+    import io
+
+    buffer = io.BytesIO()
+    left, top, right, bottom = (int(round(value * scale)) for value in box)
+    image.crop((left, top, right, bottom)).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
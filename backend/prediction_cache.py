@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from embryo_ranking import decode_probabilities, encode_probabilities
+
+# Bellekte tutulacak en fazla tahmin sayısı
+CACHE_CAPACITY = int(os.environ.get('EMBRYO_PREDICTION_CACHE_SIZE', '1024'))
+# Önbelleği tamamen kapatmak için EMBRYO_PREDICTION_CACHE=0 (ör. yük testlerinde)
+CACHE_ENABLED = os.environ.get('EMBRYO_PREDICTION_CACHE', '1') == '1'
+# SQLite katmanında tutulacak en fazla kayıt (0: sınırsız); her yazmada en eski kayıtlar silinir
+CACHE_MAX_ROWS = int(os.environ.get('EMBRYO_PREDICTION_CACHE_MAX_ROWS', '100000'))
+# SQLite katmanındaki kayıtların en fazla yaşı (gün, 0: sınırsız)
+CACHE_MAX_AGE_DAYS = float(os.environ.get('EMBRYO_PREDICTION_CACHE_MAX_AGE_DAYS', '90'))
+
+
+def image_sha256(image_bytes):
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class PredictionCache:
+    """
+    Goruntu icerigi (SHA-256) ve model surumune gore anahtarlanan tahmin onbellegi.
+    Bellekte LRU katmani, arkasinda kalici SQLite katmani bulunur. SQLite katmani yazma
+    sirasina gore en fazla max_rows kayit ve max_age_days gunluk kayit tutar.
+    """
+
+    def __init__(self, db_path, capacity=CACHE_CAPACITY, enabled=CACHE_ENABLED, max_rows=CACHE_MAX_ROWS,
+                 max_age_days=CACHE_MAX_AGE_DAYS):
+        self.db_path = db_path
+        self.capacity = capacity
+        self.enabled = enabled
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        if not self._table_ready:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS prediction_cache (
+                    image_hash TEXT NOT NULL,
+                    model_version TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    confidence FLOAT,
+                    image_path TEXT,
+                    probabilities BLOB,
+                    embedding BLOB,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (image_hash, model_version)
+                )
+            ''')
+            # Olasılık vektörü / öznitelik sütunları olmayan eski tabloları güncelle
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(prediction_cache)")]
+            for column in ('probabilities', 'embedding'):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE prediction_cache ADD COLUMN {column} BLOB")
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_prediction_cache_created ON prediction_cache(created_at)')
+            conn.commit()
+            self._table_ready = True
+        return conn
+
+    def _remember(self, key, entry):
+        # Çağıran kilidi tutuyor olmalı
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def get(self, image_hash, model_version):
+        """
+        Onbellekteki {'class', 'confidence', 'image_path', 'probabilities', 'embedding'} kaydini ya da None dondurur
+        """
+        if not self.enabled:
+            return None
+
+        key = (image_hash, model_version)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return dict(entry)
+
+        try:
+            with self._connect() as conn:
+                row = conn.execute('''
+                    SELECT result, confidence, image_path, probabilities, embedding FROM prediction_cache
+                    WHERE image_hash = ? AND model_version = ?
+                ''', (image_hash, model_version)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Tahmin önbelleği okunamadı: {str(e)}")
+            row = None
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            entry = {
+                'class': row[0],
+                'confidence': row[1],
+                'image_path': row[2],
+                'probabilities': decode_probabilities(row[3]) if row[3] else None,
+                'embedding': row[4]
+            }
+            self._remember(key, entry)
+            self.disk_hits += 1
+            return dict(entry)
+
+    def put(self, image_hash, model_version, predicted_class, confidence, image_path=None, probabilities=None,
+            embedding=None):
+        if not self.enabled:
+            return
+
+        entry = {
+            'class': predicted_class,
+            'confidence': confidence,
+            'image_path': image_path,
+            'probabilities': probabilities,
+            'embedding': embedding
+        }
+        with self._lock:
+            self._remember((image_hash, model_version), entry)
+
+        try:
+            with self._connect() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO prediction_cache
+                        (image_hash, model_version, result, confidence, image_path, probabilities, embedding)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (image_hash, model_version, predicted_class, confidence, image_path,
+                      encode_probabilities(probabilities) if probabilities is not None else None, embedding))
+                self._prune(conn)
+        except sqlite3.Error as e:
+            print(f"Tahmin önbelleğine yazılamadı: {str(e)}")
+
+    def _prune(self, conn):
+        # INSERT OR REPLACE her yazmada yeni rowid verir: son max_rows yazmanın dışında kalanlar silinir.
+        # Aralık silmesi rowid / created_at indeksini kullandığından tablo büyüse de her yazmada ucuzdur.
+        if self.max_rows > 0:
+            conn.execute('''
+                DELETE FROM prediction_cache
+                WHERE rowid <= (SELECT MAX(rowid) FROM prediction_cache) - ?
+            ''', (self.max_rows,))
+        if self.max_age_days > 0:
+            conn.execute('''
+                DELETE FROM prediction_cache WHERE created_at < datetime('now', ?)
+            ''', (f'-{self.max_age_days:g} days',))
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'capacity': self.capacity,
+                'max_rows': self.max_rows,
+                'max_age_days': self.max_age_days,
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / total, 4) if total else None
+            }
@@ -0,0 +1,82 @@
+import io
+
+import numpy as np
+import torch
+from PIL import Image
+
+# Modelin beklediği giriş boyutu
+INPUT_SIZE = 224
+
+# ToTensor + Normalize([0.5]*3, [0.5]*3) tek adımda: x / 255 * 2 - 1
+_SCALE = np.float32(2.0 / 255.0)
+
+
+class ImagePreprocessor:
+    """
+    transforms.Compose([Resize, ToTensor, Normalize]) ile ayni sonucu ureten,
+    her cagrida yeniden olusturulmayan on isleme asamasi.
+    JPEG dosyalari draft modunda hedef boyuta yakin cozunurlukte decode edilir.
+    """
+
+    def __init__(self, size=INPUT_SIZE, draft=True):
+        self.size = size
+        self.draft = draft
+
+    def open(self, image_bytes, draft_size=None):
+        image = Image.open(io.BytesIO(image_bytes))
+        if self.draft and image.format == 'JPEG':
+            # DCT ölçekleme: hedeften küçük olmayan en küçük 1/2, 1/4, 1/8 ölçek seçilir
+            image.draft('RGB', draft_size or (self.size, self.size))
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return image
+
+    def new_batch(self, batch_size):
+        """
+        preprocess(out=...) ile doldurulacak (N, 3, H, W) batch tensoru
+        """
+        return torch.empty((batch_size, 3, self.size, self.size), dtype=torch.float32)
+
+    def resize(self, image):
+        # Resize((224, 224)) PIL görüntüsünde BILINEAR (antialias) kullanır
+        if image.size != (self.size, self.size):
+            image = image.resize((self.size, self.size), Image.BILINEAR)
+        return np.asarray(image, dtype=np.uint8)
+
+    def resize_region(self, image, box):
+        """
+        box=(sol, ust, sag, alt) bolgesini ayri bir kirpma kopyasi olusturmadan
+        dogrudan (224, 224, 3) uint8 diziye ornekler
+        """
+        return np.asarray(image.resize((self.size, self.size), Image.BILINEAR, box=box), dtype=np.uint8)
+
+    def pixels(self, image_bytes):
+        """
+        Ham goruntu byte'larini (224, 224, 3) uint8 diziye cevirir. Surecler arasi aktarimda
+        float32 tensorun dortte biri kadar yer kaplar; normalize() ile tensore yazilir.
+        """
+        return self.resize(self.open(image_bytes))
+
+    def normalize(self, pixels, out=None):
+        if out is None:
+            out = torch.empty((3, self.size, self.size), dtype=torch.float32)
+
+        # HWC uint8 -> CHW float32, normalizasyon doğrudan hedef buffer'a yazılır
+        out_array = out.numpy()
+        np.multiply(pixels.transpose(2, 0, 1), _SCALE, out=out_array)
+        np.subtract(out_array, np.float32(1.0), out=out_array)
+        return out
+
+    def preprocess_image(self, image, out=None):
+        return self.normalize(self.resize(image), out=out)
+
+    def preprocess(self, image_bytes, out=None):
+        """
+        Ham goruntu byte'larini (3, 224, 224) tensore donusturur.
+        out verilirse (ornegin batch[i]) sonuc yeni tensor ayrilmadan oraya yazilir.
+        """
+        return self.preprocess_image(self.open(image_bytes), out=out)
+
+
+# Uygulama genelinde paylaşılan ön işleyici
+image_preprocessor = ImagePreprocessor()
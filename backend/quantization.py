@@ -0,0 +1,85 @@
+import glob
+import os
+
+import torch
+from torchvision.models import quantization as quantizable_models
+
+from model_registry import attach_classifier_head
+from preprocessing import image_preprocessor
+
+# Statik nicemleme kalibrasyonu için kullanılacak görüntüler
+CALIBRATION_DIR = os.environ.get(
+    'EMBRYO_QUANT_CALIBRATION_DIR',
+    os.path.join(os.path.dirname(__file__), 'uploads')
+)
+CALIBRATION_IMAGES = int(os.environ.get('EMBRYO_QUANT_CALIBRATION_IMAGES', '128'))
+CALIBRATION_BATCH_SIZE = 16
+
+
+def select_backend():
+    """
+    x86 icin fbgemm, ARM icin qnnpack nicemleme cekirdeklerini secer
+    """
+    supported = torch.backends.quantized.supported_engines
+    backend = 'fbgemm' if 'fbgemm' in supported else 'qnnpack'
+    torch.backends.quantized.engine = backend
+    return backend
+
+
+def load_calibration_batches(folder=CALIBRATION_DIR, limit=CALIBRATION_IMAGES, batch_size=CALIBRATION_BATCH_SIZE):
+    paths = sorted(glob.glob(os.path.join(folder, '*')))[:limit]
+    batches = []
+    for start in range(0, len(paths), batch_size):
+        chunk = paths[start:start + batch_size]
+        batch = image_preprocessor.new_batch(len(chunk))
+        for row, path in enumerate(chunk):
+            with open(path, 'rb') as f:
+                image_preprocessor.preprocess(f.read(), out=batch[row])
+        batches.append(batch)
+    return batches
+
+
+def quantize_dynamic_model(model):
+    """
+    Linear katmanlarini INT8 agirlik + dinamik aktivasyon olcegi ile nicemler.
+    ResNet50'de tek Linear katman son fc oldugu icin konvolusyonlar fp32 kalir; hiz ve
+    boyut kazanci sinirlidir. Onerilen motor int8-static'tir.
+    """
+    select_backend()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static_model(state_dict, calibration_batches):
+    """
+    Egitim sonrasi statik INT8 nicemleme: Conv+BN+ReLU birlestirilir,
+    kalibrasyon goruntuleri ile aktivasyon araliklari olculur ve model donusturulur.
+    """
+    if not calibration_batches:
+        raise ValueError(f"Kalibrasyon için görüntü bulunamadı: {CALIBRATION_DIR}")
+
+    backend = select_backend()
+    model = attach_classifier_head(quantizable_models.resnet50(quantize=False))
+    model.load_state_dict(state_dict)
+    model.eval()
+    model.fuse_model()
+    model.qconfig = torch.quantization.get_default_qconfig(backend)
+    torch.quantization.prepare(model, inplace=True)
+
+    with torch.no_grad():
+        for batch in calibration_batches:
+            model(batch)
+
+    torch.quantization.convert(model, inplace=True)
+    return model
+
+
+def quantize_model(model, state_dict, engine, calibration_batches=None):
+    if engine == 'int8-dynamic':
+        print("int8-dynamic yalnızca fc katmanını nicemler; konvolüsyonlar fp32 kalır (önerilen: int8-static)")
+        return quantize_dynamic_model(model)
+    if engine == 'int8-static':
+        if calibration_batches is None:
+            calibration_batches = load_calibration_batches()
+        print(f"Statik nicemleme kalibrasyonu: {sum(len(b) for b in calibration_batches)} görüntü")
+        return quantize_static_model(state_dict, calibration_batches)
+    raise ValueError(f"Geçersiz çıkarım motoru: {engine}")
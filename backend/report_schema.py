@@ -0,0 +1,17 @@
+# reports tablosuna sonradan eklenen sütunlar (sütun, tip)
+REPORT_MIGRATION_COLUMNS = [
+    ('model_version', 'TEXT'),
+    ('probabilities', 'BLOB')
+]
+
+
+def migrate_report_columns(conn):
+    """
+    Eski veritabanlarinda eksik rapor sutunlarini ekler (uygulama ve komut satiri araclari ortak kullanir)
+    """
+    report_columns = [column[1] for column in conn.execute("PRAGMA table_info(reports)").fetchall()]
+    for column, column_type in REPORT_MIGRATION_COLUMNS:
+        if column not in report_columns:
+            print(f"reports tablosuna {column} sütunu ekleniyor...")
+            conn.execute(f"ALTER TABLE reports ADD COLUMN {column} {column_type}")
+    conn.commit()
@@ -0,0 +1,255 @@
+"""
+Model guncellemesinden sonra reports tablosundaki raporlari uploads/ goruntulerinden yeniden siniflandirir.
+
+Kullanim (backend klasorunden):
+    python rescore_reports.py [--model yeni_model.pth] [--batch-size 64] [--workers 4] [--commit-size 512] [--dry-run]
+
+Raporlar ID sirasiyla (keyset) sayfa sayfa okunur; goruntuler surec havuzunda decode edilir,
+model batch'ler halinde calistirilir ve sonuclar toplu transaction'larla yazilir. Ilerleme
+rescore_checkpoints tablosunda sonuclarla ayni transaction'da saklanir: komut yarida kesilirse
+ayni model surumuyle yeniden calistirildiginda kaldigi yerden devam eder (--restart ile bastan).
+Bu surumle zaten puanlanmis raporlar atlanir. Goruntusu okunamayan raporlarin otesine ilerleme
+kaydedilmez; yeniden calistirmada bu raporlar tekrar denenir. Kademeli mod (EMBRYO_CASCADE) burada
+kullanilmaz: kademede kaydedilmeyen ResNet50 oznitelik vektorleri de bu komutla doldurulur.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from embedding_store import embedding_store, encode_embedding
+from embryo_classes import CLASS_NAMES
+from embryo_ranking import encode_probabilities
+from model_registry import MODEL_PATH, MODEL_VERSION, ModelRegistry
+from preprocessing import image_preprocessor
+from report_schema import migrate_report_columns
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get('EMBRYO_DB_PATH', os.path.join(BACKEND_DIR, 'embryo_ai.db'))
+UPLOAD_FOLDER = os.environ.get('EMBRYO_UPLOAD_FOLDER', os.path.join(BACKEND_DIR, 'uploads'))
+
+
+def connect(db_path):
+    # Uygulama çalışırken de yazılabilsin diye kilit beklenir
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rescore_checkpoints (
+            model_version TEXT PRIMARY KEY,
+            last_report_id INTEGER NOT NULL DEFAULT 0,
+            processed INTEGER NOT NULL DEFAULT 0,
+            changed INTEGER NOT NULL DEFAULT 0,
+            failed INTEGER NOT NULL DEFAULT 0,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    # Uygulama henüz yeni sürümle başlatılmadıysa model_version / probabilities sütunları eksik olabilir
+    migrate_report_columns(conn)
+    return conn
+
+
+def read_checkpoint(conn, model_version):
+    row = conn.execute('''
+        SELECT last_report_id, processed, changed, failed FROM rescore_checkpoints WHERE model_version = ?
+    ''', (model_version,)).fetchone()
+    return row if row is not None else (0, 0, 0, 0)
+
+
+def report_pages(conn, after_id, model_version, page_size):
+    """
+    Bu surumle puanlanmamis raporlari (id, image_path, result) sayfalari halinde ID sirasiyla uretir
+    """
+    while True:
+        rows = conn.execute('''
+            SELECT id, image_path, result FROM reports
+            WHERE id > ? AND (model_version IS NULL OR model_version != ?)
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, model_version, page_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def decode_image(path):
+    """
+    Surec havuzunda calisir: (224, 224, 3) uint8 piksel dizisi ya da hata mesaji dondurur
+    """
+    try:
+        with open(path, 'rb') as f:
+            return image_preprocessor.pixels(f.read()), None
+    except Exception as e:
+        return None, str(e)
+
+
+class Progress:
+    """
+    Belirli araliklarla islenen rapor sayisini, hizi ve tahmini kalan sureyi yazdirir
+    """
+
+    def __init__(self, total, interval):
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.started = time.perf_counter()
+        self.last_report = self.started
+
+    def update(self, count, failed, force=False):
+        self.done += count
+        now = time.perf_counter()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = (self.total - self.done) / rate if rate > 0 else float('nan')
+        percent = self.done / self.total * 100 if self.total else 100.0
+        print(f"{self.done}/{self.total} rapor (%{percent:.1f}), {rate:.1f} rapor/sn, "
+              f"hata {failed}, kalan ~{remaining / 60:.1f} dk")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Raporları yeni modelle yeniden puanla')
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--version', default=MODEL_VERSION, help='Verilmezse dosyadan türetilir')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--uploads', default=UPLOAD_FOLDER)
+    parser.add_argument('--batch-size', type=int, default=64, help='Tek forward çağrısındaki görüntü sayısı')
+    parser.add_argument('--commit-size', type=int, default=512, help='Tek transaction\'da yazılan rapor sayısı')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help='Görüntü decode süreç sayısı')
+    parser.add_argument('--prefetch', type=int, default=2, help='Model çalışırken decode edilen batch sayısı')
+    parser.add_argument('--progress-seconds', type=float, default=10.0)
+    parser.add_argument('--restart', action='store_true', help='Kayıtlı ilerlemeyi yok say ve baştan başla')
+    parser.add_argument('--dry-run', action='store_true', help='Sonuçları yazma, yalnızca değişenleri say')
+    args = parser.parse_args()
+
+    # Kademeli mod kapalı: her rapor ResNet50'den geçer, eksik öznitelik vektörleri de doldurulur
+    registry = ModelRegistry(args.model, args.version, cascade=False)
+    registry.load()
+    model_version = registry.version
+
+    conn = connect(args.db)
+    if args.restart and not args.dry_run:
+        with conn:
+            conn.execute('DELETE FROM rescore_checkpoints WHERE model_version = ?', (model_version,))
+    # Hatalı raporlar bu çalıştırmada yeniden denendiği için hata sayısı sıfırdan başlar
+    last_id, processed, changed, _ = read_checkpoint(conn, model_version)
+    failed = 0
+    # Bu çalıştırmada görüntüsü okunamayan ilk rapor; ilerleme bunun ötesine kaydedilmez
+    first_failed_id = None
+    if last_id:
+        print(f"Kaldığı yerden devam ediliyor: rapor {last_id} sonrası ({processed} rapor işlenmiş)")
+
+    total = conn.execute('''
+        SELECT COUNT(*) FROM reports WHERE id > ? AND (model_version IS NULL OR model_version != ?)
+    ''', (last_id, model_version)).fetchone()[0]
+    print(f"Model sürümü {model_version}: {total} rapor yeniden puanlanacak")
+    if not total:
+        return 0
+
+    progress = Progress(total, args.progress_seconds)
+    updates = []
+    embeddings = []
+
+    def flush():
+        # Sonuçlar ve ilerleme aynı transaction'da yazılır: kesilirse ikisi birlikte geri alınır
+        if args.dry_run:
+            updates.clear()
+            embeddings.clear()
+            return
+        # Başarıyla puanlanan raporlar sürüm filtresiyle atlanacağı için yeniden tarama ucuzdur
+        checkpoint_id = first_failed_id - 1 if first_failed_id is not None else last_id
+        with conn:
+            conn.executemany('''
+                UPDATE reports SET result = ?, confidence = ?, model_version = ?, probabilities = ?
+                WHERE id = ?
+            ''', updates)
+            conn.execute('''
+                INSERT INTO rescore_checkpoints (model_version, last_report_id, processed, changed, failed)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(model_version) DO UPDATE SET
+                    last_report_id = excluded.last_report_id,
+                    processed = excluded.processed,
+                    changed = excluded.changed,
+                    failed = excluded.failed,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', (model_version, checkpoint_id, processed, changed, failed))
+        try:
+            # Yeni vektörler eskilerinin yerine geçer (indeks son satırı kullanır)
+            embedding_store.add_many(embeddings)
+        except Exception as e:
+            print(f"Embedding kaydedilemedi: {str(e)}")
+        updates.clear()
+        embeddings.clear()
+
+    def score(rows, futures):
+        nonlocal last_id, processed, changed, failed, first_failed_id
+        decoded = [future.result() for future in futures]
+        ok = [row for row, (pixels, error) in enumerate(decoded) if pixels is not None]
+        for row, (pixels, error) in enumerate(decoded):
+            if pixels is None:
+                print(f"Rapor {rows[row][0]} atlandı ({rows[row][1]}): {error}")
+                if first_failed_id is None:
+                    first_failed_id = rows[row][0]
+        failed += len(rows) - len(ok)
+
+        if ok:
+            batch = image_preprocessor.new_batch(len(ok))
+            for position, row in enumerate(ok):
+                image_preprocessor.normalize(decoded[row][0], out=batch[position])
+            probabilities, version, features = registry.predict_full(batch)
+
+            for position, row in enumerate(ok):
+                report_id, _, old_result = rows[row]
+                predicted_idx = min(int(probabilities[position].argmax().item()), len(CLASS_NAMES) - 1)
+                predicted_class = CLASS_NAMES[predicted_idx]
+                confidence = round(probabilities[position][predicted_idx].item() * 100, 2)
+                changed += predicted_class != old_result
+                updates.append((predicted_class, confidence, version,
+                                encode_probabilities(probabilities[position].tolist()), report_id))
+                if features is not None:
+                    embeddings.append((report_id, encode_embedding(features[position])))
+
+        processed += len(ok)
+        last_id = rows[-1][0]
+        if len(updates) >= args.commit_size:
+            flush()
+        progress.update(len(rows), failed)
+
+    # Model bir batch'i işlerken sonraki batch'lerin görüntüleri süreç havuzunda decode edilir
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        window = deque()
+        for rows in report_pages(conn, last_id, model_version, args.batch_size):
+            futures = [executor.submit(decode_image, os.path.join(args.uploads, image_path or ''))
+                       for _, image_path, _ in rows]
+            window.append((rows, futures))
+            if len(window) > args.prefetch:
+                score(*window.popleft())
+        while window:
+            score(*window.popleft())
+    flush()
+
+    if not args.dry_run:
+        with conn:
+            conn.execute('''
+                UPDATE rescore_checkpoints SET finished_at = CURRENT_TIMESTAMP WHERE model_version = ?
+            ''', (model_version,))
+
+    progress.update(0, failed, force=True)
+    print(f"Tamamlandı: {processed} rapor yeniden puanlandı, {changed} raporun sınıfı değişti, {failed} hata")
+    if failed and not args.dry_run:
+        print("Hatalı raporlar komut yeniden çalıştırıldığında tekrar denenir")
+    if args.dry_run:
+        print("Deneme modu: veritabanına yazılmadı")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Uretim icin on-catallanan (pre-fork) cok surecli sunucu.
+
+Kullanim (backend klasorunden):
+    python serve.py [--workers 4] [--threads 2] [--host 0.0.0.0] [--port 5000]
+
+Ana surec model agirliklarini bir kez yukler, dinleme soketini acar ve N isci sureci
+catallar (fork). Agirlik tensorleri iscilerle copy-on-write olarak paylasilir, bu yuzden
+her isci icin ayrica ~100 MB bellek harcanmaz. Her isci kendi torch.set_num_threads
+degeriyle calisir. Beklenmedik sekilde kapanan isciler yeniden baslatilir.
+Model surum degisiklikleri (/api/model/versions, /api/model/shadow*) paylasilan dagitim
+dosyasina yazilir; ana surec SIGUSR1'i tum iscilere iletir ve her isci degisikligi uygular.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+
+from model_deployment import DEPLOYMENT_SIGNAL, SERVE_PID_ENV
+
+WORKERS = int(os.environ.get('EMBRYO_WORKERS', str(os.cpu_count() or 1)))
+# Her işçinin torch intra-op thread sayısı (verilmezse çekirdekler işçilere bölünür)
+WORKER_THREADS = os.environ.get('EMBRYO_WORKER_THREADS')
+
+
+def open_listen_socket(host, port, backlog=128):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(index, sock, host, port, threads):
+    import torch
+    from werkzeug.serving import make_server
+
+    from app import app, analysis_jobs, inference_client
+    from model_registry import model_deployment
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    torch.set_num_threads(threads)
+
+    # Model dağıtımı: başlarken (yeniden başlatılan işçi dahil) güncel durum uygulanır, sonra izlenir
+    if inference_client is None:
+        if DEPLOYMENT_SIGNAL is not None:
+            signal.signal(DEPLOYMENT_SIGNAL, lambda signum, frame: model_deployment.wake())
+        model_deployment.start()
+
+    # Bekleyen analiz işleri tek bir işçide yeniden kuyruğa alınır; 'running' işler ana süreçte
+    # fork'tan önce sıfırlandığı için yeniden başlatılan işçi canlı işçilerin işlerine dokunmaz
+    if index == 0:
+        analysis_jobs.recover(requeue=False)
+
+    print(f"İşçi {index} (pid {os.getpid()}) hazır, torch thread: {threads}")
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-fork üretim sunucusu')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--threads', type=int, default=int(WORKER_THREADS) if WORKER_THREADS else None)
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+
+    import torch
+
+    # Ana süreçte OpenMP thread havuzu kurulmasın; işçiler kendi havuzlarını açar
+    torch.set_num_threads(1)
+
+    from app import analysis_jobs, app, inference_client, init_db, model_registry
+    from model_registry import model_deployment
+
+    init_db()
+    # Önceki sunucudan yarım kalan işler: henüz hiçbir işçi çalışmıyorken bir kez
+    requeued = analysis_jobs.requeue_running()
+    if requeued:
+        print(f"{requeued} yarım kalmış analiz işi kuyruğa geri alındı")
+    # Ayrı çıkarım servisi varsa işçiler yalnızca API trafiği taşır
+    if inference_client is None:
+        model_registry.load()
+        # Kayıtlı dağıtım fork'tan önce uygulanır; işçiler aynı ağırlıkları paylaşarak başlar
+        model_deployment.sync()
+
+    if not hasattr(os, 'fork'):
+        # Windows: fork yok, tek süreçli sunucuya dön
+        print("Bu platform fork desteklemiyor, tek süreçli sunucu başlatılıyor")
+        torch.set_num_threads(threads)
+        analysis_jobs.recover(requeue=False)
+        if inference_client is None:
+            model_deployment.start()
+        app.run(host=args.host, port=args.port, threaded=True)
+        return 0
+
+    sock = open_listen_socket(args.host, args.port)
+    # İşçiler model dağıtım değişikliklerini bu sürece bildirir
+    os.environ[SERVE_PID_ENV] = str(os.getpid())
+
+    # Yüklenen nesneleri GC taramasından çıkar; işçilerde sayfalar gereksiz yere kopyalanmasın
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    children = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(index, sock, args.host, args.port, threads)
+            finally:
+                os._exit(0)
+        children[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def forward_deployment(signum, frame):
+        # Bir işçideki model değişikliğini tüm işçilere ilet
+        for pid in list(children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    if DEPLOYMENT_SIGNAL is not None:
+        signal.signal(DEPLOYMENT_SIGNAL, forward_deployment)
+
+    print(f"{workers} işçi başlatılıyor ({args.host}:{args.port}, işçi başına {threads} torch thread)")
+    for index in range(workers):
+        spawn(index)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = children.pop(pid, None)
+        if index is not None and not stopping:
+            print(f"İşçi {index} (pid {pid}) kapandı, yeniden başlatılıyor")
+            spawn(index)
+
+    sock.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
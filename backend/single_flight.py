@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Tamamlanan sonucun aynı anahtarlı tekrar isteklerine verilmeye devam ettiği süre (saniye).
+# Çift tıklama ve yeniden deneme gibi kısa aralıklı tekrarları da yakalar; 0 yalnızca eşzamanlı istekleri birleştirir.
+SINGLE_FLIGHT_LINGER_SECONDS = float(os.environ.get('EMBRYO_SINGLE_FLIGHT_LINGER_SECONDS', '1'))
+
+
+class SingleFlight:
+    """
+    Ayni anahtarla es zamanli gelen cagrilari tek bir hesaplamada birlestirir.
+    Ilk cagri (lider) fonksiyonu calistirir, digerleri onun sonucunu bekler.
+    """
+
+    def __init__(self, linger=SINGLE_FLIGHT_LINGER_SECONDS):
+        self.linger = max(0.0, linger)
+        self._lock = threading.Lock()
+        # anahtar -> [Future, bitiş zamanı (sürüyorsa None)]
+        self._calls = {}
+
+        self.leaders = 0
+        self.shared = 0
+
+    def _expire(self, now):
+        # Çağıran kilidi tutuyor olmalı
+        expired = [key for key, (_, finished) in self._calls.items()
+                   if finished is not None and now - finished > self.linger]
+        for key in expired:
+            del self._calls[key]
+
+    def do(self, key, fn, keep=None):
+        """
+        (sonuc, paylasildi_mi) dondurur. keep(sonuc) False ise sonuc bekleme
+        suresince saklanmaz (ornegin basarisiz analizler).
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                future = call[0]
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = [future, None]
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if self.linger > 0 and (keep is None or keep(result)):
+                self._calls[key][1] = time.monotonic()
+            else:
+                self._calls.pop(key, None)
+        future.set_result(result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            in_flight = sum(1 for _, finished in self._calls.values() if finished is None)
+            return {
+                'linger_seconds': self.linger,
+                'in_flight': in_flight,
+                'leaders': self.leaders,
+                'shared': self.shared
+            }
@@ -0,0 +1,115 @@
+import os
+import threading
+
+# Düşük güvenli tahminlerde test zamanı çoğaltma (TTA): EMBRYO_TTA=1
+TTA_ENABLED = os.environ.get('EMBRYO_TTA', '0') == '1'
+# En yüksek sınıf olasılığı bu değerin (0-1) altında kalan görüntüler çoğaltılmış görünümlerle yeniden tahmin edilir
+TTA_THRESHOLD = float(os.environ.get('EMBRYO_TTA_THRESHOLD', '0.6'))
+# Kullanılacak görünümler (orijinal görüntü her zaman ortalamaya dahildir)
+TTA_TRANSFORMS = os.environ.get('EMBRYO_TTA_TRANSFORMS', 'hflip,vflip,rot90,rot180,rot270')
+# Tek ek forward çağrısındaki en fazla görüntü sayısı (varsayılan: mikro-batch üst sınırı);
+# satır başına tüm görünümler aynı çağrıda kalır, aktivasyon belleği normal batch'i pek aşmaz
+TTA_CHUNK_SIZE = int(os.environ.get('EMBRYO_TTA_CHUNK_SIZE', os.environ.get('EMBRYO_BATCH_MAX_SIZE', '8')))
+
+# Embriyo görüntüleri yönden bağımsızdır; (N, 3, H, W) batch'in son iki ekseni üzerinde dönüşümler
+TRANSFORMS = {
+    'hflip': lambda batch: batch.flip(-1),
+    'vflip': lambda batch: batch.flip(-2),
+    'rot90': lambda batch: batch.rot90(1, (-2, -1)),
+    'rot180': lambda batch: batch.rot90(2, (-2, -1)),
+    'rot270': lambda batch: batch.rot90(3, (-2, -1)),
+    'transpose': lambda batch: batch.transpose(-2, -1),
+}
+
+
+def parse_transforms(text):
+    names = [name.strip() for name in text.split(',') if name.strip()]
+    unknown = [name for name in names if name not in TRANSFORMS]
+    if unknown or not names:
+        raise ValueError(f"Geçersiz TTA dönüşümleri: {text} (geçerli: {', '.join(TRANSFORMS)})")
+    return names
+
+
+class TestTimeAugmentation:
+    """
+    Guveni esigin altinda kalan satirlarin tum cevrilmis/dondurulmus gorunumlerini batch
+    tensorlerinde toplar, en fazla chunk_size goruntuluk ek forward cagrilarinda calistirir ve
+    orijinal goruntu dahil softmax ciktilarinin ortalamasini alir. Emin olunan tahminler ek
+    maliyet odemez.
+    """
+
+    def __init__(self, threshold=TTA_THRESHOLD, transforms=TTA_TRANSFORMS, chunk_size=TTA_CHUNK_SIZE):
+        self.threshold = threshold
+        self.transforms = parse_transforms(transforms)
+        self.chunk_size = max(1, chunk_size)
+
+        self._stats_lock = threading.Lock()
+        self.items = 0
+        self.augmented = 0
+        self.changed = 0
+
+    @property
+    def version(self):
+        # Ortalama sonucu değiştirdiği için önbellek anahtarına (model sürümüne) eklenir
+        return f"tta-{'-'.join(self.transforms)}@{self.threshold}"
+
+    def augment(self, input_batch):
+        """
+        (N, 3, H, W) -> (N * V, 3, H, W); her goruntunun V gorunumu ardisik satirlardadir
+        """
+        import torch
+
+        views = torch.stack([TRANSFORMS[name](input_batch) for name in self.transforms], dim=1)
+        return views.reshape(-1, *input_batch.shape[1:])
+
+    def refine(self, input_batch, probabilities, predict, record=True):
+        """
+        Dusuk guvenli satirlarin olasiliklarini gorunumlerin ortalamasiyla degistirir.
+        predict(batch) -> (N, 19) softmax olasiliklari; record=False ise istatistiklere sayilmaz
+        (golge moddaki aday surum).
+        """
+        import torch
+
+        rows = torch.nonzero(probabilities.max(dim=1).values < self.threshold).flatten()
+        if not len(rows):
+            if record:
+                with self._stats_lock:
+                    self.items += len(probabilities)
+            return probabilities
+
+        view_count = len(self.transforms)
+        rows_per_call = max(1, self.chunk_size // view_count)
+        view_probabilities = torch.cat([
+            predict(self.augment(input_batch[rows[start:start + rows_per_call]]))
+            for start in range(0, len(rows), rows_per_call)
+        ]).reshape(len(rows), view_count, -1)
+        averaged = (view_probabilities.sum(dim=1) + probabilities[rows]) / (view_count + 1)
+
+        refined = probabilities.clone()
+        refined[rows] = averaged
+        if not record:
+            return refined
+        with self._stats_lock:
+            self.items += len(probabilities)
+            self.augmented += len(rows)
+            self.changed += int((averaged.argmax(dim=1) != probabilities[rows].argmax(dim=1)).sum().item())
+        return refined
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.items = 0
+            self.augmented = 0
+            self.changed = 0
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'threshold': self.threshold,
+                'transforms': self.transforms,
+                'chunk_size': self.chunk_size,
+                'items': self.items,
+                'augmented': self.augmented,
+                'augmentation_rate': round(self.augmented / self.items, 4) if self.items else None,
+                # Ortalama sonrası sınıfı değişen görüntüler
+                'changed': self.changed
+            }
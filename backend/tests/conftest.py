@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modüller backend klasöründen düz (paket olmadan) içe aktarılır
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('koşul zamanında sağlanmadı')
+        time.sleep(0.005)
+
+
+def enqueue(controller, doctor_id, name, order, errors):
+    # Sıraya giren isteği thread'de başlatır; sıraya girdiği görülene kadar bekler
+    depth = controller.stats()['queue_depth']
+
+    def run():
+        try:
+            with controller.slot(doctor_id):
+                order.append(name)
+        except AdmissionRejected as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    wait_until(lambda: controller.stats()['queue_depth'] == depth + 1)
+    return thread
+
+
+def test_admits_immediately_when_idle():
+    controller = AdmissionController(max_active=2, max_queued=4, max_wait=1)
+    with controller.slot('1'):
+        with controller.slot('2'):
+            assert controller.stats()['active'] == 2
+    stats = controller.stats()
+    assert stats['active'] == 0
+    assert stats['admitted'] == 2
+
+
+def test_round_robin_between_doctors():
+    controller = AdmissionController(max_active=1, max_queued=8, max_wait=5)
+    order, errors = [], []
+    controller.acquire('holder')
+
+    threads = [
+        enqueue(controller, 'a', 'a1', order, errors),
+        enqueue(controller, 'a', 'a2', order, errors),
+        enqueue(controller, 'b', 'b1', order, errors)
+    ]
+    controller.release()
+    for thread in threads:
+        thread.join(5)
+
+    # a'nın ikinci isteği, sonradan gelen b'nin ilk isteğinden sonra çalışır
+    assert order == ['a1', 'b1', 'a2']
+    assert not errors
+    assert controller.stats()['active'] == 0
+
+
+def test_rejects_doctor_over_fair_share():
+    controller = AdmissionController(max_active=1, max_queued=4, max_wait=5)
+    order, errors = [], []
+    controller.acquire('holder')
+
+    threads = [
+        enqueue(controller, 'b', 'b1', order, errors),
+        enqueue(controller, 'a', 'a1', order, errors),
+        enqueue(controller, 'a', 'a2', order, errors)
+    ]
+    # İki doktor varken a'nın payı ceil(4 / 2) = 2
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('a')
+    assert excinfo.value.retry_after >= 1
+
+    controller.release()
+    for thread in threads:
+        thread.join(5)
+    assert sorted(order) == ['a1', 'a2', 'b1']
+    assert controller.stats()['rejected'] == 1
+
+
+def test_rejects_when_queue_full():
+    controller = AdmissionController(max_active=1, max_queued=0, max_wait=5)
+    controller.acquire('holder')
+    with pytest.raises(AdmissionRejected) as excinfo:
+        controller.acquire('other')
+    assert excinfo.value.retry_after >= 1
+    controller.release()
+
+
+def test_wait_timeout_leaves_queue():
+    controller = AdmissionController(max_active=1, max_queued=4, max_wait=0.05)
+    controller.acquire('holder')
+    with pytest.raises(AdmissionRejected):
+        controller.acquire('other')
+
+    stats = controller.stats()
+    assert stats['timed_out'] == 1
+    assert stats['queue_depth'] == 0
+    assert stats['queued_by_doctor'] == {}
+
+    # Süresi dolan bilet sırada kalmadığı için slot bir sonraki isteğe verilir
+    controller.release()
+    with controller.slot('other'):
+        assert controller.stats()['active'] == 1
@@ -0,0 +1,81 @@
+import sqlite3
+
+from analysis_jobs import AnalysisJobManager
+
+
+def insert_job(db_path, job_id, status='queued'):
+    with sqlite3.connect(db_path) as conn:
+        conn.execute('''
+            INSERT INTO analysis_jobs (id, status, patient_id, doctor_id, image_path)
+            VALUES (?, ?, 1, 2, 'embryo.png')
+        ''', (job_id, status))
+
+
+def manager(db_path, handler=None, calls=None):
+    def record(job):
+        calls.append(job['id'])
+        return {'success': True, 'class': 'Morula'}
+
+    jobs = AnalysisJobManager(db_path, handler or record, max_workers=1)
+    # Tabloyu oluştur
+    jobs._connect().close()
+    return jobs
+
+
+def test_claim_is_atomic_across_managers(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    # Aynı veritabanını kullanan iki süreç gibi
+    first, second = manager(db_path, calls=[]), manager(db_path, calls=[])
+    insert_job(db_path, 'job-1')
+
+    assert first._claim('job-1')
+    assert not second._claim('job-1')
+    assert not first._claim('job-1')
+    assert first.get('job-1')['status'] == 'running'
+
+
+def test_run_executes_job_once(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    calls = []
+    first, second = manager(db_path, calls=calls), manager(db_path, calls=calls)
+    insert_job(db_path, 'job-1')
+
+    first._run('job-1')
+    second._run('job-1')
+
+    assert calls == ['job-1']
+    job = first.get('job-1')
+    assert job['status'] == 'done'
+    assert job['result'] == {'success': True, 'class': 'Morula'}
+
+
+def test_run_records_failures(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+
+    def unsuccessful(job):
+        return {'success': False, 'error': 'Resim okunamadı'}
+
+    def broken(job):
+        raise RuntimeError('model yok')
+
+    jobs = manager(db_path, calls=[])
+    insert_job(db_path, 'job-1')
+    insert_job(db_path, 'job-2')
+    manager(db_path, handler=unsuccessful)._run('job-1')
+    manager(db_path, handler=broken)._run('job-2')
+
+    assert (jobs.get('job-1')['status'], jobs.get('job-1')['error']) == ('failed', 'Resim okunamadı')
+    assert (jobs.get('job-2')['status'], jobs.get('job-2')['error']) == ('failed', 'model yok')
+
+
+def test_running_jobs_requeued_only_by_parent(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    jobs = manager(db_path, calls=[])
+    insert_job(db_path, 'job-1', status='running')
+
+    # İşçiler (requeue=False) başka süreçte çalışan işe dokunmaz
+    assert jobs.recover(requeue=False) == 0
+    assert jobs.get('job-1')['status'] == 'running'
+
+    assert jobs.requeue_running() == 1
+    assert jobs.get('job-1')['status'] == 'queued'
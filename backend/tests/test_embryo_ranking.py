@@ -0,0 +1,84 @@
+import pytest
+
+from embryo_classes import CLASS_NAMES
+from embryo_ranking import (
+    QUALITY_WEIGHTS, class_quality, decode_probabilities, encode_probabilities, parse_weights, rank_reports
+)
+
+
+def one_hot(class_name, probability=1.0):
+    # Kalan olasılık diğer sınıflara eşit dağıtılır
+    rest = (1.0 - probability) / (len(CLASS_NAMES) - 1)
+    return [probability if name == class_name else rest for name in CLASS_NAMES]
+
+
+def report(probabilities=None, result=None, confidence=None):
+    return {
+        'probabilities': encode_probabilities(probabilities) if probabilities is not None else None,
+        'result': result,
+        'confidence': confidence
+    }
+
+
+def test_probability_blob_roundtrip():
+    probabilities = one_hot('Morula', 0.7)
+    blob = encode_probabilities(probabilities)
+    assert len(blob) == 2 * len(CLASS_NAMES)
+    assert decode_probabilities(blob) == pytest.approx(probabilities, abs=1e-3)
+
+
+def test_class_quality_from_stars():
+    assert class_quality('2-1-1') == 0.75
+    assert class_quality('2-3-3') == 0.0
+    assert class_quality('bilinmeyen') == 0.0
+    assert len(QUALITY_WEIGHTS) == len(CLASS_NAMES)
+
+
+def test_parse_weights():
+    weights = parse_weights('3-1-1:1, Morula:0.8')
+    assert weights[CLASS_NAMES.index('3-1-1')] == 1.0
+    assert weights[CLASS_NAMES.index('Morula')] == 0.8
+    assert sum(weights) == pytest.approx(1.8)
+
+    with pytest.raises(ValueError):
+        parse_weights('5-1-1:1')
+
+
+def test_rank_by_quality():
+    pytest.importorskip('numpy')
+    rows = [report(one_hot('2-3-3')), report(one_hot('2-1-1')), report(one_hot('2-1-2'))]
+    ranked = rank_reports(rows, score='quality')
+    assert [index for index, _, _, _ in ranked] == [1, 2, 0]
+    assert ranked[0][1] == pytest.approx(0.75, abs=1e-3)
+    assert ranked[0][3][0]['class'] == '2-1-1'
+
+
+def test_rank_by_confidence_and_class():
+    pytest.importorskip('numpy')
+    rows = [report(one_hot('Morula', 0.6)), report(one_hot('Early', 0.9)), report(one_hot('Morula', 0.8))]
+
+    ranked = rank_reports(rows, score='confidence')
+    assert [index for index, _, _, _ in ranked] == [1, 2, 0]
+
+    ranked = rank_reports(rows, score='class', class_name='Morula')
+    assert [index for index, _, _, _ in ranked] == [2, 0, 1]
+
+    with pytest.raises(ValueError):
+        rank_reports(rows, score='class', class_name='5-1-1')
+    with pytest.raises(ValueError):
+        rank_reports(rows, score='hiz')
+
+
+def test_custom_weights_override_score():
+    pytest.importorskip('numpy')
+    rows = [report(one_hot('2-1-1')), report(one_hot('Morula'))]
+    ranked = rank_reports(rows, score='quality', weights=parse_weights('Morula:1'))
+    assert [index for index, _, _, _ in ranked] == [1, 0]
+
+
+def test_reports_without_probabilities_are_approximated():
+    pytest.importorskip('numpy')
+    rows = [report(one_hot('Morula', 0.5)), report(result='Morula', confidence=90.0)]
+    ranked = rank_reports(rows, score='class', class_name='Morula')
+    assert [(index, approximate) for index, _, approximate, _ in ranked] == [(1, True), (0, False)]
+    assert ranked[0][1] == pytest.approx(0.9)
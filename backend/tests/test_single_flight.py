@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('koşul zamanında sağlanmadı')
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_leader_result():
+    flight = SingleFlight(linger=0)
+    started = threading.Event()
+    finish = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        finish.wait(5)
+        return 'sonuç'
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.setdefault('leader', flight.do('k', compute)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.setdefault('follower', flight.do('k', compute)))
+    follower.start()
+    wait_until(lambda: flight.stats()['shared'] == 1)
+
+    finish.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert results['leader'] == ('sonuç', False)
+    assert results['follower'] == ('sonuç', True)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_followers_receive_leader_exception():
+    flight = SingleFlight(linger=60)
+    started = threading.Event()
+    finish = threading.Event()
+
+    def fail():
+        started.set()
+        finish.wait(5)
+        raise RuntimeError('model hatası')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('k', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    wait_until(lambda: flight.stats()['shared'] == 1)
+    finish.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert errors == ['model hatası', 'model hatası']
+    # Hata saklanmaz: sonraki çağrı yeniden hesaplar
+    assert flight.do('k', lambda: 'yeni') == ('yeni', False)
+
+
+def test_linger_reuses_finished_result():
+    flight = SingleFlight(linger=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('k', compute) == (1, False)
+    assert flight.do('k', compute) == (1, True)
+    assert flight.do('other', compute) == (2, False)
+    assert len(calls) == 2
+
+
+def test_linger_expires():
+    flight = SingleFlight(linger=0.05)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('k', compute) == (1, False)
+    time.sleep(0.1)
+    assert flight.do('k', compute) == (2, False)
+
+
+@pytest.mark.parametrize('linger, keep', [(0, None), (60, lambda result: result['success'])])
+def test_result_not_kept(linger, keep):
+    # linger=0 yalnızca eşzamanlı çağrıları birleştirir; keep False dönerse sonuç saklanmaz
+    flight = SingleFlight(linger=linger)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {'success': False}
+
+    flight.do('k', compute, keep=keep)
+    result, shared = flight.do('k', compute, keep=keep)
+    assert not shared
+    assert len(calls) == 2
@@ -0,0 +1,76 @@
+import pytest
+
+from embryo_classes import CLASS_NAMES
+from timelapse import STAGES, TimelapseStore, stage_of, stage_probabilities
+
+
+def frame(captured_at, class_name, probability=0.9):
+    rest = (1.0 - probability) / (len(CLASS_NAMES) - 1)
+    return captured_at, [probability if name == class_name else rest for name in CLASS_NAMES], 'v1'
+
+
+def new_sequence(tmp_path, confirm_frames=3):
+    store = TimelapseStore(str(tmp_path / 'timelapse.db'), confirm_frames=confirm_frames)
+    return store, store.create(patient_id=1, doctor_id=2)
+
+
+def test_stages_follow_cell_count():
+    assert STAGES.index('2-x-x') < STAGES.index('3-x-x') < STAGES.index('4-x-x') < STAGES.index('Morula')
+    assert stage_of('3-2-1') == '3-x-x'
+    assert stage_of('Morula') == 'Morula'
+    stages = stage_probabilities(frame(0, '2-1-1')[1])
+    assert sum(stages) == pytest.approx(1.0)
+    assert max(range(len(STAGES)), key=stages.__getitem__) == STAGES.index('2-x-x')
+
+
+def test_transition_needs_confirm_frames(tmp_path):
+    store, sequence_id = new_sequence(tmp_path)
+
+    result = store.add_frames(sequence_id, [frame(0, '2-1-1'), frame(1, '2-2-1')])
+    assert result['transitions'] == []
+    assert result['stage'] is None
+
+    # Üçüncü kare geçişi onaylar; geçiş adayın ilk görüldüğü kareye yazılır
+    result = store.add_frames(sequence_id, [frame(2, '2-1-2')])
+    assert result['stage'] == '2-x-x'
+    assert [(t['frame_index'], t['from_stage'], t['to_stage']) for t in result['transitions']] == [(0, None, '2-x-x')]
+
+
+def test_single_frame_flicker_is_ignored(tmp_path):
+    store, sequence_id = new_sequence(tmp_path)
+    frames = [frame(t, '2-1-1') for t in range(3)]
+    frames += [frame(3, '3-1-1'), frame(4, '2-1-1'), frame(5, '3-1-1'), frame(6, '2-1-1')]
+    result = store.add_frames(sequence_id, frames)
+
+    assert [t['to_stage'] for t in result['transitions']] == ['2-x-x']
+    assert result['stage'] == '2-x-x'
+
+
+def test_confirmed_transition_across_calls(tmp_path):
+    store, sequence_id = new_sequence(tmp_path)
+    store.add_frames(sequence_id, [frame(t, '2-1-1') for t in range(3)])
+    store.add_frames(sequence_id, [frame(3, '3-1-1'), frame(4, '3-2-1')])
+    result = store.add_frames(sequence_id, [frame(5, '3-1-2')])
+
+    assert [(t['frame_index'], t['captured_at'], t['from_stage'], t['to_stage']) for t in result['transitions']] == [
+        (3, 3, '2-x-x', '3-x-x')
+    ]
+    frames, transitions = store.timeline(sequence_id)
+    assert [item['frame_stage'] for item in frames] == ['2-x-x'] * 3 + ['3-x-x'] * 3
+    assert [t['to_stage'] for t in transitions] == ['2-x-x', '3-x-x']
+    assert store.get(sequence_id)['stage'] == '3-x-x'
+
+
+def test_stale_frames_are_skipped(tmp_path):
+    store, sequence_id = new_sequence(tmp_path, confirm_frames=1)
+    store.add_frames(sequence_id, [frame(10, '2-1-1')])
+    result = store.add_frames(sequence_id, [frame(10, '3-1-1'), frame(5, '3-1-1')])
+
+    assert all(item.get('skipped') for item in result['frames'])
+    assert result['transitions'] == []
+    assert store.get(sequence_id)['frame_count'] == 1
+
+
+def test_unknown_sequence(tmp_path):
+    store, _ = new_sequence(tmp_path)
+    assert store.add_frames('yok', [frame(0, '2-1-1')]) is None
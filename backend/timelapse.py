@@ -0,0 +1,264 @@
+import os
+import sqlite3
+import uuid
+
+from embryo_classes import CLASS_NAMES
+from embryo_ranking import decode_probabilities, encode_probabilities
+
+# Yeni bir evrenin geçiş sayılması için art arda en olası evre olması gereken kare sayısı
+# (tek karelik yanlış sınıflandırmalar zaman çizelgesinde sahte geçiş üretmesin)
+TIMELAPSE_CONFIRM_FRAMES = int(os.environ.get('EMBRYO_TIMELAPSE_CONFIRM_FRAMES', '3'))
+
+# Gelişim evreleri biyolojik sırayla: bölünme evresindeki sınıflar hücre sayısına göre (2-x-x, 3-x-x, 4-x-x)
+# gruplanır, ardından morula gelir; gelişimi duran embriyolar (Arrested) en sondadır
+STAGES = ('Early', '2-x-x', '3-x-x', '4-x-x', 'Morula', 'Arrested')
+
+
+def stage_of(class_name):
+    return f"{class_name[0]}-x-x" if class_name[0].isdigit() else class_name
+
+
+CLASS_STAGES = [STAGES.index(stage_of(class_name)) for class_name in CLASS_NAMES]
+
+
+def stage_probabilities(probabilities):
+    """
+    19 sinif olasiligini evre olasiliklarina toplar (STAGES sirasiyla)
+    """
+    totals = [0.0] * len(STAGES)
+    for class_index, probability in enumerate(probabilities):
+        totals[CLASS_STAGES[class_index]] += probability
+    return totals
+
+
+class TimelapseStore:
+    """
+    Ayni embriyonun zaman sirali karelerini ve evre gecislerini saklar. Her kare yalnizca
+    38 byte'lik float16 olasilik vektoru olarak tutulur; evre durumu (mevcut evre ve aday
+    evre sayaci) dizi kaydinda saklandigi icin yeni kareler onceki kareler yeniden
+    islenmeden O(1) eklenir.
+    """
+
+    def __init__(self, db_path, confirm_frames=TIMELAPSE_CONFIRM_FRAMES):
+        self.db_path = db_path
+        self.confirm_frames = confirm_frames
+        self._table_ready = False
+
+    def _connect(self):
+        # Aynı diziye eşzamanlı eklemeler BEGIN IMMEDIATE ile sıraya girer
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        if not self._table_ready:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timelapse_sequences (
+                    id TEXT PRIMARY KEY,
+                    patient_id INTEGER NOT NULL,
+                    doctor_id INTEGER NOT NULL,
+                    notes TEXT,
+                    frame_count INTEGER NOT NULL DEFAULT 0,
+                    last_captured_at REAL,
+                    stage TEXT,
+                    candidate_stage TEXT,
+                    candidate_count INTEGER NOT NULL DEFAULT 0,
+                    candidate_frame INTEGER,
+                    model_version TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timelapse_frames (
+                    sequence_id TEXT NOT NULL,
+                    frame_index INTEGER NOT NULL,
+                    captured_at REAL NOT NULL,
+                    probabilities BLOB NOT NULL,
+                    PRIMARY KEY (sequence_id, frame_index)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS timelapse_transitions (
+                    sequence_id TEXT NOT NULL,
+                    frame_index INTEGER NOT NULL,
+                    captured_at REAL NOT NULL,
+                    from_stage TEXT,
+                    to_stage TEXT NOT NULL,
+                    confidence FLOAT,
+                    PRIMARY KEY (sequence_id, frame_index)
+                ) WITHOUT ROWID
+            ''')
+            self._table_ready = True
+        return conn
+
+    def create(self, patient_id, doctor_id, notes=''):
+        sequence_id = uuid.uuid4().hex
+        conn = self._connect()
+        try:
+            conn.execute('''
+                INSERT INTO timelapse_sequences (id, patient_id, doctor_id, notes) VALUES (?, ?, ?, ?)
+            ''', (sequence_id, patient_id, doctor_id, notes))
+        finally:
+            conn.close()
+        return sequence_id
+
+    def get(self, sequence_id):
+        conn = self._connect()
+        try:
+            row = conn.execute('''
+                SELECT id, patient_id, doctor_id, notes, frame_count, last_captured_at, stage,
+                       model_version, created_at, updated_at
+                FROM timelapse_sequences WHERE id = ?
+            ''', (sequence_id,)).fetchone()
+        finally:
+            conn.close()
+
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'patient_id': row[1],
+            'doctor_id': row[2],
+            'notes': row[3],
+            'frame_count': row[4],
+            'last_captured_at': row[5],
+            'stage': row[6],
+            'model_version': row[7],
+            'created_at': row[8],
+            'updated_at': row[9]
+        }
+
+    def add_frames(self, sequence_id, frames):
+        """
+        [(captured_at, olasiliklar, model_surumu)] karelerini sirayla ekler ve evre durumunu
+        gunceller. Son kareden eski ya da ayni zamanli kareler (yeniden gonderim) atlanir.
+        Eklenen kareler ve yeni gecisler icin ({'frames': [...], 'transitions': [...]}) dondurur;
+        dizi yoksa None.
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('''
+                SELECT frame_count, last_captured_at, stage, candidate_stage, candidate_count, candidate_frame
+                FROM timelapse_sequences WHERE id = ?
+            ''', (sequence_id,)).fetchone()
+            if row is None:
+                conn.execute('ROLLBACK')
+                return None
+
+            frame_count, last_captured_at, stage, candidate, candidate_count, candidate_frame = row
+            added = []
+            transitions = []
+            model_version = None
+            for captured_at, probabilities, model_version in frames:
+                if last_captured_at is not None and captured_at <= last_captured_at:
+                    added.append({'captured_at': captured_at, 'skipped': True})
+                    continue
+
+                frame_index = frame_count
+                stages = stage_probabilities(probabilities)
+                frame_stage = max(range(len(STAGES)), key=stages.__getitem__)
+                frame_stage_name = STAGES[frame_stage]
+
+                # Histerezis: aday evre art arda confirm_frames kare en olası kalırsa geçiş sayılır
+                if frame_stage_name == stage:
+                    candidate, candidate_count, candidate_frame = None, 0, None
+                elif frame_stage_name == candidate:
+                    candidate_count += 1
+                else:
+                    candidate, candidate_count, candidate_frame = frame_stage_name, 1, frame_index
+
+                conn.execute('''
+                    INSERT INTO timelapse_frames (sequence_id, frame_index, captured_at, probabilities)
+                    VALUES (?, ?, ?, ?)
+                ''', (sequence_id, frame_index, captured_at, encode_probabilities(probabilities)))
+
+                if candidate is not None and candidate_count >= self.confirm_frames:
+                    # Geçiş, aday evrenin ilk görüldüğü kareye yazılır
+                    onset = conn.execute('''
+                        SELECT captured_at FROM timelapse_frames WHERE sequence_id = ? AND frame_index = ?
+                    ''', (sequence_id, candidate_frame)).fetchone()[0]
+                    transition = {
+                        'frame_index': candidate_frame,
+                        'captured_at': onset,
+                        'from_stage': stage,
+                        'to_stage': candidate,
+                        'confidence': round(stages[frame_stage], 4)
+                    }
+                    conn.execute('''
+                        INSERT INTO timelapse_transitions
+                            (sequence_id, frame_index, captured_at, from_stage, to_stage, confidence)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', (sequence_id, candidate_frame, onset, stage, candidate, transition['confidence']))
+                    transitions.append(transition)
+                    stage, candidate, candidate_count, candidate_frame = candidate, None, 0, None
+
+                predicted_idx = max(range(len(probabilities)), key=probabilities.__getitem__)
+                added.append({
+                    'frame_index': frame_index,
+                    'captured_at': captured_at,
+                    'class': CLASS_NAMES[predicted_idx],
+                    'confidence': round(probabilities[predicted_idx] * 100, 2),
+                    'frame_stage': frame_stage_name,
+                    'stage': stage
+                })
+                frame_count += 1
+                last_captured_at = captured_at
+
+            conn.execute('''
+                UPDATE timelapse_sequences
+                SET frame_count = ?, last_captured_at = ?, stage = ?, candidate_stage = ?, candidate_count = ?,
+                    candidate_frame = ?, model_version = COALESCE(?, model_version), updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (frame_count, last_captured_at, stage, candidate, candidate_count, candidate_frame,
+                  model_version, sequence_id))
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+        return {'frames': added, 'transitions': transitions, 'stage': stage}
+
+    def timeline(self, sequence_id, since_frame=0, include_probabilities=False):
+        """
+        Kaydedilmis kareleri (since_frame ve sonrasi) ve tum evre gecislerini dondurur
+        """
+        conn = self._connect()
+        try:
+            frame_rows = conn.execute('''
+                SELECT frame_index, captured_at, probabilities FROM timelapse_frames
+                WHERE sequence_id = ? AND frame_index >= ?
+                ORDER BY frame_index
+            ''', (sequence_id, since_frame)).fetchall()
+            transition_rows = conn.execute('''
+                SELECT frame_index, captured_at, from_stage, to_stage, confidence FROM timelapse_transitions
+                WHERE sequence_id = ?
+                ORDER BY frame_index
+            ''', (sequence_id,)).fetchall()
+        finally:
+            conn.close()
+
+        frames = []
+        for frame_index, captured_at, blob in frame_rows:
+            probabilities = decode_probabilities(blob)
+            stages = stage_probabilities(probabilities)
+            predicted_idx = max(range(len(probabilities)), key=probabilities.__getitem__)
+            frame = {
+                'frame_index': frame_index,
+                'captured_at': captured_at,
+                'class': CLASS_NAMES[predicted_idx],
+                'confidence': round(probabilities[predicted_idx] * 100, 2),
+                'frame_stage': STAGES[max(range(len(STAGES)), key=stages.__getitem__)]
+            }
+            if include_probabilities:
+                frame['probabilities'] = [round(value, 4) for value in probabilities]
+            frames.append(frame)
+
+        transitions = [{
+            'frame_index': row[0],
+            'captured_at': row[1],
+            'from_stage': row[2],
+            'to_stage': row[3],
+            'confidence': row[4]
+        } for row in transition_rows]
+        return frames, transitions